@@ -1,10 +1,6 @@
-import logging
+import sys
 
-from krakenohlc import kraken_ohlc
+from krakenohlc.cli import main
 
 if __name__ == "__main__":
-    logging.basicConfig(
-        format="%(asctime)s - %(levelname)s:%(name)s: %(message)s",
-        level=logging.INFO,
-    )
-    kraken_ohlc("data")
+    sys.exit(main())
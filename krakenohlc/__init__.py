@@ -1,8 +1,134 @@
-from .config import Config
-from .io import create_data_directory, define_filepath, read_csv
-from .krakenohlc import (handle_pair_frequency_ohlc, handle_pair_trades,
-                         kraken_ohlc)
-from .ohlc import (adjust_ohlc_frequency_dates,
-                   check_trades_ohlc_start_end_dates,
-                   pandas_to_kraken_ohlc_frequencies, trades_to_ohlc)
-from .trades import datetime_as_utc_unix, download_trades, trades_as_dataframe
+import importlib
+
+# Public objects by submodule. Submodules are imported on first access, so that
+# command line commands not needing pandas or the Kraken API start fast.
+SUBMODULES_OBJECTS: dict[str, list[str]] = {
+    "cache": [
+        "partial_ohlc_keys",
+        "prune_ohlc_cache",
+        "trades_chunks",
+        "trades_to_ohlc_cached",
+    ],
+    "compaction": ["compact_data_folder", "compaction_partitions", "data_files"],
+    "config": ["Config"],
+    "finalization": ["BarFinalizer"],
+    "io": [
+        "create_data_directory",
+        "define_filepath",
+        "read_csv",
+        "read_csv_chunks",
+        "write_csv",
+        "write_csv_chunks",
+    ],
+    "krakenohlc": [
+        "handle_pair",
+        "handle_pair_chunked",
+        "handle_pair_frequency_ohlc",
+        "handle_pair_trades",
+        "handle_pair_trades_verification",
+        "kraken_ohlc",
+        "kraken_ohlc_enqueue",
+        "kraken_ohlc_worker",
+        "verify_trades_chunks",
+    ],
+    "metadata": [
+        "catalog_filepath",
+        "pair_range_metadata",
+        "read_metadata",
+        "update_pair_metadata",
+        "write_metadata",
+    ],
+    "native": [
+        "download_native_ohlc",
+        "is_native_ohlc_supported",
+        "native_ohlc_mismatches",
+    ],
+    "ohlc": [
+        "adjust_ohlc_frequency_dates",
+        "anchored_complete_bars_bounds",
+        "bar_boundaries",
+        "check_trades_ohlc_start_end_dates",
+        "complete_bars_bounds",
+        "fill_ohlc_gaps",
+        "finalized_bars",
+        "frequency_timedelta",
+        "is_anchored",
+        "last_final_bar_date",
+        "merge_partial_ohlc",
+        "pandas_to_kraken_ohlc_frequencies",
+        "partial_ohlc_to_ohlc",
+        "trades_to_ohlc",
+        "trades_to_partial_ohlc",
+        "trim_incomplete_bars",
+    ],
+    "profiling": ["StageProfiler"],
+    "ratelimit": ["AdaptiveRateLimiter", "KrakenApiEndpoint", "send_public_request"],
+    "replay": [
+        "ReplayData",
+        "ReplayServer",
+        "cassette_replay_data",
+        "synthetic_trades",
+    ],
+    "runhistory": [
+        "RunStats",
+        "append_run_history",
+        "read_run_history",
+        "run_regressions",
+    ],
+    "scheduling": [
+        "RunDeadline",
+        "estimated_trade_counts",
+        "pair_priority",
+        "schedule_pairs",
+    ],
+    "spill": ["ChunkedOHLC", "memory_budget_rows", "regroup_trades"],
+    "tradecache": ["download_trades_cached", "trade_cache_days", "uncached_ranges"],
+    "trades": [
+        "datetime_as_utc_unix",
+        "download_trades",
+        "iter_trades_pages",
+        "trades_as_dataframe",
+    ],
+    "universe": [
+        "asset_pairs_frame",
+        "assets_mask",
+        "cached_asset_pairs",
+        "pairs_mask",
+        "select_pairs",
+    ],
+    "verification": ["gaps_without_trades", "repair_trades", "verify_trades"],
+    "windows": ["ohlc_windows", "period_windows"],
+    "workqueue": [
+        "JobHeartbeat",
+        "complete_job",
+        "connect_queue",
+        "enqueue_jobs",
+        "fail_job",
+        "heartbeat_job",
+        "lease_job",
+        "queue_status",
+    ],
+}
+__all__ = [name for names in SUBMODULES_OBJECTS.values() for name in names]
+
+
+def __getattr__(name: str) -> object:
+    """
+    Import the submodule of a public object on first access and return the object.
+
+    :param name: Object name as string.
+    :return: Requested object.
+    """
+    for submodule, names in SUBMODULES_OBJECTS.items():
+        if name in names:
+            return getattr(importlib.import_module(f".{submodule}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list:
+    """
+    List module attributes including public objects not imported yet.
+
+    :return: List of attribute names.
+    """
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,333 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .io import create_temporary_file
+from .ohlc import (fill_ohlc_gaps, is_anchored, merge_partial_ohlc,
+                   partial_ohlc_to_ohlc, trades_to_partial_ohlc)
+
+CACHE_FOLDER: str = "cache"
+# Increment when a change in OHLC aggregation changes generated bars, so cached
+# partial bars and generated OHLC files are computed again.
+OHLC_ENGINE_VERSION: int = 1
+# Trades are split in calendar chunks, a chunk of trades changed by a repair only
+# invalidates the partial bars of its own period.
+TRADES_CHUNK_FREQUENCY: str = "MS"
+# Trades columns aggregated in bars, other columns (e.g. miscellaneous, read as
+# missing values from CSV when empty) do not change cached partial bars.
+TRADES_DIGEST_COLUMNS: list[str] = ["price", "volume", "buy/sell", "market/limit"]
+
+
+def trades_chunks(df_trades: pd.DataFrame) -> list[pd.DataFrame]:
+    """
+    Split time sorted trades in chunks of trades by calendar period.
+
+    :param df_trades: Trades pandas DataFrame.
+    :return: List of trades pandas DataFrame chunks.
+    """
+    if df_trades.empty:
+        return []
+    boundaries = pd.date_range(
+        df_trades.index[0].normalize().replace(day=1),
+        df_trades.index[-1],
+        freq=TRADES_CHUNK_FREQUENCY,
+    )[1:]
+    positions = [0] + list(df_trades.index.searchsorted(boundaries)) + [len(df_trades)]
+    return [
+        df_trades.iloc[start:end]
+        for start, end in zip(positions[:-1], positions[1:])
+        if end > start
+    ]
+
+
+def trades_chunk_digest(df_chunk: pd.DataFrame) -> str:
+    """
+    Compute the digest of a chunk of trades from its dates and values of columns
+    aggregated in bars, so that trades read from CSV have the digest of the same
+    downloaded trades.
+
+    :param df_chunk: Trades pandas DataFrame chunk.
+    :return: Hexadecimal digest as string.
+    """
+    columns = [column for column in TRADES_DIGEST_COLUMNS if column in df_chunk]
+    digest = hashlib.sha256(json.dumps(columns).encode())
+    digest.update(pd.util.hash_pandas_object(df_chunk[columns], index=True).to_numpy())
+    return digest.hexdigest()
+
+
+def cache_key(*parameters) -> str:
+    """
+    Compute a cache key from parameters with the OHLC engine version.
+
+    :param parameters: Parameters serializable as JSON.
+    :return: Hexadecimal cache key as string.
+    """
+    parameters = [OHLC_ENGINE_VERSION] + list(parameters)
+    return hashlib.sha256(json.dumps(parameters, default=str).encode()).hexdigest()
+
+
+def partial_ohlc_cache_filepath(cache_folder_path: str, key: str) -> str:
+    """
+    Generate the file path of cached partial bars for a cache key.
+
+    :param cache_folder_path: Cache folder path as string.
+    :param key: Cache key as string.
+    :return: Cached partial bars file path as string.
+    """
+    return f"{cache_folder_path}/partial_ohlc/{key[:2]}/{key}.npz"
+
+
+def write_partial_ohlc(df_partial: pd.DataFrame, filepath: str) -> None:
+    """
+    Save partial bars as numpy arrays, replacing the file atomically.
+
+    :param df_partial: Partial OHLC DataFrame.
+    :param filepath: Partial bars file path as string.
+    :return: None
+    """
+    Path(filepath).parent.mkdir(parents=True, exist_ok=True)
+    temporary_filepath = create_temporary_file(filepath)
+    with open(temporary_filepath, "wb") as stream:
+        np.savez(
+            stream,
+            index=df_partial.index.to_numpy(),
+            index_name=np.array(df_partial.index.name or ""),
+            columns=np.array(df_partial.columns, dtype=str),
+            **{
+                f"column_{i}": df_partial[column].to_numpy()
+                for i, column in enumerate(df_partial.columns)
+            },
+        )
+    os.replace(temporary_filepath, filepath)
+
+
+def read_partial_ohlc(filepath: str) -> pd.DataFrame:
+    """
+    Read partial bars saved as numpy arrays. Objects are not loaded, so a cache
+    folder shared with other users can't execute code.
+
+    :param filepath: Partial bars file path as string.
+    :return: Partial OHLC DataFrame.
+    """
+    with np.load(filepath, allow_pickle=False) as data:
+        return pd.DataFrame(
+            {
+                column: data[f"column_{i}"]
+                for i, column in enumerate(data["columns"].tolist())
+            },
+            index=pd.DatetimeIndex(data["index"], name=str(data["index_name"]) or None),
+        )
+
+
+def output_key_filepath(cache_folder_path: str, filepath: str) -> str:
+    """
+    Generate the file path of the recorded key of a generated file.
+
+    :param cache_folder_path: Cache folder path as string.
+    :param filepath: Generated file path relative to data folder as string.
+    :return: Recorded key file path as string.
+    """
+    return f"{cache_folder_path}/outputs/{filepath}.key"
+
+
+def read_output_keys(key_filepath: str) -> list[str]:
+    """
+    Read a recorded key file, the key of inputs used to generate a file followed
+    by the keys of partial bars it was generated from.
+
+    :param key_filepath: Recorded key file path as string.
+    :return: List of keys as string, empty if not recorded.
+    """
+    try:
+        with open(key_filepath, "r") as stream:
+            return stream.read().split()
+    except FileNotFoundError:
+        return []
+
+
+def read_output_key(cache_folder_path: str, filepath: str) -> str:
+    """
+    Read the key of inputs used to generate a file.
+
+    :param cache_folder_path: Cache folder path as string.
+    :param filepath: Generated file path relative to data folder as string.
+    :return: Key as string, empty string if not recorded.
+    """
+    keys = read_output_keys(output_key_filepath(cache_folder_path, filepath))
+    return keys[0] if keys else ""
+
+
+def write_output_key(
+    cache_folder_path: str, filepath: str, key: str, partial_keys: list[str] = None
+) -> None:
+    """
+    Record the key of inputs used to generate a file, with the keys of partial
+    bars it was generated from so unused partial bars can be pruned.
+
+    :param cache_folder_path: Cache folder path as string.
+    :param filepath: Generated file path relative to data folder as string.
+    :param key: Key as string.
+    :param partial_keys: Keys of partial bars as string.
+    :return: None
+    """
+    key_filepath = output_key_filepath(cache_folder_path, filepath)
+    Path(key_filepath).parent.mkdir(parents=True, exist_ok=True)
+    temporary_filepath = create_temporary_file(key_filepath)
+    with open(temporary_filepath, "w") as stream:
+        stream.write("\n".join([key] + (partial_keys or [])))
+    os.replace(temporary_filepath, key_filepath)
+
+
+def prune_ohlc_cache(data_folder_path: str) -> int:
+    """
+    Remove recorded keys of files no longer in the data folder, e.g. merged by
+    compaction, and cached partial bars used by no recorded file.
+
+    :param data_folder_path: Data folder path as string.
+    :return: Number of removed partial bars files.
+    """
+    cache_folder_path = f"{data_folder_path}/{CACHE_FOLDER}"
+    outputs_folder_path = f"{cache_folder_path}/outputs"
+    used_keys = set()
+    for dirpath, _, filenames in os.walk(outputs_folder_path):
+        for filename in filenames:
+            key_filepath = f"{dirpath}/{filename}"
+            filepath, extension = os.path.splitext(
+                os.path.relpath(key_filepath, outputs_folder_path)
+            )
+            if extension != ".key":
+                continue
+            if os.path.exists(f"{data_folder_path}/{filepath}"):
+                used_keys.update(read_output_keys(key_filepath)[1:])
+            else:
+                os.remove(key_filepath)
+    removed = 0
+    for dirpath, _, filenames in os.walk(f"{cache_folder_path}/partial_ohlc"):
+        for filename in filenames:
+            key, extension = os.path.splitext(filename)
+            # Files of interrupted writes and pickle files of previous versions too
+            if extension != ".npz" or key not in used_keys:
+                os.remove(f"{dirpath}/{filename}")
+                removed += 1
+    return removed
+
+
+def partial_ohlc_keys(
+    chunks: list[pd.DataFrame],
+    frequency: str,
+    volume_in_quote_asset: bool,
+    statistics: list = None,
+    anchoring: dict = None,
+) -> list[str]:
+    """
+    Compute the cache keys of partial bars of trades chunks, from trades chunk
+    digest and aggregation parameters.
+
+    :param chunks: List of trades pandas DataFrame chunks.
+    :param frequency: Frequency to resample in String.
+    :param volume_in_quote_asset: If volume is aggregated in quote asset or not.
+    :param statistics: List of additional statistics to compute per bar.
+    :param anchoring: Bars time zone, day start and week start as dict, None for
+        default anchoring.
+    :return: List of cache keys as string.
+    """
+    # Default anchoring keeps keys of partial bars cached before anchoring
+    anchoring_parameters = [anchoring] if is_anchored(anchoring) else []
+    return [
+        cache_key(
+            trades_chunk_digest(df_chunk),
+            frequency,
+            volume_in_quote_asset,
+            statistics or [],
+            *anchoring_parameters,
+        )
+        for df_chunk in chunks
+    ]
+
+
+def cached_partial_ohlc(
+    df_chunk: pd.DataFrame,
+    key: str,
+    cache_folder_path: str,
+    frequency: str,
+    volume_in_quote_asset: bool,
+    statistics: list = None,
+    anchoring: dict = None,
+) -> pd.DataFrame:
+    """
+    Read partial bars of a chunk of trades from cache, compute and cache them if
+    not cached yet.
+
+    :param df_chunk: Trades pandas DataFrame chunk.
+    :param key: Cache key of partial bars.
+    :param cache_folder_path: Cache folder path as string.
+    :param frequency: Frequency to resample in String.
+    :param volume_in_quote_asset: If volume is aggregated in quote asset or not.
+    :param statistics: List of additional statistics to compute per bar.
+    :param anchoring: Bars time zone, day start and week start as dict, None for
+        default anchoring.
+    :return: Partial OHLC DataFrame with trade times.
+    """
+    filepath = partial_ohlc_cache_filepath(cache_folder_path, key)
+    try:
+        return read_partial_ohlc(filepath)
+    except FileNotFoundError:
+        pass
+    df_partial = trades_to_partial_ohlc(
+        df_chunk,
+        frequency,
+        volume_in_quote_asset,
+        statistics,
+        trade_times=True,
+        anchoring=anchoring,
+    )
+    write_partial_ohlc(df_partial, filepath)
+    return df_partial
+
+
+def trades_to_ohlc_cached(
+    chunks: list[pd.DataFrame],
+    keys: list[str],
+    cache_folder_path: str,
+    frequency: str,
+    volume_in_quote_asset: bool,
+    fill_policy: str = "nan",
+    statistics: list = None,
+    anchoring: dict = None,
+) -> pd.DataFrame:
+    """
+    Convert trades chunks to OHLC like trades_to_ohlc, only partial bars of
+    chunks not cached yet are computed. Bars overlapping two chunks are merged.
+
+    :param chunks: Non empty list of time sorted trades pandas DataFrame chunks.
+    :param keys: Cache keys of chunks partial bars.
+    :param cache_folder_path: Cache folder path as string.
+    :param frequency: Frequency to resample in String.
+    :param volume_in_quote_asset: If volume is aggregated in quote asset or not.
+    :param fill_policy: Policy applied to bars without trades (nan, ffill or drop).
+    :param statistics: List of additional statistics to compute per bar.
+    :param anchoring: Bars time zone, day start and week start as dict, None for
+        default anchoring.
+    :return: OHLC DataFrame in specified frequency.
+    """
+    partials = [
+        cached_partial_ohlc(
+            df_chunk,
+            key,
+            cache_folder_path,
+            frequency,
+            volume_in_quote_asset,
+            statistics,
+            anchoring,
+        )
+        for df_chunk, key in zip(chunks, keys)
+    ]
+    df_ohlc = partials[0]
+    if len(partials) > 1:
+        df_ohlc = merge_partial_ohlc(pd.concat(partials[:-1]), partials[-1])
+    df_ohlc = partial_ohlc_to_ohlc(df_ohlc, frequency, statistics, anchoring)
+    return fill_ohlc_gaps(df_ohlc, fill_policy)
@@ -0,0 +1,538 @@
+import argparse
+import datetime
+import functools
+import json
+import logging
+import os
+import sys
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from .metadata import read_metadata
+
+logger: logging.Logger = logging.getLogger(__name__)
+COMMANDS: list[str] = [
+    "download",
+    "aggregate",
+    "status",
+    "verify",
+    "serve",
+    "enqueue",
+    "worker",
+    "queue",
+    "replay",
+    "compact",
+    "report",
+]
+
+
+def download_command(args: argparse.Namespace) -> int:
+    """
+    Download missing trades and generate OHLC for configured pairs.
+
+    :param args: Parsed command line arguments.
+    :return: Exit code.
+    """
+    from .krakenohlc import kraken_ohlc
+
+    kraken_ohlc(args.data, args.config, profile=args.profile)
+    return 0
+
+
+def aggregate_command(args: argparse.Namespace) -> int:
+    """
+    Generate OHLC for configured pairs from saved trades only.
+
+    :param args: Parsed command line arguments.
+    :return: Exit code.
+    """
+    from .krakenohlc import kraken_ohlc
+
+    kraken_ohlc(args.data, args.config, download=False, profile=args.profile)
+    return 0
+
+
+def enqueue_command(args: argparse.Namespace) -> int:
+    """
+    Add a job per configured pair and dates range to the data folder work queue.
+
+    :param args: Parsed command line arguments.
+    :return: Exit code.
+    """
+    from .krakenohlc import kraken_ohlc_enqueue
+
+    added_jobs = kraken_ohlc_enqueue(args.data, args.config, args.range_days)
+    print(f"{added_jobs} jobs added to the work queue.")
+    return 0
+
+
+def worker_command(args: argparse.Namespace) -> int:
+    """
+    Process jobs of the data folder work queue until no job is left.
+
+    :param args: Parsed command line arguments.
+    :return: Exit code.
+    """
+    from .krakenohlc import kraken_ohlc_worker
+
+    completed_jobs = kraken_ohlc_worker(
+        args.data, args.config, args.worker_id, args.lease_duration, args.profile
+    )
+    print(f"{completed_jobs} jobs completed.")
+    return 0
+
+
+def queue_command(args: argparse.Namespace) -> int:
+    """
+    Print the number of jobs of the data folder work queue by status.
+
+    :param args: Parsed command line arguments.
+    :return: Exit code, 1 if jobs failed.
+    """
+    from .workqueue import connect_queue, queue_status
+
+    connection = connect_queue(args.data)
+    try:
+        status = queue_status(connection)
+    finally:
+        connection.close()
+    print(", ".join(f"{count} {name}" for name, count in status.items()))
+    return 1 if status["failed"] else 0
+
+
+def status_command(args: argparse.Namespace) -> int:
+    """
+    Print the data folder status from metadata saved by previous runs, without
+    importing pandas or requesting Kraken API.
+
+    :param args: Parsed command line arguments.
+    :return: Exit code.
+    """
+    metadata = read_metadata(args.data)
+    if args.json:
+        print(json.dumps(metadata, indent=2))
+        return 0
+    last_run = metadata.get("last_run")
+    if not last_run:
+        print(f"No run recorded in {args.data}.")
+        return 0
+    print(
+        f"Last run: started at {last_run.get('started_at')}, finished at "
+        f"{last_run.get('finished_at', 'not finished')}, "
+        f"{last_run.get('pairs')} pairs ({last_run.get('config_file')})."
+    )
+    for pair, pair_ranges in sorted(metadata["pairs"].items()):
+        for pair_range in pair_ranges:
+            frequencies = [
+                frequency
+                for frequency, filepath in pair_range["ohlc_filepaths"].items()
+                if filepath
+            ]
+            windows = len(pair_range.get("windows", []))
+            print(
+                f"{pair}: {pair_range['trade_count']} trades from "
+                f"{pair_range['start_datetime']} to {pair_range['end_datetime']}, "
+                f"OHLC: {', '.join(frequencies) or 'none'}"
+                f"{f', {windows} windows' if windows else ''}."
+            )
+    return 0
+
+
+def verify_command(args: argparse.Namespace) -> int:
+    """
+    Verify files recorded in metadata exist in data folder and, if requested, saved
+    trade history integrity.
+
+    :param args: Parsed command line arguments.
+    :return: Exit code, 1 if files are missing or trades have issues.
+    """
+    metadata = read_metadata(args.data)
+    missing_filepaths = list()
+    invalid_pairs = list()
+    for pair, pair_ranges in metadata["pairs"].items():
+        for pair_range in pair_ranges:
+            # Trade history is not recorded once removed by compaction retention or
+            # if OHLC was downloaded as native bars
+            filepaths = [pair_range["trades_filepath"]]
+            filepaths += pair_range["ohlc_filepaths"].values()
+            for window in pair_range.get("windows", []):
+                filepaths += window["ohlc_filepaths"].values()
+            filepaths = [i for i in filepaths if i]
+            missing_filepaths += [
+                filepath
+                for filepath in filepaths
+                if not os.path.exists(f"{args.data}/{filepath}")
+                and filepath not in missing_filepaths
+            ]
+            trades_filepath = f"{args.data}/{pair_range['trades_filepath']}"
+            if (
+                args.trades
+                and pair_range["trades_filepath"]
+                and os.path.exists(trades_filepath)
+                and not verify_trades_command(pair, trades_filepath)
+                and pair not in invalid_pairs
+            ):
+                invalid_pairs.append(pair)
+    for filepath in missing_filepaths:
+        print(f"Missing file: {filepath}")
+    print(
+        f"{len(metadata['pairs'])} pairs verified, "
+        f"{len(missing_filepaths)} missing files."
+    )
+    if args.trades:
+        print(f"{len(invalid_pairs)} pairs with trade history issues.")
+    return 1 if missing_filepaths or invalid_pairs else 0
+
+
+def report_command(args: argparse.Namespace) -> int:
+    """
+    Compare resource usage and throughput of the last run to the median of
+    previous runs and print regressions and slowest pairs.
+
+    :param args: Parsed command line arguments.
+    :return: Exit code, 1 if the last run regressed.
+    """
+    from .runhistory import read_run_history, run_regressions
+
+    history = read_run_history(args.data)
+    if not history:
+        print(f"No run recorded in {args.data}.")
+        return 0
+    latest = history[-1]
+    mode = "download" if latest["download"] else "aggregate"
+    print(
+        f"Last run: started at {latest['started_at']}, {latest['pairs']} pairs, "
+        f"{latest['trade_count']} trades, {latest['bar_count']} bars "
+        f"({latest['config_file']}, {mode})."
+    )
+    comparisons = run_regressions(history, args.runs, args.tolerance)
+    if not comparisons:
+        print("No previous run with the same configuration to compare to.")
+    for comparison in comparisons:
+        print(
+            f"{comparison['metric']}: {comparison['latest']} (median "
+            f"{comparison['median']}, {comparison['change']:+.0%})"
+            f"{' REGRESSION' if comparison['regression'] else ''}"
+        )
+    for outlier in latest["outliers"]:
+        print(
+            f"Slow pair {outlier['pair']}: {outlier['seconds']}s for "
+            f"{outlier['trade_count']} trades."
+        )
+    return 1 if any(i["regression"] for i in comparisons) else 0
+
+
+def verify_trades_command(pair: str, trades_filepath: str) -> bool:
+    """
+    Verify saved trade history integrity and print found issues.
+
+    :param pair: Pair of trades.
+    :param trades_filepath: Trade history file path as string.
+    :return: True if trades have no issue, False otherwise.
+    """
+    from .io import read_csv
+    from .verification import is_trades_report_valid, verify_trades
+
+    report = verify_trades(read_csv(trades_filepath, "trades"))
+    for gap_start, gap_end in report["gaps"]:
+        print(f"{pair}: Suspicious gap from {gap_start} to {gap_end}")
+    if report["duplicates"] or report["time_regressions"]:
+        print(
+            f"{pair}: {report['duplicates']} duplicated trades and "
+            f"{report['time_regressions']} time regressions"
+        )
+    return is_trades_report_valid(report)
+
+
+class DataRequestHandler(SimpleHTTPRequestHandler):
+    """
+    Serve data folder files and metadata as JSON on /status path.
+    """
+
+    def do_GET(self) -> None:
+        """
+        Answer GET requests.
+
+        :return: None
+        """
+        if self.path.rstrip("/") == "/status":
+            body = json.dumps(read_metadata(self.directory)).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            super().do_GET()
+
+
+def serve_command(args: argparse.Namespace) -> int:
+    """
+    Serve data folder files and status over HTTP until interrupted.
+
+    :param args: Parsed command line arguments.
+    :return: Exit code.
+    """
+    handler = functools.partial(DataRequestHandler, directory=args.data)
+    with ThreadingHTTPServer((args.host, args.port), handler) as server:
+        logger.info(f"Serving {args.data} on http://{args.host}:{args.port}.")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+def compact_command(args: argparse.Namespace) -> int:
+    """
+    Merge consecutive data folder files in compressed partitions and drop trade
+    history older than the retention window.
+
+    :param args: Parsed command line arguments.
+    :return: Exit code.
+    """
+    from .compaction import compact_data_folder
+
+    result = compact_data_folder(
+        args.data,
+        args.max_partition_days,
+        None if args.compression == "none" else args.compression,
+        args.trades_retention_days,
+    )
+    print(
+        f"{result['partitions']} partitions written, "
+        f"{result['removed_files']} files removed."
+    )
+    return 0
+
+
+def replay_command(args: argparse.Namespace) -> int:
+    """
+    Serve a local stand-in of the Kraken API public methods until interrupted.
+
+    :param args: Parsed command line arguments.
+    :return: Exit code.
+    """
+    from .replay import (ReplayData, ReplayServer, cassette_replay_data,
+                         synthetic_trades)
+
+    replay_data = cassette_replay_data(args.cassette) if args.cassette else ReplayData()
+    start = datetime.datetime.fromisoformat(args.start).replace(
+        tzinfo=datetime.timezone.utc
+    )
+    end = datetime.datetime.fromisoformat(args.end).replace(
+        tzinfo=datetime.timezone.utc
+    )
+    for seed, pair in enumerate(args.pairs or []):
+        replay_data.add_trades(
+            pair,
+            synthetic_trades(
+                start.timestamp(), end.timestamp(), args.trades_per_hour, seed
+            ),
+        )
+    with ReplayServer(
+        replay_data,
+        args.host,
+        args.port,
+        args.latency,
+        args.page_size,
+        args.error_rate,
+    ) as server:
+        logger.info(
+            f"Replaying Kraken API with {len(replay_data.asset_pairs)} pairs on "
+            f"{server.url}."
+        )
+        try:
+            server.thread.join()
+        except KeyboardInterrupt:
+            pass
+        logger.info(f"Replay server metrics {server.metrics()}.")
+    return 0
+
+
+def parse_arguments(argv: list = None) -> argparse.Namespace:
+    """
+    Parse command line arguments, download command is used if none is passed.
+
+    :param argv: Command line arguments, sys.argv if None.
+    :return: Parsed arguments.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS + ["-h", "--help"]:
+        argv = ["download"] + list(argv)
+    common_parser = argparse.ArgumentParser(add_help=False)
+    common_parser.add_argument(
+        "--data", default="data", help="Data folder path (default: data)."
+    )
+    config_parser = argparse.ArgumentParser(add_help=False)
+    config_parser.add_argument(
+        "--config",
+        default="config.yaml",
+        help="Configuration file path (default: config.yaml).",
+    )
+    profile_parser = argparse.ArgumentParser(add_help=False)
+    profile_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile pipeline stages and save profiles in the data folder.",
+    )
+    parser = argparse.ArgumentParser(
+        prog="kraken-ohlc",
+        description="Download Kraken trades and aggregate them as OHLC.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser(
+        "download",
+        parents=[common_parser, config_parser, profile_parser],
+        help="Download trades and generate OHLC (default command).",
+    ).set_defaults(function=download_command)
+    subparsers.add_parser(
+        "aggregate",
+        parents=[common_parser, config_parser, profile_parser],
+        help="Generate OHLC from saved trades without downloading.",
+    ).set_defaults(function=aggregate_command)
+    status_parser = subparsers.add_parser(
+        "status", parents=[common_parser], help="Show data folder status."
+    )
+    status_parser.add_argument(
+        "--json", action="store_true", help="Print metadata as JSON."
+    )
+    status_parser.set_defaults(function=status_command)
+    verify_parser = subparsers.add_parser(
+        "verify", parents=[common_parser], help="Verify saved files."
+    )
+    verify_parser.add_argument(
+        "--trades",
+        action="store_true",
+        help="Verify saved trade history integrity (duplicates and gaps).",
+    )
+    verify_parser.set_defaults(function=verify_command)
+    enqueue_parser = subparsers.add_parser(
+        "enqueue",
+        parents=[common_parser, config_parser],
+        help="Add a job per pair and dates range to the work queue.",
+    )
+    enqueue_parser.add_argument(
+        "--range-days", type=int, help="Number of days per job (default: all dates)."
+    )
+    enqueue_parser.set_defaults(function=enqueue_command)
+    worker_parser = subparsers.add_parser(
+        "worker",
+        parents=[common_parser, config_parser, profile_parser],
+        help="Process work queue jobs until no job is left.",
+    )
+    worker_parser.add_argument(
+        "--worker-id", help="Worker identifier (default: host name and process id)."
+    )
+    worker_parser.add_argument(
+        "--lease-duration",
+        type=float,
+        default=300.0,
+        help="Job lease duration in seconds (default: 300).",
+    )
+    worker_parser.set_defaults(function=worker_command)
+    subparsers.add_parser(
+        "queue", parents=[common_parser], help="Show work queue jobs by status."
+    ).set_defaults(function=queue_command)
+    serve_parser = subparsers.add_parser(
+        "serve", parents=[common_parser], help="Serve data folder over HTTP."
+    )
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Listen address.")
+    serve_parser.add_argument("--port", type=int, default=8000, help="Listen port.")
+    serve_parser.set_defaults(function=serve_command)
+    compact_parser = subparsers.add_parser(
+        "compact",
+        parents=[common_parser],
+        help="Merge consecutive files in compressed partitions.",
+    )
+    compact_parser.add_argument(
+        "--max-partition-days",
+        type=int,
+        default=366,
+        help="Maximum number of days covered by a partition (default: 366).",
+    )
+    compact_parser.add_argument(
+        "--compression",
+        choices=["gzip", "zstd", "none"],
+        default="gzip",
+        help="Partitions compression (default: gzip).",
+    )
+    compact_parser.add_argument(
+        "--trades-retention-days",
+        type=int,
+        help="Remove trade history ended before this number of days once verified "
+        "against its 1 minute OHLC (default: keep trade history).",
+    )
+    compact_parser.set_defaults(function=compact_command)
+    report_parser = subparsers.add_parser(
+        "report",
+        parents=[common_parser],
+        help="Compare the last run resource usage and throughput to previous runs.",
+    )
+    report_parser.add_argument(
+        "--runs",
+        type=int,
+        default=10,
+        help="Number of previous runs of the median (default: 10).",
+    )
+    report_parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Relative change to the median flagged as a regression (default: 0.25).",
+    )
+    report_parser.set_defaults(function=report_command)
+    replay_parser = subparsers.add_parser(
+        "replay", help="Serve a local stand-in of the Kraken API public methods."
+    )
+    replay_parser.add_argument("--host", default="127.0.0.1", help="Listen address.")
+    replay_parser.add_argument("--port", type=int, default=8001, help="Listen port.")
+    replay_parser.add_argument(
+        "--cassette", help="VCR cassette file of recorded Kraken API responses."
+    )
+    replay_parser.add_argument(
+        "--pairs", nargs="+", help="Pairs to serve with synthetic trades."
+    )
+    replay_parser.add_argument(
+        "--start", default="2021-01-01", help="Synthetic trades start date."
+    )
+    replay_parser.add_argument(
+        "--end", default="2021-02-01", help="Synthetic trades end date."
+    )
+    replay_parser.add_argument(
+        "--trades-per-hour",
+        type=float,
+        default=60.0,
+        help="Average number of synthetic trades per hour (default: 60).",
+    )
+    replay_parser.add_argument(
+        "--latency", type=float, default=0.0, help="Response delay in seconds."
+    )
+    replay_parser.add_argument(
+        "--page-size",
+        type=int,
+        default=1000,
+        help="Maximum number of trades per Trades response (default: 1000).",
+    )
+    replay_parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="Share of requests answered by a rate limit error (default: 0).",
+    )
+    replay_parser.set_defaults(function=replay_command)
+    return parser.parse_args(argv)
+
+
+def main(argv: list = None) -> int:
+    """
+    Command line entry point.
+
+    :param argv: Command line arguments, sys.argv if None.
+    :return: Exit code.
+    """
+    logging.basicConfig(
+        format="%(asctime)s - %(levelname)s:%(name)s: %(message)s",
+        level=logging.INFO,
+    )
+    args = parse_arguments(argv)
+    return args.function(args)
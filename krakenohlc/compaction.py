@@ -0,0 +1,363 @@
+import datetime
+import logging
+import os
+import re
+from itertools import chain
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .io import CSV_COMPRESSIONS, read_csv, write_csv
+from .metadata import read_metadata, write_metadata
+from .ohlc import trades_to_ohlc
+
+logger: logging.Logger = logging.getLogger(__name__)
+DATA_FOLDERS: dict[str, str] = {"trade_history": "trades", "ohlc": "ohlc"}
+# Pair, start and end dates, frequency and quote volume suffix and compression
+# of files named by define_filepath.
+DATA_FILENAME_PATTERN: re.Pattern = re.compile(
+    r"^(?P<pair>[^_]+)_(?P<start>\d{4}-\d{2}-\d{2}T\d{2}-\d{2}-\d{2})_"
+    r"(?P<end>\d{4}-\d{2}-\d{2}T\d{2}-\d{2}-\d{2})(?P<suffix>_[^.]+)?\.csv"
+    r"(?P<extension>\.gz|\.zst)?$"
+)
+PATH_DATE_FORMAT: str = "%Y-%m-%dT%H-%M-%S"
+MAX_PARTITION_DAYS: int = 366
+# Frequency and quote volume suffix of OHLC files named by define_filepath.
+OHLC_SUFFIX_PATTERN: re.Pattern = re.compile(
+    r"^_(?P<count>\d+)(?P<unit>[MHDW])(?:_quote)?$"
+)
+OHLC_FREQUENCY_UNITS: dict[str, pd.Timedelta] = {
+    "M": pd.Timedelta(minutes=1),
+    "H": pd.Timedelta(hours=1),
+    "D": pd.Timedelta(days=1),
+    "W": pd.Timedelta(weeks=1),
+}
+# With default anchoring, weekly bars start on Monday and other bars are
+# resampled from the unix epoch.
+EPOCH: pd.Timestamp = pd.Timestamp("1970-01-01")
+WEEKLY_BARS_ORIGIN: pd.Timestamp = pd.Timestamp("1970-01-05")
+
+
+def parse_data_filepath(filepath: str) -> Optional[dict]:
+    """
+    Parse a trade history or OHLC file path relative to data folder.
+
+    :param filepath: File path relative to data folder as string.
+    :return: File pair, dates, suffix and compression as dict, None if the file
+        is not a data file.
+    """
+    folder, _, filename = filepath.rpartition("/")
+    match = DATA_FILENAME_PATTERN.match(filename)
+    if folder not in DATA_FOLDERS or match is None:
+        return None
+    return {
+        "filepath": filepath,
+        "folder": folder,
+        "pair": match["pair"],
+        "start_datetime": datetime.datetime.strptime(match["start"], PATH_DATE_FORMAT),
+        "end_datetime": datetime.datetime.strptime(match["end"], PATH_DATE_FORMAT),
+        "suffix": match["suffix"] or "",
+        "compression": next(
+            (
+                compression
+                for compression, extension in CSV_COMPRESSIONS.items()
+                if extension == match["extension"]
+            ),
+            None,
+        ),
+    }
+
+
+def ohlc_bar_grid(suffix: str) -> Optional[tuple[pd.Timestamp, pd.Timedelta]]:
+    """
+    Get the origin and duration of bars of an OHLC file with default anchoring
+    from its file name suffix.
+
+    :param suffix: Data file frequency and quote volume suffix as string.
+    :return: Bars origin and duration, None if not an OHLC file suffix.
+    """
+    match = OHLC_SUFFIX_PATTERN.match(suffix)
+    if match is None:
+        return None
+    origin = WEEKLY_BARS_ORIGIN if match["unit"] == "W" else EPOCH
+    return origin, int(match["count"]) * OHLC_FREQUENCY_UNITS[match["unit"]]
+
+
+def is_mergeable_start(file: dict) -> bool:
+    """
+    Check no bar of a data file can start before its start date, so that the file
+    can be merged with the file ending at its start date. Bars crossing the
+    start date are removed from both files as incomplete.
+
+    :param file: Parsed data file as dict.
+    :return: True for trade history files and OHLC files starting at a bar start,
+        False otherwise.
+    """
+    if file["folder"] != "ohlc":
+        return True
+    grid = ohlc_bar_grid(file["suffix"])
+    if grid is None:
+        return False
+    origin, duration = grid
+    return (pd.Timestamp(file["start_datetime"]) - origin) % duration == pd.Timedelta(0)
+
+
+def data_files(data_folder_path: str) -> list[dict]:
+    """
+    List trade history and OHLC files of a data folder sorted by pair, suffix and
+    dates.
+
+    :param data_folder_path: Data folder path as string.
+    :return: List of parsed data files as dict.
+    """
+    files = list()
+    for folder in DATA_FOLDERS:
+        try:
+            filenames = os.listdir(f"{data_folder_path}/{folder}")
+        except FileNotFoundError:
+            continue
+        files += filter(None, (parse_data_filepath(f"{folder}/{i}") for i in filenames))
+    return sorted(
+        files,
+        key=lambda i: (
+            i["folder"],
+            i["pair"],
+            i["suffix"],
+            i["start_datetime"],
+            -i["end_datetime"].timestamp(),
+        ),
+    )
+
+
+def partition_filepath(
+    file: dict,
+    start_datetime: datetime.datetime,
+    end_datetime: datetime.datetime,
+    compression: str = None,
+) -> str:
+    """
+    Generate the file path of a partition merging files like a data file.
+
+    :param file: Parsed data file as dict.
+    :param start_datetime: Partition start date.
+    :param end_datetime: Partition end date.
+    :param compression: CSV compression (gzip or zstd), None if not compressed.
+    :return: Partition file path relative to data folder as string.
+    """
+    filepath = (
+        f"{file['folder']}/{file['pair']}_{start_datetime:{PATH_DATE_FORMAT}}_"
+        f"{end_datetime:{PATH_DATE_FORMAT}}{file['suffix']}.csv"
+    )
+    return filepath + CSV_COMPRESSIONS[compression] if compression else filepath
+
+
+def compaction_partitions(
+    files: list[dict], max_partition_days: int = MAX_PARTITION_DAYS
+) -> tuple[list[list[dict]], list[dict]]:
+    """
+    Group consecutive data files of a pair and suffix in partitions, a file
+    starting at the end date of the previous one being merged with it as long as
+    the partition covers at most the maximum number of days. OHLC files are only
+    merged at dates aligned with their bars. Files covered by another file, like
+    files already merged by an interrupted compaction, are obsolete.
+
+    :param files: Parsed data files sorted by data_files.
+    :param max_partition_days: Maximum number of days covered by a partition.
+    :return: Partitions of at least two files and obsolete files.
+    """
+    max_partition_duration = datetime.timedelta(days=max_partition_days)
+    partitions = list()
+    obsolete_files = list()
+    partition = list()
+    for file in files:
+        previous = partition[-1] if partition else None
+        same_data = previous is not None and all(
+            previous[key] == file[key] for key in ["folder", "pair", "suffix"]
+        )
+        if same_data and file["end_datetime"] <= previous["end_datetime"]:
+            obsolete_files.append(file)
+            continue
+        if (
+            same_data
+            and file["start_datetime"] == previous["end_datetime"]
+            and file["end_datetime"] - partition[0]["start_datetime"]
+            <= max_partition_duration
+            and is_mergeable_start(file)
+        ):
+            partition.append(file)
+            continue
+        if len(partition) > 1:
+            partitions.append(partition)
+        partition = [file]
+    if len(partition) > 1:
+        partitions.append(partition)
+    return partitions, obsolete_files
+
+
+def merge_partition(
+    data_folder_path: str, partition: list[dict], compression: str = None
+) -> Optional[str]:
+    """
+    Merge files of a partition in a single file, written atomically. OHLC files
+    with bars not aligned with default anchoring, like bars of another time zone,
+    are not merged as bars crossing files dates are missing.
+
+    :param data_folder_path: Data folder path as string.
+    :param partition: Consecutive parsed data files.
+    :param compression: CSV compression (gzip or zstd), None if not compressed.
+    :return: Partition file path relative to data folder as string, None if not
+        merged.
+    """
+    schema = DATA_FOLDERS[partition[0]["folder"]]
+    df = pd.concat(
+        [read_csv(f"{data_folder_path}/{i['filepath']}", schema) for i in partition]
+    )
+    grid = ohlc_bar_grid(partition[0]["suffix"]) if schema == "ohlc" else None
+    if (
+        grid is not None
+        and ((df.index.asi8 - grid[0].value) % grid[1].value != 0).any()
+    ):
+        logger.warning(
+            f"{partition[0]['filepath']}: Bars not aligned with files dates, "
+            "files not merged."
+        )
+        return None
+    filepath = partition_filepath(
+        partition[0],
+        partition[0]["start_datetime"],
+        partition[-1]["end_datetime"],
+        compression,
+    )
+    write_csv(df, f"{data_folder_path}/{filepath}", compression=compression)
+    logger.info(f"Merged {len(partition)} files in {filepath}.")
+    return filepath
+
+
+def is_trades_file_verified(
+    data_folder_path: str, trades_file: dict, files: list[dict]
+) -> bool:
+    """
+    Check trades of a trade history file match 1 minute OHLC bars generated for
+    the same pair and dates, so that trades can be dropped.
+
+    :param data_folder_path: Data folder path as string.
+    :param trades_file: Parsed trade history file as dict.
+    :param files: Parsed data files.
+    :return: True if a 1 minute OHLC file matches trades, False otherwise.
+    """
+    ohlc_files = [
+        i
+        for i in files
+        if i["folder"] == "ohlc"
+        and i["pair"] == trades_file["pair"]
+        and i["suffix"] in ["_1M", "_1M_quote"]
+        and i["start_datetime"] == trades_file["start_datetime"]
+        and i["end_datetime"] == trades_file["end_datetime"]
+    ]
+    df_trades = read_csv(f"{data_folder_path}/{trades_file['filepath']}", "trades")
+    for ohlc_file in ohlc_files:
+        df_ohlc = read_csv(f"{data_folder_path}/{ohlc_file['filepath']}", "ohlc")
+        if df_ohlc.empty:
+            continue
+        df_ohlc_test = trades_to_ohlc(
+            df_trades, "1min", ohlc_file["suffix"].endswith("_quote"), "drop"
+        )
+        # Bars with trades of the OHLC file dates, empty bars are not compared
+        df_ohlc_test = df_ohlc_test[
+            (df_ohlc_test.index >= df_ohlc.index[0])
+            & (df_ohlc_test.index <= df_ohlc.index[-1])
+        ]
+        df_ohlc = df_ohlc.reindex(df_ohlc_test.index)
+        if all(
+            np.allclose(df_ohlc[column], df_ohlc_test[column], rtol=1e-6)
+            for column in ["open", "high", "low", "close", "volume"]
+        ):
+            return True
+    return False
+
+
+def compact_data_folder(
+    data_folder_path: str,
+    max_partition_days: int = MAX_PARTITION_DAYS,
+    compression: str = "gzip",
+    trades_retention_days: int = None,
+) -> dict:
+    """
+    Compact data folder files: drop trade history files ended before the
+    retention window once verified against their 1 minute OHLC bars, merge
+    consecutive files of a pair in compressed partitions and remove merged files.
+    Metadata is updated atomically with partition file paths before merged files
+    are removed, an interrupted compaction is completed by the next one.
+
+    :param data_folder_path: Data folder path as string.
+    :param max_partition_days: Maximum number of days covered by a partition.
+    :param compression: Partitions CSV compression (gzip or zstd), None if not
+        compressed.
+    :param trades_retention_days: Number of days trade history files are kept,
+        forever if None.
+    :return: Number of merged, written and removed files as dict.
+    """
+    files = data_files(data_folder_path)
+    replaced_filepaths = dict()
+    if trades_retention_days is not None:
+        retention_start = datetime.datetime.now(datetime.timezone.utc).replace(
+            tzinfo=None
+        ) - datetime.timedelta(days=trades_retention_days)
+        for file in files:
+            if (
+                file["folder"] == "trade_history"
+                and file["end_datetime"] <= retention_start
+            ):
+                if is_trades_file_verified(data_folder_path, file, files):
+                    replaced_filepaths[file["filepath"]] = None
+                else:
+                    logger.warning(
+                        f"{file['filepath']}: Trades kept, no matching 1 minute OHLC."
+                    )
+        files = [i for i in files if i["filepath"] not in replaced_filepaths]
+    partitions, obsolete_files = compaction_partitions(files, max_partition_days)
+    merged_partitions = 0
+    for partition in partitions:
+        filepath = merge_partition(data_folder_path, partition, compression)
+        if filepath is None:
+            continue
+        merged_partitions += 1
+        replaced_filepaths.update({i["filepath"]: filepath for i in partition})
+    for file in obsolete_files:
+        covering_filepath = next(
+            i["filepath"]
+            for i in files
+            if i is not file
+            and all(i[key] == file[key] for key in ["folder", "pair", "suffix"])
+            and i["start_datetime"] <= file["start_datetime"]
+            and i["end_datetime"] >= file["end_datetime"]
+        )
+        replaced_filepaths[file["filepath"]] = replaced_filepaths.get(
+            covering_filepath, covering_filepath
+        )
+
+    metadata = read_metadata(data_folder_path)
+    for pair_range in chain.from_iterable(metadata["pairs"].values()):
+        trades_filepath = pair_range["trades_filepath"]
+        pair_range["trades_filepath"] = replaced_filepaths.get(
+            trades_filepath, trades_filepath
+        )
+        pair_range["ohlc_filepaths"] = {
+            frequency: replaced_filepaths.get(filepath, filepath)
+            for frequency, filepath in pair_range["ohlc_filepaths"].items()
+        }
+        for window in pair_range.get("windows", []):
+            window["ohlc_filepaths"] = {
+                frequency: replaced_filepaths.get(filepath, filepath)
+                for frequency, filepath in window["ohlc_filepaths"].items()
+            }
+    metadata["last_compaction"] = {
+        "compacted_at": str(datetime.datetime.now(datetime.timezone.utc)),
+        "partitions": merged_partitions,
+        "removed_files": len(replaced_filepaths),
+    }
+    write_metadata(data_folder_path, metadata)
+    for filepath in replaced_filepaths:
+        os.remove(f"{data_folder_path}/{filepath}")
+    return metadata["last_compaction"]
@@ -1,13 +1,45 @@
 import datetime
+import importlib.util
 import logging
+import re
+from typing import Optional
 
+import pandas as pd
 import yaml
 from krakenapi import KrakenApi
 
-from .ohlc import pandas_to_kraken_ohlc_frequencies
+from .io import CSV_COMPRESSIONS, CSV_READ_ENGINES, DTYPE_BACKENDS
+from .ohlc import (BAR_ANCHORING_DEFAULTS, OHLC_FILL_POLICIES, OHLC_STATISTICS,
+                   WEEK_DAYS, pandas_to_kraken_ohlc_frequencies)
+from .profiling import PROFILE_STAGES, StageProfiler
+from .ratelimit import KRAKEN_API_URL, AdaptiveRateLimiter, KrakenApiEndpoint
+from .runhistory import RunStats
+from .scheduling import SCHEDULING_DEFAULTS
+from .universe import (ASSET_PAIRS_CACHE_DEFAULTS, asset_pairs_frame,
+                       assets_mask, cached_asset_pairs, select_pairs)
+from .windows import OUTPUT_WINDOWS_DEFAULTS, WINDOW_PERIODS, ohlc_windows
+from .workqueue import JobHeartbeat
 
 logger: logging.Logger = logging.getLogger(__name__)
 ERROR_PREFIX: str = "Configuration file incorrectly formatted:"
+API_RATE_LIMIT_DEFAULTS: dict = {
+    "initial_interval": 1.76,
+    "min_interval": 1.0,
+    "max_interval": 60,
+    "max_retries": 10,
+}
+PROFILING_DEFAULTS: dict = {
+    "enabled": False,
+    "stages": PROFILE_STAGES,
+    "pairs": [],
+    "top_functions": 20,
+}
+TRADE_VERIFICATION_DEFAULTS: dict = {
+    "enabled": False,
+    "gap_factor": 50,
+    "min_gap_minutes": 60,
+    "repair": False,
+}
 
 
 class Config:
@@ -21,9 +53,32 @@ class Config:
     save_trade_history_as_csv: bool
     download_all_associated_pairs: dict
     download_custom_pairs: list
+    asset_pairs_cache: dict
     ka: KrakenApi
     pairs: list
     ohlc_frequencies: list
+    ohlc_fill_policy: str
+    ohlc_statistics: list
+    bar_anchoring: dict
+    ohlc_cache: bool
+    native_ohlc: bool
+    csv_float_decimals: dict
+    csv_compression: str
+    csv_read_engine: str
+    memory_budget_mb: int
+    shared_trade_cache: str
+    dtype_backend: str
+    trade_verification: dict
+    api_url: str
+    api_rate_limit: dict
+    rate_limiter: AdaptiveRateLimiter
+    profiling: dict
+    scheduling: dict
+    output_windows: dict
+    ohlc_windows: list
+    profiler: StageProfiler
+    run_stats: RunStats
+    job_heartbeat: Optional[JobHeartbeat]
 
     def __init__(self, config_file: str) -> None:
         """
@@ -34,7 +89,12 @@ class Config:
         self.__read_configuration_file(config_file)
         self.__check_configuration()
         self.ohlc_frequencies = pandas_to_kraken_ohlc_frequencies(self.ohlc_frequencies)
-        self.ka = KrakenApi()
+        self.ka = KrakenApiEndpoint(self.api_url)
+        self.rate_limiter = AdaptiveRateLimiter(**self.api_rate_limit)
+        self.profiler = StageProfiler(**self.profiling)
+        self.run_stats = RunStats()
+        # Heartbeat of the work queue job processed with the configuration
+        self.job_heartbeat = None
         self.__get_configuration_pairs()
 
     def __read_configuration_file(self, config_file: str) -> None:
@@ -58,7 +118,47 @@ class Config:
                         "download_all_associated_pairs"
                     )
                     self.download_custom_pairs = config.get("download_custom_pairs")
+                    self.asset_pairs_cache = {
+                        **ASSET_PAIRS_CACHE_DEFAULTS,
+                        **(config.get("asset_pairs_cache") or dict()),
+                    }
                     self.ohlc_frequencies = config.get("ohlc_frequencies")
+                    self.ohlc_fill_policy = config.get("ohlc_fill_policy", "nan")
+                    self.ohlc_statistics = config.get("ohlc_statistics") or []
+                    self.bar_anchoring = {
+                        **BAR_ANCHORING_DEFAULTS,
+                        **(config.get("bar_anchoring") or dict()),
+                    }
+                    self.ohlc_cache = config.get("ohlc_cache", False)
+                    self.native_ohlc = config.get("native_ohlc", False)
+                    csv_output = config.get("csv_output") or dict()
+                    self.csv_float_decimals = csv_output.get("float_decimals") or dict()
+                    self.csv_compression = csv_output.get("compression")
+                    self.csv_read_engine = config.get("csv_read_engine", "c")
+                    self.memory_budget_mb = config.get("memory_budget_mb") or 0
+                    self.shared_trade_cache = config.get("shared_trade_cache")
+                    self.dtype_backend = config.get("dtype_backend", "numpy")
+                    self.api_url = config.get("api_url", KRAKEN_API_URL)
+                    self.api_rate_limit = {
+                        **API_RATE_LIMIT_DEFAULTS,
+                        **(config.get("api_rate_limit") or dict()),
+                    }
+                    self.profiling = {
+                        **PROFILING_DEFAULTS,
+                        **(config.get("profiling") or dict()),
+                    }
+                    self.scheduling = {
+                        **SCHEDULING_DEFAULTS,
+                        **(config.get("scheduling") or dict()),
+                    }
+                    self.output_windows = {
+                        **OUTPUT_WINDOWS_DEFAULTS,
+                        **(config.get("output_windows") or dict()),
+                    }
+                    self.trade_verification = {
+                        **TRADE_VERIFICATION_DEFAULTS,
+                        **(config.get("trade_verification") or dict()),
+                    }
                 except (AttributeError, yaml.YAMLError) as e:
                     raise AttributeError(f"{ERROR_PREFIX}") from e
         except EnvironmentError as e:
@@ -108,6 +208,186 @@ class Config:
         # Check other configurations
         if self.ohlc_frequencies is None:
             raise ValueError(f"{ERROR_PREFIX} Please provide ohlc frequencies.")
+        if self.ohlc_fill_policy not in OHLC_FILL_POLICIES:
+            raise ValueError(
+                f"{ERROR_PREFIX} Unsupported ohlc_fill_policy "
+                f"{self.ohlc_fill_policy}, must be one of {OHLC_FILL_POLICIES}."
+            )
+        unsupported_statistics = [
+            statistic
+            for statistic in self.ohlc_statistics
+            if statistic not in OHLC_STATISTICS
+        ]
+        if unsupported_statistics:
+            raise ValueError(
+                f"{ERROR_PREFIX} Unsupported ohlc_statistics "
+                f"{unsupported_statistics}, must be in {OHLC_STATISTICS}."
+            )
+        try:
+            pd.Timestamp(0).tz_localize(self.bar_anchoring["time_zone"])
+            valid_time_zone = True
+        except (KeyError, TypeError, ValueError):
+            valid_time_zone = False
+        if (
+            set(self.bar_anchoring) - set(BAR_ANCHORING_DEFAULTS)
+            or not valid_time_zone
+            or not re.fullmatch(
+                r"([01][0-9]|2[0-3]):[0-5][0-9]", str(self.bar_anchoring["day_start"])
+            )
+            or self.bar_anchoring["week_start"] not in WEEK_DAYS
+        ):
+            raise ValueError(
+                f"{ERROR_PREFIX} bar_anchoring time_zone must be a time zone name, "
+                f'day_start a quoted "HH:MM" time and week_start one of {WEEK_DAYS}.'
+            )
+        if not isinstance(self.ohlc_cache, bool):
+            raise ValueError(
+                f"{ERROR_PREFIX} Please provide ohlc_cache value (True or False)."
+            )
+        if not isinstance(self.native_ohlc, bool):
+            raise ValueError(
+                f"{ERROR_PREFIX} Please provide native_ohlc value (True or False)."
+            )
+        if self.csv_compression in (None, "none"):
+            self.csv_compression = None
+        elif self.csv_compression not in CSV_COMPRESSIONS:
+            raise ValueError(
+                f"{ERROR_PREFIX} Unsupported csv_output compression "
+                f"{self.csv_compression}, must be none or one of "
+                f"{list(CSV_COMPRESSIONS)}."
+            )
+        if not all(
+            isinstance(decimals, int) and decimals >= 0
+            for decimals in self.csv_float_decimals.values()
+        ):
+            raise ValueError(
+                f"{ERROR_PREFIX} csv_output float_decimals must be non-negative "
+                "integers."
+            )
+        if self.csv_read_engine not in CSV_READ_ENGINES:
+            raise ValueError(
+                f"{ERROR_PREFIX} Unsupported csv_read_engine "
+                f"{self.csv_read_engine}, must be one of {CSV_READ_ENGINES}."
+            )
+        if self.dtype_backend not in DTYPE_BACKENDS:
+            raise ValueError(
+                f"{ERROR_PREFIX} Unsupported dtype_backend "
+                f"{self.dtype_backend}, must be one of {DTYPE_BACKENDS}."
+            )
+        if self.dtype_backend == "pyarrow" and not importlib.util.find_spec("pyarrow"):
+            raise ValueError(
+                f"{ERROR_PREFIX} pyarrow package is required for pyarrow dtype_backend."
+            )
+        if not isinstance(self.memory_budget_mb, int) or self.memory_budget_mb < 0:
+            raise ValueError(
+                f"{ERROR_PREFIX} memory_budget_mb must be a non-negative integer."
+            )
+        if self.shared_trade_cache is not None and not isinstance(
+            self.shared_trade_cache, str
+        ):
+            raise ValueError(
+                f"{ERROR_PREFIX} shared_trade_cache must be a folder path or null."
+            )
+        if self.shared_trade_cache and not importlib.util.find_spec("fcntl"):
+            raise ValueError(
+                f"{ERROR_PREFIX} shared_trade_cache requires file locking, only "
+                "available on Unix."
+            )
+        if not isinstance(self.api_url, str) or not self.api_url.startswith(
+            ("http://", "https://")
+        ):
+            raise ValueError(f"{ERROR_PREFIX} api_url must be an HTTP(S) URL.")
+        if (
+            set(self.api_rate_limit) - set(API_RATE_LIMIT_DEFAULTS)
+            or not all(
+                isinstance(value, (int, float)) and value > 0
+                for value in self.api_rate_limit.values()
+            )
+            or not (
+                self.api_rate_limit["min_interval"]
+                <= self.api_rate_limit["initial_interval"]
+                <= self.api_rate_limit["max_interval"]
+            )
+        ):
+            raise ValueError(
+                f"{ERROR_PREFIX} api_rate_limit values must be positive numbers with "
+                "min_interval <= initial_interval <= max_interval."
+            )
+        if any(
+            not isinstance(self.trade_verification[key], bool)
+            for key in ["enabled", "repair"]
+        ) or any(
+            not isinstance(self.trade_verification[key], (int, float))
+            or self.trade_verification[key] <= 0
+            for key in ["gap_factor", "min_gap_minutes"]
+        ):
+            raise ValueError(
+                f"{ERROR_PREFIX} trade_verification enabled and repair must be "
+                "booleans, gap_factor and min_gap_minutes positive numbers."
+            )
+        if (
+            set(self.profiling) - set(PROFILING_DEFAULTS)
+            or not isinstance(self.profiling["enabled"], bool)
+            or not isinstance(self.profiling["stages"], list)
+            or set(self.profiling["stages"]) - set(PROFILE_STAGES)
+            or not isinstance(self.profiling["pairs"], list)
+            or not isinstance(self.profiling["top_functions"], int)
+            or self.profiling["top_functions"] <= 0
+        ):
+            raise ValueError(
+                f"{ERROR_PREFIX} profiling enabled must be a boolean, stages a list "
+                f"of {PROFILE_STAGES}, pairs a list and top_functions a positive "
+                "integer."
+            )
+        if (
+            set(self.scheduling) - set(SCHEDULING_DEFAULTS)
+            or not isinstance(self.scheduling["priorities"], dict)
+            or not all(
+                isinstance(priority, int)
+                for priority in self.scheduling["priorities"].values()
+            )
+            or not isinstance(self.scheduling["deadline_minutes"], (int, float))
+            or self.scheduling["deadline_minutes"] < 0
+            or not isinstance(self.scheduling["deferred_max_priority"], int)
+        ):
+            raise ValueError(
+                f"{ERROR_PREFIX} scheduling priorities must be integers by pair "
+                "pattern, deadline_minutes a non-negative number and "
+                "deferred_max_priority an integer."
+            )
+        if (
+            set(self.output_windows) - set(OUTPUT_WINDOWS_DEFAULTS)
+            or self.output_windows["period"] not in [None, *WINDOW_PERIODS]
+            or not isinstance(self.output_windows["dates"] or [], list)
+            or not all(
+                isinstance(dates, list) and len(dates) == 2
+                for dates in self.output_windows["dates"] or []
+            )
+        ):
+            raise ValueError(
+                f"{ERROR_PREFIX} output_windows period must be one of "
+                f"{list(WINDOW_PERIODS)} or null and dates a list of start and end "
+                "dates."
+            )
+        try:
+            self.ohlc_windows = ohlc_windows(
+                self.start_datetime,
+                self.end_datetime,
+                self.output_windows["period"],
+                self.output_windows["dates"],
+            )
+        except ValueError as e:
+            raise ValueError(f"{ERROR_PREFIX} {e}") from e
+        if self.ohlc_windows and self.memory_budget_mb:
+            raise ValueError(
+                f"{ERROR_PREFIX} output_windows can't be generated with a "
+                "memory_budget_mb, please disable one of them."
+            )
+        if self.trade_verification["repair"] and self.memory_budget_mb:
+            raise ValueError(
+                f"{ERROR_PREFIX} trade_verification repair can't be used with a "
+                "memory_budget_mb, please disable one of them."
+            )
         if self.volume_in_quote_asset is None:
             raise ValueError(
                 f"{ERROR_PREFIX} Please provide volume_in_quote_asset value "
@@ -124,8 +404,29 @@ class Config:
             raise ValueError(
                 f"{ERROR_PREFIX} Please provide quotes assets to download."
             )
+        elif not all(
+            isinstance(self.download_all_associated_pairs.get(key) or [], list)
+            for key in ["excluded_base_assets", "included_pairs", "excluded_pairs"]
+        ) or not isinstance(
+            self.download_all_associated_pairs.get("online_only", False), bool
+        ):
+            raise ValueError(
+                f"{ERROR_PREFIX} download_all_associated_pairs excluded_base_assets, "
+                "included_pairs and excluded_pairs must be lists and online_only a "
+                "boolean."
+            )
         elif not self.download_custom_pairs:
             raise ValueError(f"{ERROR_PREFIX} Please provide pairs to download option.")
+        if (
+            set(self.asset_pairs_cache) - set(ASSET_PAIRS_CACHE_DEFAULTS)
+            or not isinstance(self.asset_pairs_cache["path"], (str, type(None)))
+            or not isinstance(self.asset_pairs_cache["max_age_hours"], (int, float))
+            or self.asset_pairs_cache["max_age_hours"] < 0
+        ):
+            raise ValueError(
+                f"{ERROR_PREFIX} asset_pairs_cache path must be a file path or null "
+                "and max_age_hours a non-negative number."
+            )
 
     def __get_configuration_pairs(self) -> None:
         """
@@ -133,36 +434,50 @@ class Config:
 
         :return: None
         """
-        asset_pairs = list(self.ka.get_asset_pairs().keys())
+        df_pairs = asset_pairs_frame(
+            cached_asset_pairs(
+                self.ka,
+                self.api_url,
+                self.asset_pairs_cache["path"],
+                self.asset_pairs_cache["max_age_hours"],
+            )
+        )
         if self.download_all_associated_pairs.get("enabled"):
-            # Download pairs from Kraken
-            self.pairs = list()
+            # Select pairs from Kraken asset pairs base and quote assets
             quote_assets = self.download_all_associated_pairs.get("quote_assets")
             for quote_asset in quote_assets:
-                try:
-                    asset = self.ka.get_asset_altname(quote_asset)
-                except ValueError as e:
-                    raise ValueError(f"Invalid quote asset: {quote_asset}") from e
-                self.pairs += [pair for pair in asset_pairs if asset in pair]
-                if not self.pairs:
+                if not assets_mask(df_pairs, "quote", [quote_asset]).any():
                     raise ValueError(
                         f"No tradable pairs available on Kraken for {quote_asset}."
                     )
-            # Remove excluded base assets
-            if self.download_all_associated_pairs.get("excluded_base_assets"):
-                self.pairs = [
-                    pair
-                    for pair in self.pairs
-                    if not any(
-                        base_asset in pair
-                        for base_asset in self.download_all_associated_pairs.get(
-                            "excluded_base_assets"
-                        )
+            excluded_base_assets = list()
+            excluded_pairs = list(
+                self.download_all_associated_pairs.get("excluded_pairs") or []
+            )
+            for asset in (
+                self.download_all_associated_pairs.get("excluded_base_assets") or []
+            ):
+                # Pair suffixes like .d of dark pool pairs were excluded as base
+                # assets before pair exclusion rules
+                if str(asset).startswith("."):
+                    logger.warning(
+                        f"Excluded base asset {asset} is a pair suffix, pairs *{asset} "
+                        "are excluded, please move it to excluded_pairs."
                     )
-                ]
+                    excluded_pairs.append(f"*{asset}")
+                else:
+                    excluded_base_assets.append(asset)
+            self.pairs = select_pairs(
+                df_pairs,
+                quote_assets,
+                excluded_base_assets,
+                self.download_all_associated_pairs.get("included_pairs"),
+                excluded_pairs,
+                self.download_all_associated_pairs.get("online_only", False),
+            )
         else:
             for pair in self.download_custom_pairs:
-                if pair not in asset_pairs:
+                if pair not in df_pairs.index:
                     raise ValueError(f"{pair} pair not available on Kraken.")
             self.pairs = self.download_custom_pairs
         logger.info(f"Pairs to download: {self.pairs}")
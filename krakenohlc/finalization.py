@@ -0,0 +1,212 @@
+import bisect
+import logging
+
+import pandas as pd
+
+from .ohlc import (finalized_bars, merge_partial_ohlc, partial_ohlc_to_ohlc,
+                   trades_to_partial_ohlc)
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class BarFinalizer:
+    """
+    Aggregate trades received incrementally into OHLC bars and finalize them with
+    a watermark, for time ordered chunks of saved trades as for downloaded pages.
+    The watermark is the latest received trade date minus the allowed lateness, a
+    bar is final once it ends before or at the watermark. Trades received for an
+    already final bar are late, the bar is corrected and emitted again. Final bars
+    are kept by batch of finalized bars indexed by their first date, so late
+    trades only merge batches of their bars.
+    """
+
+    frequency: str
+    volume_in_quote_asset: bool
+    statistics: list
+    anchoring: dict
+    allowed_lateness: pd.Timedelta
+    watermark: pd.Timestamp
+    df_open_bars: pd.DataFrame
+    final_bars: list
+    final_bars_dates: list
+    late_trade_count: int
+
+    def __init__(
+        self,
+        frequency: str,
+        volume_in_quote_asset: bool,
+        statistics: list = None,
+        allowed_lateness: pd.Timedelta = pd.Timedelta(0),
+        anchoring: dict = None,
+    ) -> None:
+        """
+        Initialize the BarFinalizer object.
+
+        :param frequency: OHLC frequency as string.
+        :param volume_in_quote_asset: If volume is aggregated in quote asset or not.
+        :param statistics: List of additional statistics to compute per bar.
+        :param allowed_lateness: Delay to wait for late trades before finalizing bars.
+        :param anchoring: Bars time zone, day start and week start as dict, None
+            for default anchoring.
+        """
+        self.frequency = frequency
+        self.volume_in_quote_asset = volume_in_quote_asset
+        self.statistics = statistics or []
+        self.anchoring = anchoring
+        self.allowed_lateness = pd.Timedelta(allowed_lateness)
+        self.watermark = None
+        self.df_open_bars = pd.DataFrame()
+        self.final_bars = list()
+        self.final_bars_dates = list()
+        self.late_trade_count = 0
+
+    def update(self, df_trades: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Add received trades to bars, advance the watermark to the latest trade date
+        minus the allowed lateness and return bars finalized by the new watermark and
+        corrected final bars.
+
+        :param df_trades: Received trades pandas DataFrame.
+        :return: Finalized OHLC bars and corrected OHLC bars.
+        """
+        df_finalized, df_corrected = self.add_trades(df_trades)
+        return (
+            partial_ohlc_to_ohlc(
+                df_finalized.dropna(subset=["close"]), statistics=self.statistics
+            ),
+            partial_ohlc_to_ohlc(df_corrected, statistics=self.statistics),
+        )
+
+    def add_trades(self, df_trades: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Add received trades to bars like update and return partial bars, with empty
+        bars between bars with trades, for aggregations merging them.
+
+        :param df_trades: Received trades pandas DataFrame.
+        :return: Finalized partial OHLC bars and corrected partial OHLC bars.
+        """
+        if df_trades.empty:
+            df_finalized = self.finalize_open_bars(self.watermark)
+            return df_finalized, df_finalized[:0]
+        df_partial = trades_to_partial_ohlc(
+            df_trades,
+            self.frequency,
+            self.volume_in_quote_asset,
+            self.statistics,
+            trade_times=True,
+            anchoring=self.anchoring,
+        )
+        df_corrected = df_partial[:0]
+        # Only bars starting before the watermark can be final
+        if self.watermark is not None and df_partial.index[0] < self.watermark:
+            late_bars = finalized_bars(
+                df_partial.index, self.frequency, self.watermark, self.anchoring
+            )
+            if late_bars.any():
+                # Final bars come first, trades before the first open bar are late
+                late_trade_count = (
+                    len(df_trades)
+                    if late_bars.all()
+                    else int((df_trades.index < df_partial.index[~late_bars][0]).sum())
+                )
+                df_corrected = self.correct_final_bars(
+                    df_partial[late_bars].dropna(subset=["close"]), late_trade_count
+                )
+                df_partial = df_partial.iloc[late_bars.sum() :]
+        # Only bars up to the last open bar are merged, following bars are appended
+        df_open_bars = self.df_open_bars
+        if not df_open_bars.empty:
+            merged_bars = df_partial.index.searchsorted(
+                df_open_bars.index[-1], side="right"
+            )
+            if merged_bars:
+                df_open_bars = merge_partial_ohlc(
+                    df_open_bars, df_partial.iloc[:merged_bars]
+                )
+                df_partial = df_partial.iloc[merged_bars:]
+        partials = [df for df in [df_open_bars, df_partial] if not df.empty]
+        if len(partials) > 1:
+            df_open_bars = pd.concat(partials)
+        self.df_open_bars = partials[0] if len(partials) == 1 else df_open_bars
+        df_finalized = self.finalize_open_bars(
+            df_trades.index.max() - self.allowed_lateness
+        )
+        return df_finalized, df_corrected
+
+    def advance_watermark(self, watermark: pd.Timestamp) -> pd.DataFrame:
+        """
+        Advance the watermark, for instance to the download end date once all trades
+        are received, and return bars finalized by the new watermark.
+
+        :param watermark: Date until which all trades are known.
+        :return: Finalized OHLC bars.
+        """
+        return partial_ohlc_to_ohlc(
+            self.finalize_open_bars(watermark).dropna(subset=["close"]),
+            statistics=self.statistics,
+        )
+
+    def finalize_open_bars(self, watermark: pd.Timestamp) -> pd.DataFrame:
+        """
+        Advance the watermark and move open bars it finalizes to final bars.
+
+        :param watermark: Date until which all trades are known, None to keep it.
+        :return: Finalized partial OHLC bars.
+        """
+        if watermark is not None and (
+            self.watermark is None or watermark > self.watermark
+        ):
+            self.watermark = pd.Timestamp(watermark)
+        if self.df_open_bars.empty or self.watermark is None:
+            return self.df_open_bars[:0]
+        # Open bars are sorted, final bars come first
+        final_bars = finalized_bars(
+            self.df_open_bars.index, self.frequency, self.watermark, self.anchoring
+        ).sum()
+        df_finalized = self.df_open_bars.iloc[:final_bars]
+        self.df_open_bars = self.df_open_bars.iloc[final_bars:]
+        if not df_finalized.empty:
+            self.final_bars.append(df_finalized)
+            self.final_bars_dates.append(df_finalized.index[0])
+        return df_finalized
+
+    def correct_final_bars(
+        self, df_late_partial: pd.DataFrame, late_trade_count: int
+    ) -> pd.DataFrame:
+        """
+        Merge partial bars of late trades into final bars and return corrected bars.
+
+        :param df_late_partial: Partial OHLC bars of late trades.
+        :param late_trade_count: Number of late trades.
+        :return: Corrected partial OHLC bars.
+        """
+        self.late_trade_count += late_trade_count
+        logger.warning(
+            f"{self.frequency}: {late_trade_count} late trades before the "
+            f"watermark {self.watermark}, {len(df_late_partial)} final bars "
+            "corrected."
+        )
+        # Batches of final bars from the batch of the first late bar to the batch of
+        # the last one
+        first = max(
+            bisect.bisect_right(self.final_bars_dates, df_late_partial.index[0]) - 1, 0
+        )
+        last = bisect.bisect_right(self.final_bars_dates, df_late_partial.index[-1])
+        df_final_bars = pd.concat([*self.final_bars[first:last], df_late_partial[:0]])
+        corrected_bars = df_final_bars.index.isin(df_late_partial.index)
+        df_corrected = merge_partial_ohlc(
+            df_final_bars[corrected_bars], df_late_partial
+        )
+        df_final_bars = merge_partial_ohlc(df_final_bars[~corrected_bars], df_corrected)
+        self.final_bars[first:last] = [df_final_bars]
+        self.final_bars_dates[first:last] = [df_final_bars.index[0]]
+        return df_corrected
+
+    def partial_bars(self) -> pd.DataFrame:
+        """
+        Return final and open partial bars, sorted by date.
+
+        :return: Partial OHLC DataFrame.
+        """
+        partials = [df for df in [*self.final_bars, self.df_open_bars] if not df.empty]
+        return pd.concat(partials) if partials else self.df_open_bars
@@ -1,10 +1,96 @@
 import datetime
+import gzip
+import os
+import uuid
 from pathlib import Path
+from types import ModuleType
+from typing import Iterable, Iterator, Optional, TextIO
 
+import numpy as np
 import pandas as pd
 
 from .ohlc import FREQUENCIES_REPLACE
 
+CSV_CHUNK_SIZE: int = 100_000
+CSV_BUFFER_SIZE: int = 1024 * 1024
+CSV_COMPRESSIONS: dict[str, str] = {"gzip": ".gz", "zstd": ".zst"}
+CSV_READ_ENGINES: list[str] = ["c", "python", "pyarrow"]
+# Written timestamps are ISO 8601, with microseconds only when needed.
+CSV_TIME_FORMAT: str = "ISO8601"
+# Written timestamps units, the first one representing all timestamps of a chunk is
+# used as by the pandas CSV writer.
+CSV_TIME_UNITS: list[str] = ["D", "s", "ms", "us", "ns"]
+# Values with these characters are quoted by the pandas CSV writer.
+CSV_QUOTED_CHARACTERS: str = ',"\r\n'
+TRADES_CSV_DTYPES: dict[str, str] = {
+    "price": "float64",
+    "volume": "float64",
+    "buy/sell": "object",
+    "market/limit": "object",
+    "miscellaneous": "object",
+}
+OHLC_CSV_DTYPES: dict[str, str] = {
+    "open": "float64",
+    "high": "float64",
+    "low": "float64",
+    "close": "float64",
+    "volume": "float64",
+    "vwap": "float64",
+    "trade_count": "int64",
+    "buy_volume": "float64",
+    "sell_volume": "float64",
+    "market_volume": "float64",
+    "limit_volume": "float64",
+}
+CSV_SCHEMAS: dict[str, dict[str, str]] = {
+    "trades": TRADES_CSV_DTYPES,
+    "ohlc": OHLC_CSV_DTYPES,
+}
+DTYPE_BACKENDS: list[str] = ["numpy", "pyarrow"]
+# Arrow backed dtypes of schemas dtypes, for the pyarrow dtype backend.
+ARROW_DTYPES: dict[str, str] = {
+    "float64": "double[pyarrow]",
+    "int64": "int64[pyarrow]",
+    "object": "string[pyarrow]",
+}
+
+
+def import_pyarrow() -> ModuleType:
+    """
+    Import the optional pyarrow package required by the pyarrow dtype backend.
+
+    :return: pyarrow module.
+    """
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ValueError(
+            "pyarrow package is required for pyarrow dtype backend."
+        ) from e
+    return pyarrow
+
+
+def csv_read_options(
+    schema: str = None, engine: str = None, dtype_backend: str = "numpy"
+) -> dict:
+    """
+    Generate pandas read_csv options for a CSV schema and dtype backend. With the
+    pyarrow dtype backend and engine, columns are read in Arrow buffers used as is
+    by pandas.
+
+    :param schema: CSV schema (trades or ohlc) to read columns with explicit dtypes.
+    :param engine: pandas CSV parser engine (c, python or pyarrow).
+    :param dtype_backend: DataFrame dtype backend (numpy or pyarrow).
+    :return: pandas read_csv options as dict.
+    """
+    dtype = CSV_SCHEMAS[schema] if schema else None
+    if dtype_backend == "pyarrow":
+        import_pyarrow()
+        if dtype:
+            dtype = {column: ARROW_DTYPES[i] for column, i in dtype.items()}
+        return dict(dtype=dtype, engine=engine, dtype_backend="pyarrow")
+    return dict(dtype=dtype, engine=engine)
+
 
 def define_filepath(
     folder: str,
@@ -13,6 +99,7 @@ def define_filepath(
     end_datetime: datetime,
     frequency: str = "",
     volume_in_quote_asset: bool = None,
+    compression: str = None,
 ) -> str:
     """
     Generate file path to read and save files for specified folder name, pair,
@@ -24,6 +111,7 @@ def define_filepath(
     :param end_datetime: End date as datetime.
     :param frequency: Frequency as string for OHLC data.
     :param volume_in_quote_asset: If volume is aggregated in quote asset or not.
+    :param compression: CSV compression (gzip or zstd), None if not compressed.
     :return: File path as string.
     """
     frequency = frequency.replace("T", "M").replace("1W-MON", "1W")
@@ -37,25 +125,398 @@ def define_filepath(
     if volume_in_quote_asset is True:
         filepath += "_quote"
     filepath += ".csv"
+    if compression:
+        filepath += CSV_COMPRESSIONS[compression]
     return filepath
 
 
-def read_csv(filepath: str) -> pd.DataFrame:
+def set_time_index(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Parse CSV time column with the known timestamp format and set it as index.
+
+    :param df: pandas DataFrame read from CSV.
+    :return: pandas DataFrame indexed by time.
+    """
+    time = pd.to_datetime(df["time"], format=CSV_TIME_FORMAT)
+    if isinstance(time.dtype, pd.ArrowDtype):
+        # Resampling requires a numpy datetime index
+        time = time.astype("datetime64[ns]")
+    df["time"] = time
+    return df.set_index("time")
+
+
+def csv_window_options(
+    filepath: str,
+    start_datetime: datetime = None,
+    end_datetime: datetime = None,
+    chunksize: int = CSV_CHUNK_SIZE,
+) -> dict:
+    """
+    Locate rows of a time window in a time sorted CSV by reading its time column
+    only, by chunks of rows, and generate pandas read_csv options reading these rows
+    only, so that other columns of rows outside the window are never parsed.
+
+    :param filepath: CSV file path as string.
+    :param start_datetime: Keep rows from this date if specified.
+    :param end_datetime: Keep rows before this date if specified.
+    :param chunksize: Number of time column rows read at once.
+    :return: pandas read_csv options as dict.
+    """
+    start_row = 0 if start_datetime is None else None
+    end_row = None
+    rows = 0
+    with pd.read_csv(
+        filepath, usecols=["time"], dtype={"time": str}, chunksize=chunksize
+    ) as reader:
+        for df_chunk in reader:
+            time = pd.DatetimeIndex(
+                pd.to_datetime(df_chunk["time"], format=CSV_TIME_FORMAT)
+            )
+            if time.empty:
+                # Header only CSV
+                end_row = rows
+                break
+            if start_row is None and time[-1] >= start_datetime:
+                start_row = rows + time.searchsorted(start_datetime)
+            if end_datetime is not None and time[-1] >= end_datetime:
+                end_row = rows + time.searchsorted(end_datetime)
+                break
+            if start_row is not None and end_datetime is None:
+                break
+            rows += len(time)
+    start_row = rows if start_row is None else start_row
+    window_options = dict(nrows=None if end_row is None else end_row - start_row)
+    if start_row:
+        # Skipped rows are counted from the file start, header included
+        names = list(pd.read_csv(filepath, nrows=0).columns)
+        window_options.update(skiprows=start_row + 1, header=None, names=names)
+    return window_options
+
+
+def read_csv(
+    filepath: str,
+    schema: str = None,
+    columns: list = None,
+    start_datetime: datetime = None,
+    end_datetime: datetime = None,
+    engine: str = None,
+    chunksize: int = CSV_CHUNK_SIZE,
+    dtype_backend: str = "numpy",
+) -> pd.DataFrame:
     """
     Read CSV at specified file path and return it as pandas DataFrame.
+    If a time window is specified, rows of the window are located on the time
+    column and only these rows are parsed, except with the pyarrow engine which
+    can't skip rows: the whole CSV is then parsed and filtered.
 
     :param filepath: CSV file path as string.
+    :param schema: CSV schema (trades or ohlc) to read columns with explicit dtypes.
+    :param columns: Columns to read in addition to time, all columns if None.
+    :param start_datetime: Keep rows from this date if specified.
+    :param end_datetime: Keep rows before this date if specified.
+    :param engine: pandas CSV parser engine (c, python or pyarrow).
+    :param chunksize: Number of time column rows read at once to locate a time window.
+    :param dtype_backend: DataFrame dtype backend (numpy or pyarrow).
     :return: CSV as pandas DataFrame.
     """
+    read_options = csv_read_options(schema, engine, dtype_backend)
+    read_options["usecols"] = ["time"] + list(columns) if columns else None
     try:
-        df: pd.DataFrame = pd.read_csv(filepath, index_col="time", parse_dates=True)
+        if start_datetime is None and end_datetime is None:
+            df: pd.DataFrame = set_time_index(pd.read_csv(filepath, **read_options))
+        elif engine == "pyarrow":
+            # pyarrow engine does not support skipping rows after the header
+            df = set_time_index(pd.read_csv(filepath, **read_options))
+            df = filter_time_window(df, start_datetime, end_datetime)
+        else:
+            read_options.update(
+                csv_window_options(filepath, start_datetime, end_datetime, chunksize)
+            )
+            df = set_time_index(pd.read_csv(filepath, **read_options))
     except (FileNotFoundError, pd.errors.EmptyDataError):
         df = pd.DataFrame()
-    except (ValueError, pd.errors.ParserError, IsADirectoryError) as e:
+    except (ValueError, KeyError, pd.errors.ParserError, IsADirectoryError) as e:
         raise ValueError(f"Can't read csv at {filepath} -> {e}")
     return df
 
 
+def read_csv_chunks(
+    filepath: str,
+    schema: str = None,
+    engine: str = None,
+    chunksize: int = CSV_CHUNK_SIZE,
+    start_datetime: datetime = None,
+    end_datetime: datetime = None,
+    dtype_backend: str = "numpy",
+) -> Iterator[pd.DataFrame]:
+    """
+    Read CSV at specified file path by chunks of rows, so that only a chunk of the
+    file is in memory at once. If a time window is specified, rows of the window
+    are located on the time column like read_csv and only these rows are parsed.
+
+    :param filepath: CSV file path as string.
+    :param schema: CSV schema (trades or ohlc) to read columns with explicit dtypes.
+    :param engine: pandas CSV parser engine (c or python), pyarrow engine does not
+        support reading by chunks.
+    :param chunksize: Number of rows read at once.
+    :param start_datetime: Keep rows from this date if specified.
+    :param end_datetime: Keep rows before this date if specified.
+    :param dtype_backend: DataFrame dtype backend (numpy or pyarrow).
+    :return: Iterator of time sorted CSV chunks as pandas DataFrame indexed by time.
+    """
+    engine = None if engine == "pyarrow" else engine
+    read_options = csv_read_options(schema, engine, dtype_backend)
+    try:
+        if start_datetime is not None or end_datetime is not None:
+            read_options.update(
+                csv_window_options(filepath, start_datetime, end_datetime, chunksize)
+            )
+        if read_options.get("nrows") == 0:
+            return
+        with pd.read_csv(filepath, chunksize=chunksize, **read_options) as reader:
+            for df_chunk in reader:
+                yield set_time_index(df_chunk)
+    except (ValueError, KeyError, pd.errors.ParserError, IsADirectoryError) as e:
+        raise ValueError(f"Can't read csv at {filepath} -> {e}")
+
+
+def filter_time_window(
+    df: pd.DataFrame, start_datetime: datetime = None, end_datetime: datetime = None
+) -> pd.DataFrame:
+    """
+    Keep rows of a time sorted DataFrame from start date and before end date.
+
+    :param df: pandas DataFrame indexed by time.
+    :param start_datetime: Keep rows from this date if specified.
+    :param end_datetime: Keep rows before this date if specified.
+    :return: Filtered pandas DataFrame.
+    """
+    start = 0 if start_datetime is None else df.index.searchsorted(start_datetime)
+    end = len(df) if end_datetime is None else df.index.searchsorted(end_datetime)
+    return df.iloc[start:end]
+
+
+def open_csv_output(filepath: str, compression: str = None) -> TextIO:
+    """
+    Open a buffered text file handle to write CSV, compressed if specified.
+
+    :param filepath: CSV file path as string.
+    :param compression: CSV compression (gzip or zstd), None if not compressed.
+    :return: Writable text file handle.
+    """
+    if compression == "gzip":
+        return gzip.open(filepath, "wt", compresslevel=6, newline="")
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ValueError(
+                "zstandard package is required for zstd CSV compression."
+            ) from e
+        return zstandard.open(filepath, "wt", newline="")
+    if compression:
+        raise ValueError(
+            f"Unsupported CSV compression {compression}. Supported "
+            f"compressions: {list(CSV_COMPRESSIONS)}"
+        )
+    return open(filepath, "w", newline="", buffering=CSV_BUFFER_SIZE)
+
+
+def format_float_columns(df: pd.DataFrame, float_decimals: dict) -> pd.DataFrame:
+    """
+    Format float columns with a fixed number of decimals, NaN as empty string.
+
+    :param df: pandas DataFrame to format.
+    :param float_decimals: Number of decimals by column name.
+    :return: pandas DataFrame with formatted columns as strings.
+    """
+    formatted_columns = dict()
+    for column, decimals in float_decimals.items():
+        if column not in df:
+            continue
+        values = df[column].to_numpy(dtype=float)
+        formatted = np.char.mod(f"%.{decimals}f", values).astype(object)
+        formatted[np.isnan(values)] = ""
+        formatted_columns[column] = formatted
+    return df.assign(**formatted_columns)
+
+
+def format_csv_dates(index: pd.Index) -> Optional[list]:
+    """
+    Format timestamps as the pandas CSV writer, with the coarsest unit representing
+    all timestamps. Timestamps are formatted by numpy as fixed width strings.
+
+    :param index: pandas DatetimeIndex.
+    :return: List of formatted timestamps, None if time zone aware or missing.
+    """
+    if index.dtype != "datetime64[ns]" or index.hasnans:
+        return None
+    nanoseconds = index.asi8
+    for unit in CSV_TIME_UNITS:
+        unit_nanoseconds = np.timedelta64(1, unit).astype("timedelta64[ns]").astype(int)
+        if not (nanoseconds % unit_nanoseconds).any():
+            break
+    characters = index.to_numpy().astype(f"datetime64[{unit}]").astype("S")
+    if unit != "D" and len(characters):
+        # ISO 8601 date and time separator written as a space
+        characters.view(np.uint8).reshape(len(characters), -1)[:, 10] = ord(" ")
+    return characters.astype(str).tolist()
+
+
+def format_csv_values(values: np.ndarray, decimals: int = None) -> Optional[list]:
+    """
+    Format column values as the pandas CSV writer, floats with a fixed number of
+    decimals if specified, missing values as empty strings.
+
+    :param values: Column values as numpy array.
+    :param decimals: Number of decimals of floats, full precision if None.
+    :return: List of formatted values, None if values dtype is not supported or
+        values need to be quoted.
+    """
+    if values.dtype == "float64":
+        if decimals is None:
+            formatted = values.astype(str)
+        else:
+            formatted = np.char.mod(f"%.{decimals}f", values)
+        return np.where(np.isnan(values), "", formatted).tolist()
+    if values.dtype == "int64":
+        return values.astype(str).tolist()
+    if values.dtype != "object":
+        return None
+    missing = pd.isna(values)
+    for value in pd.unique(values[~missing]):
+        if not isinstance(value, str) or any(
+            character in value for character in CSV_QUOTED_CHARACTERS
+        ):
+            return None
+    return np.where(missing, "", values).tolist()
+
+
+def format_csv_rows(df: pd.DataFrame, float_decimals: dict = None) -> Optional[str]:
+    """
+    Format pandas DataFrame rows, index included, as CSV lines identical to lines of
+    the pandas CSV writer. Columns are formatted at once, and lines are joined
+    without formatting values one by one.
+
+    :param df: pandas DataFrame to format.
+    :param float_decimals: Number of decimals by column name, other float columns
+        are formatted with full precision.
+    :return: CSV lines as string, None if a column can't be formatted at once.
+    """
+    float_decimals = float_decimals or dict()
+    if isinstance(df.index, pd.DatetimeIndex):
+        columns = [format_csv_dates(df.index)]
+    else:
+        columns = [format_csv_values(df.index.to_numpy())]
+    for column in df.columns:
+        columns.append(
+            format_csv_values(df[column].to_numpy(), float_decimals.get(column))
+        )
+    if any(values is None for values in columns):
+        return None
+    if df.empty:
+        return ""
+    return os.linesep.join(map(",".join, zip(*columns))) + os.linesep
+
+
+def create_temporary_file(filepath: str) -> str:
+    """
+    Create an empty temporary file with a unique name in the directory of a file
+    path, written and then renamed to the file path. Concurrent writers of a file,
+    like workers of a job whose lease expired, never write the same temporary file.
+
+    :param filepath: File path as string.
+    :return: Temporary file path as string.
+    """
+    while True:
+        temporary_filepath = f"{filepath}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            # Created with the permissions of files created by open, the OS applies
+            # the current process umask
+            handle = os.open(
+                temporary_filepath, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666
+            )
+        except FileExistsError:
+            continue
+        os.close(handle)
+        return temporary_filepath
+
+
+def write_csv(
+    df: pd.DataFrame,
+    filepath: str,
+    float_decimals: dict = None,
+    compression: str = None,
+    chunksize: int = CSV_CHUNK_SIZE,
+) -> None:
+    """
+    Write pandas DataFrame as CSV at specified file path by chunks of rows.
+    The CSV is written to a temporary file renamed once complete, so a partially
+    written file is never left at file path.
+
+    :param df: pandas DataFrame to write.
+    :param filepath: CSV file path as string.
+    :param float_decimals: Number of decimals by column name, other float columns
+        are written with full precision.
+    :param compression: CSV compression (gzip or zstd), None if not compressed.
+    :param chunksize: Number of rows formatted and written at once.
+    :return: None
+    """
+    write_csv_chunks(
+        (df.iloc[start : start + chunksize] for start in range(0, len(df), chunksize)),
+        filepath,
+        float_decimals,
+        compression,
+        df.iloc[:0],
+    )
+
+
+def write_csv_chunks(
+    chunks: Iterable[pd.DataFrame],
+    filepath: str,
+    float_decimals: dict = None,
+    compression: str = None,
+    df_header: pd.DataFrame = None,
+) -> None:
+    """
+    Write chunks of pandas DataFrame as a single CSV at specified file path as they
+    are iterated, so that only a chunk is in memory at once. The CSV is written to
+    a unique temporary file renamed once complete, so a partially written file is
+    never left at file path. Chunks are formatted by column, or written by the
+    pandas CSV writer if a column can't be formatted at once.
+
+    :param chunks: Iterable of pandas DataFrame chunks with the same columns.
+    :param filepath: CSV file path as string.
+    :param float_decimals: Number of decimals by column name, other float columns
+        are written with full precision.
+    :param compression: CSV compression (gzip or zstd), None if not compressed.
+    :param df_header: Empty pandas DataFrame to write header if there is no chunk.
+    :return: None
+    """
+    temporary_filepath = create_temporary_file(filepath)
+    try:
+        with open_csv_output(temporary_filepath, compression) as handle:
+            header = True
+            for df_chunk in chunks:
+                rows = format_csv_rows(df_chunk, float_decimals)
+                if rows is None:
+                    if float_decimals:
+                        df_chunk = format_float_columns(df_chunk, float_decimals)
+                    df_chunk.to_csv(handle, header=header)
+                else:
+                    if header:
+                        df_chunk.iloc[:0].to_csv(handle)
+                    handle.write(rows)
+                header = False
+            if header and df_header is not None:
+                df_header.to_csv(handle)
+        os.replace(temporary_filepath, filepath)
+    except BaseException:
+        if os.path.exists(temporary_filepath):
+            os.remove(temporary_filepath)
+        raise
+
+
 def create_data_directory(data_folder_path: str) -> None:
     """
     Create trades and OHLC data output directories.
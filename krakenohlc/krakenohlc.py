@@ -1,41 +1,246 @@
+import copy
+import datetime
 import logging
+import os
+import socket
+import time
+from itertools import chain
+from typing import Iterable, Iterator, Optional
 
+import numpy as np
 import pandas as pd
 
+from .cache import (CACHE_FOLDER, cache_key, partial_ohlc_keys,
+                    prune_ohlc_cache, read_output_key, trades_chunks,
+                    trades_to_ohlc_cached, write_output_key)
 from .config import Config
-from .io import create_data_directory, define_filepath, read_csv
-from .ohlc import adjust_ohlc_frequency_dates, trades_to_ohlc
-from .trades import download_trades
+from .io import (create_data_directory, define_filepath, read_csv,
+                 read_csv_chunks, write_csv, write_csv_chunks)
+from .metadata import (catalog_filepath, pair_range_metadata, read_metadata,
+                       update_pair_metadata, write_metadata)
+from .native import download_native_ohlc, native_ohlc_mismatches
+from .ohlc import (adjust_ohlc_frequency_dates, fill_ohlc_gaps,
+                   frequency_timedelta, is_anchored, trades_to_ohlc,
+                   trim_incomplete_bars)
+from .runhistory import append_run_history
+from .scheduling import (RunDeadline, estimated_trade_counts, pair_priority,
+                         schedule_pairs)
+from .spill import ChunkedOHLC, memory_budget_rows, regroup_trades
+from .tradecache import download_trades_cached
+from .trades import download_trades, iter_trades_pages, trades_as_dataframe
+from .verification import (TRADE_RATE_WINDOW, duplicated_trades,
+                           gaps_without_trades, is_trades_report_valid,
+                           repair_trades, trades_gaps, verify_trades)
+from .workqueue import (LEASE_DURATION, JobHeartbeat, complete_job,
+                        connect_queue, enqueue_jobs, fail_job, lease_job)
 
 logger: logging.Logger = logging.getLogger(__name__)
 
 
+def pair_trades_filepath(pair: str, config: Config) -> str:
+    """
+    Generate trade history file path in data folder for specified pair and
+    configuration.
+
+    :param pair: Pair name as string.
+    :param config: Config object.
+    :return: Trade history file path as string.
+    """
+    return define_filepath(
+        "trade_history",
+        pair,
+        config.start_datetime,
+        config.end_datetime,
+        compression=config.csv_compression,
+    )
+
+
+def check_job_lease(config: Config) -> None:
+    """
+    Stop a work queue job before it writes files if its lease was lost, so a job
+    is never processed by several workers at once.
+
+    :param config: Config object.
+    :return: None
+    """
+    if config.job_heartbeat is not None:
+        config.job_heartbeat.check()
+
+
+def check_job_lease_chunks(
+    config: Config, chunks: Iterable[pd.DataFrame]
+) -> Iterator[pd.DataFrame]:
+    """
+    Check the work queue job lease before each chunk of trades is processed.
+
+    :param config: Config object.
+    :param chunks: Iterable of trades pandas DataFrame chunks.
+    :return: Iterator of trades pandas DataFrame chunks.
+    """
+    for df_chunk in chunks:
+        check_job_lease(config)
+        yield df_chunk
+
+
+def pair_confirmed_gaps(pair_range: dict) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+    """
+    Get gaps of pair trade history confirmed without trades by previous runs.
+
+    :param pair_range: Metadata of the pair dates range as dict.
+    :return: List of gaps start and end dates.
+    """
+    return [
+        (pd.Timestamp(gap_start), pd.Timestamp(gap_end))
+        for gap_start, gap_end in pair_range.get("confirmed_gaps", [])
+    ]
+
+
 def handle_pair_trades(
-    pair: str, config: Config, data_folder_path: str
+    pair: str,
+    config: Config,
+    data_folder_path: str,
+    download: bool = True,
+    confirmed_gaps: list = None,
+    recorded_filepath: str = None,
 ) -> pd.DataFrame:
     """
     If does not exist yet, download trade history for specified pair and
-    configuration and save it as pandas DataFrame.
+    configuration and save it as pandas DataFrame. Trades merged by compaction
+    are read from the partition recorded in metadata.
 
     :param pair: Pair to download trade history.
     :param config: Config object.
     :param data_folder_path: Data folder path as string.
+    :param download: Download trades if not existing, otherwise return empty trades.
+    :param confirmed_gaps: List of trades gaps confirmed without trades, gaps
+        downloaded again without trades by repair are added to it.
+    :param recorded_filepath: Trade history file path recorded in metadata.
     :return: Pair trade history as pandas DataFrame.
     """
     # Get pair trades
-    trades_filepath = define_filepath(
-        "trade_history", pair, config.start_datetime, config.end_datetime
+    trades_filepath = pair_trades_filepath(pair, config)
+    saved_filepath = catalog_filepath(
+        data_folder_path, trades_filepath, recorded_filepath
     )
-    df_trades = read_csv(data_folder_path + "/" + trades_filepath)
-    if df_trades.empty:
-        df_trades = download_trades(
-            config.ka, pair, config.start_datetime, config.end_datetime
+    with config.profiler.stage("read", pair):
+        df_trades = read_csv(
+            data_folder_path + "/" + saved_filepath,
+            "trades",
+            start_datetime=config.start_datetime,
+            end_datetime=config.end_datetime,
+            engine=config.csv_read_engine,
+            dtype_backend=config.dtype_backend,
         )
+    if df_trades.empty and not download:
+        logger.info(f"{pair}: No trades saved at {trades_filepath}.")
+    elif df_trades.empty:
+        with config.profiler.stage("download", pair):
+            if config.shared_trade_cache:
+                df_trades = download_trades_cached(
+                    config.ka,
+                    pair,
+                    config.start_datetime,
+                    config.end_datetime,
+                    config.shared_trade_cache,
+                    config.rate_limiter,
+                    config.dtype_backend,
+                )
+            else:
+                df_trades = download_trades(
+                    config.ka,
+                    pair,
+                    config.start_datetime,
+                    config.end_datetime,
+                    config.rate_limiter,
+                    config.dtype_backend,
+                )
         if config.save_trade_history_as_csv:
-            df_trades.to_csv(data_folder_path + "/" + trades_filepath)
+            check_job_lease(config)
+            with config.profiler.stage("write", pair):
+                write_csv(
+                    df_trades,
+                    data_folder_path + "/" + trades_filepath,
+                    config.csv_float_decimals,
+                    config.csv_compression,
+                )
             logger.info(f"{pair}: Trades saved to {trades_filepath}.")
     else:
-        logger.info(f"{pair}: Trades already existing at {trades_filepath}.")
+        logger.info(f"{pair}: Trades already existing at {saved_filepath}.")
+    if config.trade_verification["enabled"] and not df_trades.empty:
+        with config.profiler.stage("verify", pair):
+            df_trades = handle_pair_trades_verification(
+                pair,
+                config,
+                df_trades,
+                data_folder_path + "/" + trades_filepath,
+                confirmed_gaps,
+            )
+    return df_trades
+
+
+def handle_pair_trades_verification(
+    pair: str,
+    config: Config,
+    df_trades: pd.DataFrame,
+    trades_filepath: str,
+    confirmed_gaps: list = None,
+) -> pd.DataFrame:
+    """
+    Verify pair trade history integrity and log found issues. If repair is enabled,
+    repair trades and save them again if saved as CSV and changed. Gaps confirmed
+    without trades are not suspicious, so they are downloaded again only once.
+
+    :param pair: Pair of trades.
+    :param config: Config object.
+    :param df_trades: Pair trade history as pandas DataFrame.
+    :param trades_filepath: Trade history file path as string.
+    :param confirmed_gaps: List of trades gaps confirmed without trades, gaps
+        downloaded again without trades by repair are added to it.
+    :return: Pair trade history as pandas DataFrame, repaired if enabled.
+    """
+    report = verify_trades(
+        df_trades,
+        config.trade_verification["gap_factor"],
+        pd.Timedelta(minutes=config.trade_verification["min_gap_minutes"]),
+        config.start_datetime,
+        config.end_datetime,
+        confirmed_gaps,
+    )
+    if is_trades_report_valid(report):
+        return df_trades
+    logger.warning(
+        f"{pair}: {report['duplicates']} duplicated trades, "
+        f"{report['time_regressions']} time regressions and "
+        f"{len(report['gaps'])} suspicious gaps in trade history."
+    )
+    if config.trade_verification["repair"]:
+        df_repaired = repair_trades(
+            config.ka,
+            pair,
+            df_trades,
+            report,
+            config.rate_limiter,
+            config.dtype_backend,
+        )
+        if confirmed_gaps is not None:
+            confirmed_gaps += gaps_without_trades(df_repaired.index, report["gaps"])
+        if (
+            not report["duplicates"]
+            and not report["time_regressions"]
+            and len(df_repaired) == len(df_trades)
+        ):
+            logger.info(f"{pair}: No trades downloaded again in suspicious gaps.")
+            return df_trades
+        df_trades = df_repaired
+        if config.save_trade_history_as_csv:
+            check_job_lease(config)
+            write_csv(
+                df_trades,
+                trades_filepath,
+                config.csv_float_decimals,
+                config.csv_compression,
+            )
+        logger.info(f"{pair}: Trades repaired.")
     return df_trades
 
 
@@ -45,17 +250,21 @@ def handle_pair_frequency_ohlc(
     df_trades: pd.DataFrame,
     frequency: str,
     data_folder_path: str,
-) -> None:
+    recorded_filepath: str = None,
+) -> Optional[str]:
     """
     If does not exist yet, create OHLC DataFrame and save it as CSV for specified
-    pair and frequency from trades DataFrame.
+    pair and frequency from trades DataFrame. OHLC merged by compaction exists in
+    the partition recorded in metadata. If OHLC cache is enabled, OHLC is created
+    again when trades or parameters changed.
 
     :param pair: Pair to generate OHLC.
     :param config: Config object.
     :param df_trades: Pair trades as pandas DataFrame.
     :param frequency: OHLC frequency as string.
     :param data_folder_path: Data folder path as string.
-    :return: None
+    :param recorded_filepath: OHLC file path recorded in metadata.
+    :return: OHLC file path, None if not enough data to save OHLC.
     """
     ohlc_filepath = define_filepath(
         "ohlc",
@@ -64,36 +273,865 @@ def handle_pair_frequency_ohlc(
         config.end_datetime,
         frequency,
         config.volume_in_quote_asset,
+        config.csv_compression,
     )
-    df_ohlc = read_csv(data_folder_path + "/" + ohlc_filepath)
-    if df_ohlc.empty:
+    saved_filepath = catalog_filepath(
+        data_folder_path, ohlc_filepath, recorded_filepath
+    )
+    if config.ohlc_cache and not df_trades.empty:
+        return handle_pair_frequency_ohlc_cached(
+            pair,
+            config,
+            df_trades,
+            frequency,
+            data_folder_path,
+            ohlc_filepath,
+            saved_filepath,
+        )
+    # Partitions are not read again, they are only merged from saved OHLC
+    if (
+        saved_filepath == ohlc_filepath
+        and read_csv(
+            data_folder_path + "/" + ohlc_filepath,
+            "ohlc",
+            engine=config.csv_read_engine,
+        ).empty
+    ):
         # Convert trade history to ohlc for specified frequency
-        df_ohlc = trades_to_ohlc(df_trades, frequency, config.volume_in_quote_asset)
+        with config.profiler.stage("resample", pair, frequency):
+            df_ohlc = trades_to_ohlc(
+                df_trades,
+                frequency,
+                config.volume_in_quote_asset,
+                config.ohlc_fill_policy,
+                config.ohlc_statistics,
+                config.bar_anchoring,
+            )
+        return save_pair_frequency_ohlc(
+            pair, config, df_ohlc, frequency, data_folder_path, ohlc_filepath
+        )
+    frequency = frequency.replace("T", "M").replace("1W-MON", "1W")
+    logger.info(f"{pair} {frequency}: Already existing at {saved_filepath}.")
+    return saved_filepath
+
+
+def handle_pair_frequency_ohlc_cached(
+    pair: str,
+    config: Config,
+    df_trades: pd.DataFrame,
+    frequency: str,
+    data_folder_path: str,
+    ohlc_filepath: str,
+    saved_filepath: str = None,
+) -> Optional[str]:
+    """
+    Create OHLC DataFrame and save it as CSV if the trades or parameters it was
+    generated from changed. Partial bars are cached by chunk of trades, so only
+    bars of changed chunks are computed.
+
+    :param pair: Pair to generate OHLC.
+    :param config: Config object.
+    :param df_trades: Pair trades as pandas DataFrame.
+    :param frequency: OHLC frequency as string.
+    :param data_folder_path: Data folder path as string.
+    :param ohlc_filepath: OHLC file path relative to data folder as string.
+    :param saved_filepath: File path OHLC is saved at, like a partition merging
+        it, OHLC file path if None.
+    :return: OHLC file path, None if not enough data to save OHLC.
+    """
+    saved_filepath = saved_filepath or ohlc_filepath
+    cache_folder_path = f"{data_folder_path}/{CACHE_FOLDER}"
+    chunks = trades_chunks(df_trades)
+    keys = partial_ohlc_keys(
+        chunks,
+        frequency,
+        config.volume_in_quote_asset,
+        config.ohlc_statistics,
+        config.bar_anchoring,
+    )
+    output_key = cache_key(
+        keys,
+        config.ohlc_fill_policy,
+        config.start_datetime,
+        config.end_datetime,
+        config.csv_float_decimals,
+    )
+    if os.path.exists(f"{data_folder_path}/{saved_filepath}") and output_key == (
+        read_output_key(cache_folder_path, ohlc_filepath)
+    ):
+        frequency = frequency.replace("T", "M").replace("1W-MON", "1W")
+        logger.info(f"{pair} {frequency}: Already existing at {saved_filepath}.")
+        return saved_filepath
+    with config.profiler.stage("resample", pair, frequency):
+        df_ohlc = trades_to_ohlc_cached(
+            chunks,
+            keys,
+            cache_folder_path,
+            frequency,
+            config.volume_in_quote_asset,
+            config.ohlc_fill_policy,
+            config.ohlc_statistics,
+            config.bar_anchoring,
+        )
+    ohlc_filepath = save_pair_frequency_ohlc(
+        pair, config, df_ohlc, frequency, data_folder_path, ohlc_filepath
+    )
+    if ohlc_filepath:
+        write_output_key(cache_folder_path, ohlc_filepath, output_key, keys)
+    return ohlc_filepath
+
+
+def save_pair_frequency_ohlc(
+    pair: str,
+    config: Config,
+    df_ohlc: pd.DataFrame,
+    frequency: str,
+    data_folder_path: str,
+    ohlc_filepath: str,
+) -> Optional[str]:
+    """
+    Adjust OHLC to configuration dates and save it as CSV.
+
+    :param pair: Pair of OHLC.
+    :param config: Config object.
+    :param df_ohlc: OHLC pandas DataFrame.
+    :param frequency: OHLC frequency as string.
+    :param data_folder_path: Data folder path as string.
+    :param ohlc_filepath: OHLC file path relative to data folder as string.
+    :return: OHLC file path, None if not enough data to save OHLC.
+    """
+    with config.profiler.stage("trim", pair, frequency):
         df_ohlc = adjust_ohlc_frequency_dates(
-            config.start_datetime, config.end_datetime, frequency, df_ohlc, pair
+            config.start_datetime,
+            config.end_datetime,
+            frequency,
+            df_ohlc,
+            pair,
+            config.bar_anchoring,
+        )
+    if df_ohlc.empty:
+        return None
+    check_job_lease(config)
+    with config.profiler.stage("write", pair, frequency):
+        write_csv(
+            df_ohlc,
+            data_folder_path + "/" + ohlc_filepath,
+            config.csv_float_decimals,
+            config.csv_compression,
+        )
+    config.run_stats.add_bars(pair, len(df_ohlc))
+    frequency = frequency.replace("T", "M").replace("1W-MON", "1W")
+    logger.info(f"{pair} {frequency}: Saved to {ohlc_filepath}.")
+    return ohlc_filepath
+
+
+def handle_pair(
+    pair: str, config: Config, data_folder_path: str, download: bool = True
+) -> Optional[dict]:
+    """
+    Get pair trades and generate its OHLC for configured frequencies.
+
+    :param pair: Pair to handle.
+    :param config: Config object.
+    :param data_folder_path: Data folder path as string.
+    :param download: Download missing trades, only aggregate saved trades if False.
+    :return: Number of trades, trade history file path, generated OHLC file paths
+        by frequency and output windows as dict, None if trades are not saved and
+        not downloaded.
+    """
+    # Outputs of the dates range recorded by previous runs, possibly merged by
+    # compaction in partitions
+    pair_range = pair_range_metadata(
+        read_metadata(data_folder_path),
+        pair,
+        config.start_datetime,
+        config.end_datetime,
+    )
+    if config.memory_budget_mb:
+        return handle_pair_chunked(pair, config, data_folder_path, download, pair_range)
+    recorded_filepaths = pair_range.get("ohlc_filepaths", {})
+    native_ohlc = dict()
+    if (
+        config.native_ohlc
+        and not config.ohlc_windows
+        and not is_anchored(config.bar_anchoring)
+        and download
+        and not os.path.exists(
+            f"{data_folder_path}/"
+            + catalog_filepath(
+                data_folder_path,
+                pair_trades_filepath(pair, config),
+                pair_range.get("trades_filepath"),
+            )
+        )
+    ):
+        native_ohlc = handle_pair_native_ohlc(pair, config)
+        if all(df_ohlc is not None for df_ohlc in native_ohlc.values()):
+            return save_pair_native_ohlc(
+                pair, config, native_ohlc, data_folder_path, recorded_filepaths
+            )
+        logger.info(f"{pair}: Native OHLC not available, OHLC built from trades.")
+    confirmed_gaps = None
+    if config.trade_verification["enabled"]:
+        confirmed_gaps = pair_confirmed_gaps(pair_range)
+    df_trades = handle_pair_trades(
+        pair,
+        config,
+        data_folder_path,
+        download,
+        confirmed_gaps,
+        pair_range.get("trades_filepath"),
+    )
+    if not download and df_trades.empty:
+        return None
+    ohlc_filepaths = dict()
+    for frequency in config.ohlc_frequencies:
+        ohlc_filepaths[frequency] = handle_pair_frequency_ohlc(
+            pair,
+            config,
+            df_trades,
+            frequency,
+            data_folder_path,
+            recorded_filepaths.get(frequency),
+        )
+    for frequency, df_native in native_ohlc.items():
+        if df_native is not None and not df_trades.empty:
+            check_pair_native_ohlc(pair, config, df_trades, frequency, df_native)
+    result = {
+        "trade_count": len(df_trades),
+        # Trades downloaded or repaired again are saved in their own file
+        "trades_filepath": catalog_filepath(
+            data_folder_path,
+            pair_trades_filepath(pair, config),
+            pair_range.get("trades_filepath"),
+        ),
+        "ohlc_filepaths": ohlc_filepaths,
+    }
+    if confirmed_gaps:
+        result["confirmed_gaps"] = [
+            [str(gap_start), str(gap_end)] for gap_start, gap_end in confirmed_gaps
+        ]
+    if config.ohlc_windows:
+        result["windows"] = handle_pair_windows(
+            pair, config, df_trades, data_folder_path, pair_range.get("windows")
+        )
+    return result
+
+
+def handle_pair_windows(
+    pair: str,
+    config: Config,
+    df_trades: pd.DataFrame,
+    data_folder_path: str,
+    recorded_windows: list = None,
+) -> list[dict]:
+    """
+    Generate OHLC of configured output windows within configuration dates for
+    configured frequencies, trades of each window being sliced from pair trades
+    between configuration dates.
+
+    :param pair: Pair to generate OHLC.
+    :param config: Config object.
+    :param df_trades: Pair trades between configuration dates as pandas DataFrame.
+    :param data_folder_path: Data folder path as string.
+    :param recorded_windows: Output windows recorded in metadata by previous runs.
+    :return: List of windows dates, number of trades and OHLC file paths by
+        frequency as dict.
+    """
+    windows = list()
+    for start_datetime, end_datetime in config.ohlc_windows:
+        # Work queue jobs only cover part of download dates
+        if start_datetime < config.start_datetime or end_datetime > config.end_datetime:
+            logger.warning(
+                f"{pair}: Output window {start_datetime} - {end_datetime} not "
+                f"between dates {config.start_datetime} - {config.end_datetime}, "
+                "window skipped."
+            )
+            continue
+        window_config = copy.copy(config)
+        window_config.start_datetime = start_datetime
+        window_config.end_datetime = end_datetime
+        start = df_trades.index.searchsorted(start_datetime)
+        end = df_trades.index.searchsorted(end_datetime)
+        df_window = df_trades.iloc[start:end]
+        recorded_filepaths = next(
+            (
+                window["ohlc_filepaths"]
+                for window in recorded_windows or []
+                if (window["start_datetime"], window["end_datetime"])
+                == (str(start_datetime), str(end_datetime))
+            ),
+            {},
+        )
+        ohlc_filepaths = dict()
+        for frequency in config.ohlc_frequencies:
+            ohlc_filepaths[frequency] = handle_pair_frequency_ohlc(
+                pair,
+                window_config,
+                df_window,
+                frequency,
+                data_folder_path,
+                recorded_filepaths.get(frequency),
+            )
+        windows.append(
+            {
+                "start_datetime": str(start_datetime),
+                "end_datetime": str(end_datetime),
+                "trade_count": len(df_window),
+                "ohlc_filepaths": ohlc_filepaths,
+            }
+        )
+    return windows
+
+
+def handle_pair_native_ohlc(pair: str, config: Config) -> dict:
+    """
+    Download native OHLC bars of a pair for configured frequencies from the Kraken
+    API OHLC method. Trade count is always downloaded to count pair trades.
+
+    :param pair: Pair to download OHLC.
+    :param config: Config object.
+    :return: Native OHLC DataFrames by frequency, None for frequencies not
+        available as native bars.
+    """
+    statistics = config.ohlc_statistics + (
+        [] if "trade_count" in config.ohlc_statistics else ["trade_count"]
+    )
+    native_ohlc = dict()
+    with config.profiler.stage("download", pair):
+        for frequency in config.ohlc_frequencies:
+            native_ohlc[frequency] = download_native_ohlc(
+                config.ka,
+                pair,
+                frequency,
+                config.start_datetime,
+                config.end_datetime,
+                config.rate_limiter,
+                config.volume_in_quote_asset,
+                statistics,
+            )
+    return native_ohlc
+
+
+def save_pair_native_ohlc(
+    pair: str,
+    config: Config,
+    native_ohlc: dict,
+    data_folder_path: str,
+    recorded_filepaths: dict = None,
+) -> dict:
+    """
+    Apply fill policy to native OHLC bars of a pair and save them as CSV if not
+    existing yet. Trades are not downloaded, their number is counted from bars of
+    the smallest frequency overlapping dates, so it includes trades of incomplete
+    first and last bars outside dates.
+
+    :param pair: Pair of OHLC.
+    :param config: Config object.
+    :param native_ohlc: Native OHLC DataFrames by frequency.
+    :param data_folder_path: Data folder path as string.
+    :param recorded_filepaths: OHLC file paths by frequency recorded in metadata.
+    :return: Number of trades, no trade history file path and generated OHLC file
+        paths by frequency as dict.
+    """
+    smallest_frequency = min(native_ohlc, key=frequency_timedelta)
+    trade_count = int(native_ohlc[smallest_frequency]["trade_count"].sum())
+    ohlc_filepaths = dict()
+    for frequency, df_ohlc in native_ohlc.items():
+        ohlc_filepath = define_filepath(
+            "ohlc",
+            pair,
+            config.start_datetime,
+            config.end_datetime,
+            frequency,
+            config.volume_in_quote_asset,
+            config.csv_compression,
+        )
+        saved_filepath = catalog_filepath(
+            data_folder_path, ohlc_filepath, (recorded_filepaths or {}).get(frequency)
         )
-        if not df_ohlc.empty:
-            df_ohlc.to_csv(data_folder_path + "/" + ohlc_filepath)
+        if os.path.exists(f"{data_folder_path}/{saved_filepath}"):
+            ohlc_filepaths[frequency] = saved_filepath
             frequency = frequency.replace("T", "M").replace("1W-MON", "1W")
-            logger.info(f"{pair} {frequency}: Saved to {ohlc_filepath}.")
-    else:
+            logger.info(f"{pair} {frequency}: Already existing at {saved_filepath}.")
+            continue
+        df_ohlc = fill_ohlc_gaps(
+            df_ohlc[
+                ["open", "high", "low", "close", "volume"] + config.ohlc_statistics
+            ],
+            config.ohlc_fill_policy,
+        )
+        ohlc_filepaths[frequency] = save_pair_frequency_ohlc(
+            pair, config, df_ohlc, frequency, data_folder_path, ohlc_filepath
+        )
+    return {
+        "trade_count": trade_count,
+        "trades_filepath": None,
+        "ohlc_filepaths": ohlc_filepaths,
+    }
+
+
+def check_pair_native_ohlc(
+    pair: str,
+    config: Config,
+    df_trades: pd.DataFrame,
+    frequency: str,
+    df_native: pd.DataFrame,
+) -> None:
+    """
+    Compare complete native OHLC bars of a pair with bars resampled from its
+    trades and log mismatching bars.
+
+    :param pair: Pair of OHLC.
+    :param config: Config object.
+    :param df_trades: Pair trades as pandas DataFrame.
+    :param frequency: OHLC frequency as string.
+    :param df_native: Native OHLC DataFrame.
+    :return: None
+    """
+    df_ohlc = trades_to_ohlc(
+        df_trades,
+        frequency,
+        config.volume_in_quote_asset,
+        "drop",
+        config.ohlc_statistics,
+    )
+    mismatches = native_ohlc_mismatches(
+        trim_incomplete_bars(
+            df_native, frequency, config.start_datetime, config.end_datetime
+        ),
+        trim_incomplete_bars(
+            df_ohlc, frequency, config.start_datetime, config.end_datetime
+        ),
+    )
+    if mismatches:
         frequency = frequency.replace("T", "M").replace("1W-MON", "1W")
-        logger.info(f"{pair} {frequency}: Already existing at {ohlc_filepath}.")
+        logger.warning(
+            f"{pair} {frequency}: {mismatches} native OHLC bars do not match trades."
+        )
+
+
+def handle_pair_chunked(
+    pair: str,
+    config: Config,
+    data_folder_path: str,
+    download: bool = True,
+    pair_range: dict = None,
+) -> Optional[dict]:
+    """
+    Get pair trades and generate its OHLC for configured frequencies by chunks of
+    trades fitting in configured memory budget. Saved trades are read by chunks,
+    downloaded trades are saved as CSV by chunks, and OHLC not existing yet is
+    aggregated for all frequencies in the same pass. Trades and OHLC merged by
+    compaction exist in the partitions recorded in metadata.
 
+    :param pair: Pair to handle.
+    :param config: Config object.
+    :param data_folder_path: Data folder path as string.
+    :param download: Download missing trades, only aggregate saved trades if False.
+    :param pair_range: Metadata of the pair dates range recorded by previous runs.
+    :return: Number of trades, trade history file path and generated OHLC file
+        paths by frequency as dict, None if trades are not saved and not downloaded.
+    """
+    pair_range = pair_range or dict()
+    recorded_filepaths = pair_range.get("ohlc_filepaths", {})
+    trades_filepath = catalog_filepath(
+        data_folder_path,
+        pair_trades_filepath(pair, config),
+        pair_range.get("trades_filepath"),
+    )
+    chunk_rows = memory_budget_rows(config.memory_budget_mb)
+    ohlc_filepaths = {
+        frequency: catalog_filepath(
+            data_folder_path,
+            define_filepath(
+                "ohlc",
+                pair,
+                config.start_datetime,
+                config.end_datetime,
+                frequency,
+                config.volume_in_quote_asset,
+                config.csv_compression,
+            ),
+            recorded_filepaths.get(frequency),
+        )
+        for frequency in config.ohlc_frequencies
+    }
+    missing_frequencies = [
+        frequency
+        for frequency, ohlc_filepath in ohlc_filepaths.items()
+        if not os.path.exists(f"{data_folder_path}/{ohlc_filepath}")
+    ]
+    chunked_ohlc = ChunkedOHLC(
+        missing_frequencies,
+        config.volume_in_quote_asset,
+        config.ohlc_statistics,
+        config.bar_anchoring,
+    )
+    chunks = None
+    if os.path.exists(f"{data_folder_path}/{trades_filepath}"):
+        chunks = read_csv_chunks(
+            f"{data_folder_path}/{trades_filepath}",
+            "trades",
+            config.csv_read_engine,
+            chunk_rows,
+            config.start_datetime,
+            config.end_datetime,
+            config.dtype_backend,
+        )
+        # Trades files without trades between dates are handled as missing
+        with config.profiler.stage("read", pair):
+            df_first_chunk = next(chunks, None)
+        chunks = None if df_first_chunk is None else chain([df_first_chunk], chunks)
+    if chunks is not None:
+        logger.info(f"{pair}: Trades already existing at {trades_filepath}.")
+        if config.trade_verification["enabled"]:
+            chunks = verify_trades_chunks(pair, config, chunks)
+        chunks = check_job_lease_chunks(config, chunks)
+        with config.profiler.stage("read", pair):
+            for _ in chunked_ohlc.aggregate(chunks):
+                pass
+    elif not download:
+        logger.info(f"{pair}: No trades saved at {trades_filepath}.")
+        return None
+    else:
+        # Downloaded trades are saved in their own file, never in a partition
+        trades_filepath = pair_trades_filepath(pair, config)
+        pages = iter_trades_pages(
+            config.ka,
+            pair,
+            config.start_datetime,
+            config.end_datetime,
+            config.rate_limiter,
+            config.dtype_backend,
+        )
+        chunks = regroup_trades(pages, chunk_rows)
+        if config.trade_verification["enabled"]:
+            chunks = verify_trades_chunks(pair, config, chunks)
+        chunks = check_job_lease_chunks(config, chunks)
+        chunks = chunked_ohlc.aggregate(chunks)
+        with config.profiler.stage("download", pair):
+            if config.save_trade_history_as_csv:
+                write_csv_chunks(
+                    chunks,
+                    f"{data_folder_path}/{trades_filepath}",
+                    config.csv_float_decimals,
+                    config.csv_compression,
+                    trades_as_dataframe([], config.dtype_backend),
+                )
+            else:
+                for _ in chunks:
+                    pass
+        if config.save_trade_history_as_csv:
+            logger.info(f"{pair}: Trades saved to {trades_filepath}.")
+    for frequency, ohlc_filepath in ohlc_filepaths.items():
+        if frequency in missing_frequencies:
+            ohlc_filepaths[frequency] = save_pair_frequency_ohlc(
+                pair,
+                config,
+                chunked_ohlc.ohlc(frequency, config.ohlc_fill_policy),
+                frequency,
+                data_folder_path,
+                ohlc_filepath,
+            )
+        else:
+            frequency = frequency.replace("T", "M").replace("1W-MON", "1W")
+            logger.info(f"{pair} {frequency}: Already existing at {ohlc_filepath}.")
+    return {
+        "trade_count": chunked_ohlc.trade_count,
+        "trades_filepath": trades_filepath,
+        "ohlc_filepaths": ohlc_filepaths,
+    }
 
-def kraken_ohlc(data_folder_path: str) -> None:
+
+def verify_trades_chunks(
+    pair: str, config: Config, chunks: Iterable[pd.DataFrame]
+) -> Iterator[pd.DataFrame]:
+    """
+    Verify integrity of time ordered chunks of trades as they are iterated, log
+    found issues and drop duplicated trades, which can't be repaired once chunks
+    are aggregated. Trades of the previous chunk not before the first trade of a
+    chunk are verified with it, so pages overlapping two chunks are detected.
+    Gaps after start date and before end date are checked as for whole trades.
+
+    :param pair: Pair of trades.
+    :param config: Config object.
+    :param chunks: Iterable of time ordered trades pandas DataFrame chunks.
+    :return: Iterator of trades pandas DataFrame chunks without duplicates.
+    """
+    gap_factor = config.trade_verification["gap_factor"]
+    min_gap = pd.Timedelta(minutes=config.trade_verification["min_gap_minutes"])
+    previous_datetime = config.start_datetime
+    df_tail = None
+    for df_chunk in chunks:
+        if df_chunk.empty:
+            continue
+        # Overlapping pages repeat at most a page of trades, kept in the tail
+        df_context = (
+            df_chunk.iloc[:0]
+            if df_tail is None
+            else df_tail[df_tail.index >= df_chunk.index.min()]
+        )
+        df_checked = pd.concat([df_context, df_chunk]) if len(df_context) else df_chunk
+        report = verify_trades(df_checked, gap_factor, min_gap, previous_datetime)
+        # Issues of trades of the previous chunk are already reported
+        duplicated = duplicated_trades(df_checked)[len(df_context) :]
+        report["duplicates"] = int(duplicated.sum())
+        report["time_regressions"] = int(
+            (np.diff(df_checked.index.asi8[max(len(df_context) - 1, 0) :]) < 0).sum()
+        )
+        if not is_trades_report_valid(report):
+            logger.warning(
+                f"{pair}: {report['duplicates']} duplicated trades, "
+                f"{report['time_regressions']} time regressions and "
+                f"{len(report['gaps'])} suspicious gaps in trades chunk."
+            )
+        if report["duplicates"]:
+            df_chunk = df_chunk[~duplicated]
+            if df_chunk.empty:
+                continue
+        previous_datetime = df_chunk.index[-1]
+        # Last trades are kept to check overlaps and the trades rate of the gap
+        # before end date
+        df_tail = (
+            df_chunk.iloc[-TRADE_RATE_WINDOW - 1 :]
+            if df_tail is None or len(df_chunk) > TRADE_RATE_WINDOW
+            else pd.concat([df_tail, df_chunk]).iloc[-TRADE_RATE_WINDOW - 1 :]
+        )
+        yield df_chunk
+    end_gaps = trades_gaps(
+        pd.DatetimeIndex([]) if df_tail is None else df_tail.index,
+        gap_factor,
+        min_gap,
+        end_datetime=config.end_datetime,
+    )
+    if end_gaps and end_gaps[-1][1] == config.end_datetime:
+        logger.warning(
+            f"{pair}: Suspicious gap from last trade at {end_gaps[-1][0]} to end "
+            f"date {config.end_datetime}."
+        )
+
+
+def kraken_ohlc(
+    data_folder_path: str,
+    config_file: str = "config.yaml",
+    download: bool = True,
+    profile: bool = False,
+) -> None:
     """
     Kraken OHLC main loop, call loops for pair download and ohlc generation.
+    Generated files are recorded in the data folder metadata after each pair, and
+    the run resource usage and throughput in the data folder run history.
 
     :param data_folder_path: Data folder path as string.
+    :param config_file: Configuration file path as string.
+    :param download: Download missing trades, only aggregate saved trades if False.
+    :param profile: Profile pipeline stages even if profiling is not configured.
     :return: None
     """
     create_data_directory(data_folder_path)
-    config = Config("config.yaml")
+    config = Config(config_file)
+    config.profiler.enabled |= profile
+    metadata = read_metadata(data_folder_path)
+    previous_deferred_pairs = metadata.get("last_run", {}).get("deferred_pairs")
+    metadata["last_run"] = {
+        "config_file": config_file,
+        "started_at": str(datetime.datetime.now(datetime.timezone.utc)),
+        "pairs": len(config.pairs),
+    }
 
-    for pair in config.pairs:
-        df_trades = handle_pair_trades(pair, config, data_folder_path)
-        for frequency in config.ohlc_frequencies:
-            handle_pair_frequency_ohlc(
-                pair, config, df_trades, frequency, data_folder_path
-            )
+    pairs = schedule_pairs(
+        config.pairs,
+        config.scheduling["priorities"],
+        estimated_trade_counts(
+            metadata, config.pairs, config.start_datetime, config.end_datetime
+        ),
+        previous_deferred_pairs,
+    )
+    deadline = RunDeadline(
+        config.scheduling["deadline_minutes"],
+        config.scheduling["deferred_max_priority"],
+    )
+    deferred_pairs = list()
+    for pair in pairs:
+        if deadline.is_deferred(pair_priority(pair, config.scheduling["priorities"])):
+            deferred_pairs.append(pair)
+            continue
+        pair_start_time = time.perf_counter()
+        result = handle_pair(pair, config, data_folder_path, download)
+        if result is None:
+            continue
+        config.run_stats.add_pair(
+            pair, time.perf_counter() - pair_start_time, result["trade_count"]
+        )
+        update_pair_metadata(
+            metadata,
+            pair,
+            config.start_datetime,
+            config.end_datetime,
+            result.get("trades_filepath", pair_trades_filepath(pair, config)),
+            result["trade_count"],
+            result["ohlc_filepaths"],
+            result.get("windows"),
+            result.get("confirmed_gaps"),
+        )
+        write_metadata(data_folder_path, metadata)
+    if deferred_pairs:
+        logger.warning(
+            f"Run deadline passed, {len(deferred_pairs)} pairs deferred: "
+            f"{deferred_pairs}"
+        )
+    metadata["last_run"]["deferred_pairs"] = deferred_pairs
+    if config.ohlc_cache:
+        pruned_files = prune_ohlc_cache(data_folder_path)
+        if pruned_files:
+            logger.info(f"{pruned_files} unused cached partial OHLC files removed.")
+    metadata["last_run"]["api"] = config.rate_limiter.metrics()
+    profiles_summary_filepath = config.profiler.write_profiles(data_folder_path)
+    if profiles_summary_filepath:
+        logger.info(f"Profiles summary saved to {profiles_summary_filepath}.")
+    metadata["last_run"]["finished_at"] = str(
+        datetime.datetime.now(datetime.timezone.utc)
+    )
+    write_metadata(data_folder_path, metadata)
+    summary = config.run_stats.summary(metadata["last_run"]["api"]["requests"])
+    append_run_history(
+        data_folder_path,
+        {
+            "started_at": metadata["last_run"]["started_at"],
+            "finished_at": metadata["last_run"]["finished_at"],
+            "config_file": config_file,
+            "download": download,
+            **summary,
+        },
+    )
+    logger.info(
+        f"Run summary: {summary['wall_seconds']}s, {summary['cpu_seconds']}s CPU, "
+        f"{summary['api_calls']} API calls, {summary['trades_per_second']} trades/s, "
+        f"{summary['bars_per_second']} bars/s."
+    )
+
+
+def kraken_ohlc_enqueue(
+    data_folder_path: str, config_file: str = "config.yaml", range_days: int = None
+) -> int:
+    """
+    Coordinator of work queue mode, add a job per configured pair and dates range
+    to the data folder work queue.
+
+    :param data_folder_path: Data folder path as string.
+    :param config_file: Configuration file path as string.
+    :param range_days: Number of days per job, a job per pair if None.
+    :return: Number of added jobs.
+    """
+    create_data_directory(data_folder_path)
+    config = Config(config_file)
+    if range_days and config.ohlc_windows:
+        # Jobs only download trades of their range, not of windows crossing it
+        raise ValueError(
+            "output_windows can't be generated by jobs of range_days, please "
+            "disable one of them."
+        )
+    metadata = read_metadata(data_folder_path)
+    # Jobs are leased in insertion order
+    pairs = schedule_pairs(
+        config.pairs,
+        config.scheduling["priorities"],
+        estimated_trade_counts(
+            metadata, config.pairs, config.start_datetime, config.end_datetime
+        ),
+        metadata.get("last_run", {}).get("deferred_pairs"),
+    )
+    connection = connect_queue(data_folder_path)
+    try:
+        return enqueue_jobs(
+            connection,
+            pairs,
+            config.start_datetime,
+            config.end_datetime,
+            range_days,
+        )
+    finally:
+        connection.close()
+
+
+def kraken_ohlc_worker(
+    data_folder_path: str,
+    config_file: str = "config.yaml",
+    worker: str = None,
+    lease_duration: float = LEASE_DURATION,
+    profile: bool = False,
+) -> int:
+    """
+    Worker of work queue mode, lease jobs from the data folder work queue and
+    handle their pair and dates range until no job is left. Job leases are
+    extended while jobs are processed, jobs whose lease is lost stop before
+    writing files, and metadata is updated when a job is completed.
+
+    :param data_folder_path: Data folder path as string.
+    :param config_file: Configuration file path as string.
+    :param worker: Worker identifier, host name and process id if None.
+    :param lease_duration: Job lease duration in seconds.
+    :param profile: Profile pipeline stages even if profiling is not configured.
+    :return: Number of jobs completed by worker.
+    """
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    create_data_directory(data_folder_path)
+    config = Config(config_file)
+    config.profiler.enabled |= profile
+    connection = connect_queue(data_folder_path)
+    completed_jobs = 0
+    try:
+        while (job := lease_job(connection, worker, lease_duration)) is not None:
+            logger.info(f"{worker}: Leased job {job['id']}.")
+            job_config = copy.copy(config)
+            job_config.start_datetime = datetime.datetime.fromisoformat(job["start"])
+            job_config.end_datetime = datetime.datetime.fromisoformat(job["end"])
+            heartbeat = JobHeartbeat(data_folder_path, job, lease_duration)
+            job_config.job_heartbeat = heartbeat
+            try:
+                with heartbeat:
+                    result = handle_pair(job["pair"], job_config, data_folder_path)
+            except Exception as e:
+                # Jobs stopped because their lease was lost are abandoned
+                if not heartbeat.error:
+                    logger.error(f"{worker}: Job {job['id']} failed -> {e}")
+                    fail_job(connection, job["id"], worker, str(e))
+                    continue
+            if heartbeat.error:
+                # Another worker may be processing the job since the lease expired
+                logger.warning(
+                    f"{worker}: Job {job['id']} abandoned -> {heartbeat.error}"
+                )
+                fail_job(connection, job["id"], worker, heartbeat.error)
+                continue
+
+            def commit_result() -> None:
+                metadata = read_metadata(data_folder_path)
+                update_pair_metadata(
+                    metadata,
+                    job["pair"],
+                    job_config.start_datetime,
+                    job_config.end_datetime,
+                    result.get(
+                        "trades_filepath", pair_trades_filepath(job["pair"], job_config)
+                    ),
+                    result["trade_count"],
+                    result["ohlc_filepaths"],
+                    result.get("windows"),
+                    result.get("confirmed_gaps"),
+                )
+                write_metadata(data_folder_path, metadata)
+
+            if complete_job(connection, job["id"], worker, result, commit_result):
+                completed_jobs += 1
+            else:
+                logger.warning(
+                    f"{worker}: Job {job['id']} completed by another worker."
+                )
+    finally:
+        connection.close()
+    profiles_summary_filepath = config.profiler.write_profiles(data_folder_path, worker)
+    if profiles_summary_filepath:
+        logger.info(f"{worker}: Profiles summary saved to {profiles_summary_filepath}.")
+    return completed_jobs
@@ -0,0 +1,163 @@
+import datetime
+import json
+import os
+
+METADATA_FILENAME: str = "metadata.json"
+
+
+def metadata_filepath(data_folder_path: str) -> str:
+    """
+    Generate the metadata file path of a data folder.
+
+    :param data_folder_path: Data folder path as string.
+    :return: Metadata file path as string.
+    """
+    return f"{data_folder_path}/{METADATA_FILENAME}"
+
+
+def read_metadata(data_folder_path: str) -> dict:
+    """
+    Read the metadata of previous runs saved in data folder. Pairs metadata are
+    lists of dates ranges metadata.
+
+    :param data_folder_path: Data folder path as string.
+    :return: Metadata as dict, empty if no metadata saved yet.
+    """
+    try:
+        with open(metadata_filepath(data_folder_path), "r") as stream:
+            metadata = json.load(stream)
+    except FileNotFoundError:
+        metadata = dict()
+    except json.JSONDecodeError as e:
+        raise ValueError(
+            f"Can't read metadata at {metadata_filepath(data_folder_path)} -> {e}"
+        )
+    metadata.setdefault("pairs", dict())
+    for pair, pair_ranges in metadata["pairs"].items():
+        # Earlier versions recorded the last dates range of each pair
+        if isinstance(pair_ranges, dict):
+            metadata["pairs"][pair] = [pair_ranges]
+    return metadata
+
+
+def write_metadata(data_folder_path: str, metadata: dict) -> None:
+    """
+    Save metadata in data folder, the file is replaced atomically so readers never
+    see a partially written file.
+
+    :param data_folder_path: Data folder path as string.
+    :param metadata: Metadata as dict.
+    :return: None
+    """
+    filepath = metadata_filepath(data_folder_path)
+    with open(f"{filepath}.tmp", "w") as stream:
+        json.dump(metadata, stream, indent=2, default=str)
+    os.replace(f"{filepath}.tmp", filepath)
+
+
+def pair_range_metadata(
+    metadata: dict,
+    pair: str,
+    start_datetime: datetime.datetime,
+    end_datetime: datetime.datetime,
+) -> dict:
+    """
+    Get metadata of a pair dates range recorded by a previous run.
+
+    :param metadata: Metadata as dict.
+    :param pair: Pair name as string.
+    :param start_datetime: Trades start date as datetime.
+    :param end_datetime: Trades end date as datetime.
+    :return: Dates range metadata as dict, empty if not recorded.
+    """
+    for pair_range in metadata["pairs"].get(pair, []):
+        if (pair_range["start_datetime"], pair_range["end_datetime"]) == (
+            str(start_datetime),
+            str(end_datetime),
+        ):
+            return pair_range
+    return dict()
+
+
+def catalog_filepath(
+    data_folder_path: str, filepath: str, recorded_filepath: str = None
+) -> str:
+    """
+    Resolve an output file path of a dates range through the metadata catalog:
+    once merged by compaction, the output is saved in the partition recorded in
+    metadata instead of its own file.
+
+    :param data_folder_path: Data folder path as string.
+    :param filepath: Output file path relative to data folder as string.
+    :param recorded_filepath: Output file path recorded in metadata, None if not
+        recorded.
+    :return: Recorded file path if existing instead of the output file, output
+        file path otherwise.
+    """
+    if (
+        recorded_filepath
+        and recorded_filepath != filepath
+        and not os.path.exists(f"{data_folder_path}/{filepath}")
+        and os.path.exists(f"{data_folder_path}/{recorded_filepath}")
+    ):
+        return recorded_filepath
+    return filepath
+
+
+def update_pair_metadata(
+    metadata: dict,
+    pair: str,
+    start_datetime: datetime.datetime,
+    end_datetime: datetime.datetime,
+    trades_filepath: str,
+    trade_count: int,
+    ohlc_filepaths: dict,
+    windows: list = None,
+    confirmed_gaps: list = None,
+) -> None:
+    """
+    Update metadata with pair trades and OHLC files generated by a run or a work
+    queue job for a dates range. Ranges with other dates, like ranges of other jobs
+    of the pair, are kept, sorted by dates. Gaps confirmed without trades of the
+    range are kept if not specified.
+
+    :param metadata: Metadata as dict.
+    :param pair: Pair name as string.
+    :param start_datetime: Trades start date as datetime.
+    :param end_datetime: Trades end date as datetime.
+    :param trades_filepath: Trade history file path in data folder.
+    :param trade_count: Number of trades.
+    :param ohlc_filepaths: OHLC file paths in data folder by frequency.
+    :param windows: Output windows dates, number of trades and OHLC file paths by
+        frequency, not recorded if None or empty.
+    :param confirmed_gaps: List of trades gaps start and end dates confirmed
+        without trades.
+    :return: None
+    """
+    pair_range = {
+        "start_datetime": str(start_datetime),
+        "end_datetime": str(end_datetime),
+        "trades_filepath": trades_filepath,
+        "trade_count": trade_count,
+        "ohlc_filepaths": ohlc_filepaths,
+        "updated_at": str(datetime.datetime.now(datetime.timezone.utc)),
+    }
+    if windows:
+        pair_range["windows"] = windows
+    if confirmed_gaps is None:
+        confirmed_gaps = pair_range_metadata(
+            metadata, pair, start_datetime, end_datetime
+        ).get("confirmed_gaps")
+    if confirmed_gaps:
+        pair_range["confirmed_gaps"] = [
+            [str(gap_start), str(gap_end)] for gap_start, gap_end in confirmed_gaps
+        ]
+    pair_ranges = [
+        i
+        for i in metadata["pairs"].get(pair, [])
+        if (i["start_datetime"], i["end_datetime"])
+        != (pair_range["start_datetime"], pair_range["end_datetime"])
+    ]
+    pair_ranges.append(pair_range)
+    pair_ranges.sort(key=lambda i: (i["start_datetime"], i["end_datetime"]))
+    metadata["pairs"][pair] = pair_ranges
@@ -0,0 +1,175 @@
+import datetime
+import logging
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from krakenapi import KrakenApi
+
+from .ohlc import (complete_bars_bounds, frequency_timedelta,
+                   partial_ohlc_to_ohlc)
+from .ratelimit import AdaptiveRateLimiter, send_public_request
+from .trades import datetime_as_utc_unix
+
+logger: logging.Logger = logging.getLogger(__name__)
+# Kraken API OHLC method intervals in minutes by pandas frequency.
+NATIVE_OHLC_INTERVALS: dict[str, int] = {
+    "1min": 1,
+    "5min": 5,
+    "15min": 15,
+    "30min": 30,
+    "1h": 60,
+    "4h": 240,
+    "1D": 1440,
+    "1W-MON": 10080,
+}
+# Number of most recent bars of an interval served by the Kraken API OHLC method.
+NATIVE_OHLC_BARS: int = 720
+NATIVE_OHLC_STATISTICS: list[str] = ["vwap", "trade_count"]
+NATIVE_OHLC_COLUMNS: list[str] = [
+    "time",
+    "open",
+    "high",
+    "low",
+    "close",
+    "vwap",
+    "volume",
+    "count",
+]
+
+
+def is_native_ohlc_supported(frequency: str, statistics: list = None) -> bool:
+    """
+    Check if OHLC bars of a frequency and statistics can be served by the Kraken
+    API OHLC method, which has no volume split by side or order type.
+
+    :param frequency: Frequency as string.
+    :param statistics: List of additional statistics per bar.
+    :return: True if supported, False otherwise.
+    """
+    return frequency in NATIVE_OHLC_INTERVALS and set(statistics or []) <= set(
+        NATIVE_OHLC_STATISTICS
+    )
+
+
+def native_ohlc_as_partial(bars: list, volume_in_quote_asset: bool) -> pd.DataFrame:
+    """
+    Convert Kraken API OHLC bars to partial OHLC bars, with notional and base
+    volume computed from native vwap. Bars without trades are kept.
+
+    :param bars: List of Kraken API OHLC bars.
+    :param volume_in_quote_asset: If volume is in quote asset or not.
+    :return: Partial OHLC DataFrame.
+    """
+    df = pd.DataFrame(bars, columns=NATIVE_OHLC_COLUMNS)
+    prices = df[["open", "high", "low", "close", "vwap", "volume"]].astype("float64")
+    notional = prices["vwap"] * prices["volume"]
+    return pd.DataFrame(
+        {
+            "open": prices["open"],
+            "high": prices["high"],
+            "low": prices["low"],
+            "close": prices["close"],
+            "volume": notional if volume_in_quote_asset else prices["volume"],
+            "notional": notional,
+            "base_volume": prices["volume"],
+            "trade_count": df["count"].astype("int64"),
+        }
+    ).set_index(pd.DatetimeIndex(pd.to_datetime(df["time"], unit="s"), name="time"))
+
+
+def are_bars_aligned(bar_dates: pd.DatetimeIndex, frequency: str) -> bool:
+    """
+    Check bars start dates match the bars resampled from trades, Kraken weekly
+    bars not starting on Monday.
+
+    :param bar_dates: Bars start dates.
+    :param frequency: Frequency as string.
+    :return: True if all bars are aligned, False otherwise.
+    """
+    if frequency == "1W-MON":
+        return bool(
+            ((bar_dates.dayofweek == 0) & (bar_dates == bar_dates.normalize())).all()
+        )
+    return bool((bar_dates == bar_dates.floor(frequency)).all())
+
+
+def download_native_ohlc(
+    ka: KrakenApi,
+    pair: str,
+    frequency: str,
+    start_datetime: datetime.datetime,
+    end_datetime: datetime.datetime,
+    rate_limiter: AdaptiveRateLimiter,
+    volume_in_quote_asset: bool,
+    statistics: list = None,
+) -> Optional[pd.DataFrame]:
+    """
+    Download OHLC bars of a pair between two dates from the Kraken API OHLC method,
+    built like bars resampled from trades without fill policy applied. Native
+    bars are only available for the most recent bars of an interval: if complete
+    bars between dates are not all committed native bars, the bars must be built
+    from trades.
+
+    :param ka: KrakenAPI object.
+    :param pair: Pair to download OHLC.
+    :param frequency: Frequency as string.
+    :param start_datetime: Start date.
+    :param end_datetime: End date.
+    :param rate_limiter: AdaptiveRateLimiter object.
+    :param volume_in_quote_asset: If volume is in quote asset or not.
+    :param statistics: List of additional statistics per bar.
+    :return: OHLC DataFrame, None if not available as native bars.
+    """
+    if not is_native_ohlc_supported(frequency, statistics):
+        return None
+    interval = NATIVE_OHLC_INTERVALS[frequency]
+    data = send_public_request(
+        ka,
+        "OHLC",
+        {
+            "pair": pair,
+            "interval": interval,
+            "since": datetime_as_utc_unix(start_datetime) - interval * 60,
+        },
+        rate_limiter,
+    )
+    bars = next(value for key, value in data.items() if key != "last")
+    # Last bar is the current bar, not committed yet
+    bars = [bar for bar in bars[:-1] if bar[0] <= int(data["last"])]
+    first_bar_date, last_bar_date = complete_bars_bounds(
+        frequency, start_datetime, end_datetime
+    )
+    df_partial = native_ohlc_as_partial(bars, volume_in_quote_asset)
+    if df_partial.empty or not are_bars_aligned(df_partial.index, frequency):
+        return None
+    if df_partial.index[0] > first_bar_date or df_partial.index[-1] < last_bar_date:
+        return None
+    # Bars overlapping dates with trades, like bars resampled from trades
+    df_partial = df_partial[
+        (df_partial.index + frequency_timedelta(frequency) > start_datetime)
+        & (df_partial.index < end_datetime)
+        & (df_partial["trade_count"] > 0)
+    ]
+    return partial_ohlc_to_ohlc(df_partial, frequency, statistics)
+
+
+def native_ohlc_mismatches(
+    df_native: pd.DataFrame, df_ohlc: pd.DataFrame, rtol: float = 1e-6
+) -> int:
+    """
+    Count bars with trades in both native and trades resampled OHLC whose prices,
+    volume or statistics differ.
+
+    :param df_native: Native OHLC DataFrame.
+    :param df_ohlc: OHLC DataFrame resampled from trades.
+    :param rtol: Relative tolerance of compared values.
+    :return: Number of mismatching bars.
+    """
+    bar_dates = df_native.index[df_native["close"].notna()].intersection(
+        df_ohlc.index[df_ohlc["close"].notna()]
+    )
+    columns = [column for column in df_native.columns if column in df_ohlc.columns]
+    native_values = df_native.loc[bar_dates, columns].to_numpy("float64")
+    values = df_ohlc.loc[bar_dates, columns].to_numpy("float64")
+    return int((~np.isclose(native_values, values, rtol=rtol)).any(axis=1).sum())
@@ -1,6 +1,8 @@
 import datetime
+import functools
 import logging
 
+import numpy as np
 import pandas as pd
 
 logger: logging.Logger = logging.getLogger(__name__)
@@ -9,6 +11,30 @@ FREQUENCIES_REPLACE: dict[str, str] = {
     "1W": "1W-MON",
     "H": "h",
 }
+OHLC_FILL_POLICIES: list[str] = ["nan", "ffill", "drop"]
+OHLC_STATISTICS: list[str] = [
+    "vwap",
+    "trade_count",
+    "buy_volume",
+    "sell_volume",
+    "market_volume",
+    "limit_volume",
+]
+# Volume statistics as trades column and value to select.
+TRADES_VOLUME_SPLITS: dict[str, tuple[str, str]] = {
+    "buy_volume": ("buy/sell", "b"),
+    "sell_volume": ("buy/sell", "s"),
+    "market_volume": ("market/limit", "m"),
+    "limit_volume": ("market/limit", "l"),
+}
+# Bars anchored on UTC days starting at midnight and weeks starting on Monday are
+# resampled from the unix epoch, other anchoring uses precomputed bar boundaries.
+BAR_ANCHORING_DEFAULTS: dict = {
+    "time_zone": "UTC",
+    "day_start": "00:00",
+    "week_start": "MON",
+}
+WEEK_DAYS: list[str] = ["MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN"]
 
 
 def pandas_to_kraken_ohlc_frequencies(ohlc_frequencies: list) -> list:
@@ -68,12 +94,233 @@ def check_trades_ohlc_start_end_dates(
     return True
 
 
+@functools.lru_cache(maxsize=None)
+def frequency_timedelta(frequency: str) -> pd.Timedelta:
+    """
+    Get the duration of a bar in specified frequency.
+
+    :param frequency: Frequency as string.
+    :return: Bar duration as pandas Timedelta.
+    """
+    if frequency == "1W-MON":
+        return pd.Timedelta(weeks=1)
+    return pd.Timedelta(pd.tseries.frequencies.to_offset(frequency))
+
+
+@functools.lru_cache(maxsize=None)
+def complete_bars_bounds(
+    frequency: str, start_datetime: datetime, end_datetime: datetime
+) -> tuple[pd.Timestamp, pd.Timestamp]:
+    """
+    Compute the first and last start dates of complete bars between start and end
+    dates for a frequency. Bounds are computed once per frequency and dates, and
+    reused for all pairs.
+
+    :param frequency: Frequency as string.
+    :param start_datetime: Data start date as datetime object.
+    :param end_datetime: Data end date as datetime object.
+    :return: First and last complete bars start dates.
+    """
+    start_date = pd.Timestamp(start_datetime, tz=None)
+    bar_duration = frequency_timedelta(frequency)
+    if frequency == "1W-MON":
+        first_bar_date = start_date.to_period("W-SUN").start_time
+    else:
+        first_bar_date = start_date.floor(freq=frequency)
+    if first_bar_date != start_date:
+        first_bar_date += bar_duration
+    return first_bar_date, last_final_bar_date(frequency, end_datetime)
+
+
+def is_anchored(anchoring: dict) -> bool:
+    """
+    Check if bars anchoring differs from the default anchoring on UTC days
+    starting at midnight and weeks starting on Monday.
+
+    :param anchoring: Bars time zone, day start and week start as dict, None for
+        default anchoring.
+    :return: True if bars are anchored on precomputed boundaries, False otherwise.
+    """
+    return bool(anchoring) and (
+        {**BAR_ANCHORING_DEFAULTS, **anchoring} != BAR_ANCHORING_DEFAULTS
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def anchored_bar_boundaries(
+    frequency: str,
+    time_zone: str,
+    day_start: str,
+    week_start: str,
+    first_day: pd.Timestamp,
+    last_day: pd.Timestamp,
+) -> pd.DatetimeIndex:
+    """
+    Compute UTC start dates of bars following the local wall clock of a time zone,
+    with days starting at day start and weeks on week start, from the day before
+    first day to the day after last day. Daily bars last 23 or 25 hours on
+    daylight saving time changes. Boundaries are computed once per frequency,
+    anchoring and days, and reused for all pairs.
+
+    :param frequency: Frequency as string.
+    :param time_zone: Time zone name, e.g. America/New_York.
+    :param day_start: Local time of day start as HH:MM string.
+    :param week_start: Week start day, e.g. MON.
+    :param first_day: First UTC day.
+    :param last_day: Last UTC day.
+    :return: Bars start dates as UTC pandas DatetimeIndex without time zone.
+    """
+    bar_duration = frequency_timedelta(frequency)
+    origin = pd.Timestamp(1970, 1, 1) + pd.Timedelta(f"{day_start}:00")
+    if frequency == "1W-MON":
+        # First Monday after the unix epoch
+        origin += pd.Timedelta(days=4 + WEEK_DAYS.index(week_start))
+    # Local dates are less than a day apart from UTC dates
+    first_date = first_day - pd.Timedelta(days=1)
+    first_date = origin + (first_date - origin) // bar_duration * bar_duration
+    wall_dates = pd.date_range(
+        first_date, last_day + pd.Timedelta(days=2) + bar_duration, freq=bar_duration
+    )
+    # Repeated local times are taken before and skipped times after the change
+    return (
+        wall_dates.tz_localize(
+            time_zone,
+            ambiguous=np.ones(len(wall_dates), bool),
+            nonexistent="shift_forward",
+        )
+        .tz_convert("UTC")
+        .tz_localize(None)
+        .unique()
+    )
+
+
+def bar_boundaries(
+    frequency: str, anchoring: dict, start_datetime: datetime, end_datetime: datetime
+) -> pd.DatetimeIndex:
+    """
+    Get UTC start dates of anchored bars covering dates.
+
+    :param frequency: Frequency as string.
+    :param anchoring: Bars time zone, day start and week start as dict.
+    :param start_datetime: Start date as datetime object.
+    :param end_datetime: End date as datetime object.
+    :return: Bars start dates as UTC pandas DatetimeIndex without time zone.
+    """
+    anchoring = {**BAR_ANCHORING_DEFAULTS, **anchoring}
+    return anchored_bar_boundaries(
+        frequency,
+        anchoring["time_zone"],
+        anchoring["day_start"],
+        anchoring["week_start"],
+        pd.Timestamp(start_datetime).normalize(),
+        pd.Timestamp(end_datetime).normalize(),
+    )
+
+
+def anchored_complete_bars_bounds(
+    frequency: str, anchoring: dict, start_datetime: datetime, end_datetime: datetime
+) -> tuple[pd.Timestamp, pd.Timestamp]:
+    """
+    Compute the first and last start dates of complete anchored bars between start
+    and end dates like complete_bars_bounds.
+
+    :param frequency: Frequency as string.
+    :param anchoring: Bars time zone, day start and week start as dict.
+    :param start_datetime: Data start date as datetime object.
+    :param end_datetime: Data end date as datetime object.
+    :return: First and last complete bars start dates.
+    """
+    boundaries = bar_boundaries(frequency, anchoring, start_datetime, end_datetime)
+    first_bar_date = boundaries[boundaries.searchsorted(pd.Timestamp(start_datetime))]
+    return first_bar_date, last_final_bar_date(frequency, end_datetime, anchoring)
+
+
+def trim_incomplete_bars(
+    df: pd.DataFrame,
+    frequency: str,
+    start_datetime: datetime,
+    end_datetime: datetime,
+    anchoring: dict = None,
+) -> pd.DataFrame:
+    """
+    Remove bars starting before start date or ending after end date from a time
+    sorted DataFrame, without copying remaining bars.
+
+    :param df: pandas DataFrame indexed by bars start dates.
+    :param frequency: Frequency as string.
+    :param start_datetime: Data start date as datetime object.
+    :param end_datetime: Data end date as datetime object.
+    :param anchoring: Bars time zone, day start and week start as dict, None for
+        default anchoring.
+    :return: pandas DataFrame of complete bars.
+    """
+    if df.empty:
+        return df
+    if is_anchored(anchoring):
+        first_bar_date, last_bar_date = anchored_complete_bars_bounds(
+            frequency, anchoring, start_datetime, end_datetime
+        )
+    else:
+        first_bar_date, last_bar_date = complete_bars_bounds(
+            frequency, start_datetime, end_datetime
+        )
+    start = df.index.searchsorted(first_bar_date)
+    end = df.index.searchsorted(last_bar_date, side="right")
+    if start == 0 and end == len(df):
+        return df
+    return df.iloc[start:end]
+
+
+def last_final_bar_date(
+    frequency: str, watermark: datetime, anchoring: dict = None
+) -> pd.Timestamp:
+    """
+    Compute the start date of the last final bar for a watermark, the date until
+    which all trades are known: a bar is final once it ends before or at the
+    watermark. Download end date is the watermark of complete bars of a batch.
+
+    :param frequency: Frequency as string.
+    :param watermark: Date until which all trades are known.
+    :param anchoring: Bars time zone, day start and week start as dict, None for
+        default anchoring.
+    :return: Last final bar start date.
+    """
+    watermark = pd.Timestamp(watermark, tz=None)
+    if is_anchored(anchoring):
+        # Anchored daily bars last 23 or 25 hours on daylight saving time changes
+        boundaries = bar_boundaries(
+            frequency, anchoring, watermark - frequency_timedelta(frequency), watermark
+        )
+        return boundaries[boundaries.searchsorted(watermark, side="right") - 2]
+    return watermark - frequency_timedelta(frequency)
+
+
+def finalized_bars(
+    bar_dates: pd.DatetimeIndex,
+    frequency: str,
+    watermark: pd.Timestamp,
+    anchoring: dict = None,
+) -> np.ndarray:
+    """
+    Check which bars are final for a watermark like last_final_bar_date.
+
+    :param bar_dates: Bars start dates.
+    :param frequency: Bars frequency as string.
+    :param watermark: Date until which all trades are known.
+    :param anchoring: Bars time zone, day start and week start as dict, None for
+        default anchoring.
+    :return: Boolean array, True for final bars.
+    """
+    return np.asarray(bar_dates <= last_final_bar_date(frequency, watermark, anchoring))
+
+
 def adjust_ohlc_frequency_dates(
     start_datetime: datetime,
     end_datetime: datetime,
     frequency: str,
     df: pd.DataFrame,
     pair: str,
+    anchoring: dict = None,
 ) -> pd.DataFrame:
     """
     Adjust the OHLCV pandas DataFrame by removing rows with uncompleted frequency.
@@ -84,19 +331,11 @@ def adjust_ohlc_frequency_dates(
     :param frequency: Frequency or period in String.
     :param df: OHLCV pandas DataFrame.
     :param pair: OHLCV pair.
+    :param anchoring: Bars time zone, day start and week start as dict, None for
+        default anchoring.
     :return: Frequency adjusted pandas DataFrame.
     """
-    start_date = pd.Timestamp(start_datetime, tz=None)
-    end_date = pd.Timestamp(end_datetime, tz=None)
-
-    if not df.empty:
-        first_date = df.iloc[0].name
-        if not check_trades_ohlc_start_end_dates(start_date, first_date, frequency):
-            df = df[1:]
-        last_date = df.iloc[-1].name
-        if not check_trades_ohlc_start_end_dates(end_date, last_date, frequency):
-            df = df[:-1]
-
+    df = trim_incomplete_bars(df, frequency, start_datetime, end_datetime, anchoring)
     if df.empty:
         logger.info(f"{pair} {frequency}: Not enough data.")
     else:
@@ -107,27 +346,237 @@ def adjust_ohlc_frequency_dates(
     return df
 
 
-def trades_to_ohlc(
-    df_trades: pd.DataFrame, frequency: str, volume_in_quote_asset: bool
+def fill_ohlc_gaps(df_ohlc: pd.DataFrame, fill_policy: str) -> pd.DataFrame:
+    """
+    Apply the fill policy to OHLC bars without trades.
+    - nan: keep empty bars with NaN prices and zero volume.
+    - ffill: forward fill the previous close into open, high, low, close and vwap.
+    - drop: remove empty bars, only bars with trades are kept.
+
+    :param df_ohlc: OHLCV pandas DataFrame.
+    :param fill_policy: Fill policy as string.
+    :return: OHLCV pandas DataFrame with filled or dropped empty bars.
+    """
+    if fill_policy not in OHLC_FILL_POLICIES:
+        raise ValueError(
+            f"Unsupported fill policy {fill_policy}. Supported "
+            f"fill policies: {OHLC_FILL_POLICIES}"
+        )
+    if fill_policy == "ffill":
+        close = df_ohlc["close"].ffill()
+        df_ohlc["close"] = close
+        for column in ["open", "high", "low", "vwap"]:
+            if column in df_ohlc:
+                df_ohlc[column] = df_ohlc[column].fillna(close)
+    elif fill_policy == "drop":
+        df_ohlc = df_ohlc[df_ohlc["close"].notna()]
+    return df_ohlc
+
+
+def trades_to_partial_ohlc(
+    df_trades: pd.DataFrame,
+    frequency: str,
+    volume_in_quote_asset: bool,
+    statistics: list = None,
+    trade_times: bool = False,
+    anchoring: dict = None,
 ) -> pd.DataFrame:
     """
-    Resamples the trades pandas DataFrame to an OHLCV DataFrame in specified timeline.
+    Resamples the trades pandas DataFrame to partial OHLC bars in a single pass.
+    Partial bars keep the columns needed to merge them with bars computed from
+    other trades (notional and base volume for vwap, first and last trade dates).
 
     :param df_trades: Trades pandas DataFrame.
     :param frequency:  Frequency to resample in String.
     :param volume_in_quote_asset:  If volume is aggregated in quote asset or not.
-    :return: OHLC DataFrame in specified frequency.
+    :param statistics: List of additional statistics to compute per bar.
+    :param trade_times: Add first and last trade dates of each bar.
+    :param anchoring: Bars time zone, day start and week start as dict, None for
+        default anchoring.
+    :return: Partial OHLC DataFrame in specified frequency.
     """
+    statistics = statistics or []
+    unsupported_statistics = set(statistics) - set(OHLC_STATISTICS)
+    if unsupported_statistics:
+        raise ValueError(
+            f"Unsupported statistics {sorted(unsupported_statistics)}. Supported "
+            f"statistics: {OHLC_STATISTICS}"
+        )
+    # Arrow backed columns are aggregated as numpy float columns
+    price = df_trades["price"].astype("float64", copy=False)
+    volume = df_trades["volume"].astype("float64", copy=False)
+    notional = price * volume if volume_in_quote_asset or "vwap" in statistics else None
     if volume_in_quote_asset:
-        df_trades["volume_quote"] = df_trades["price"] * df_trades["volume"]
-        df_ohlc = df_trades.resample(
-            frequency, closed="left", label="left", origin="epoch"
-        ).agg({"price": "ohlc", "volume_quote": "sum"})
-        df_ohlc.rename(columns={"volume_quote": "volume"}, inplace=True)
+        volume = notional
+    # Columns to aggregate in a single resampling pass
+    columns = {"price": price, "volume": volume}
+    aggregations = {"price": "ohlc", "volume": "sum"}
+    if "vwap" in statistics:
+        columns["notional"] = notional
+        columns["base_volume"] = df_trades["volume"].astype("float64", copy=False)
+        aggregations.update({"notional": "sum", "base_volume": "sum"})
+    if "trade_count" in statistics:
+        columns["trade_count"] = price
+        aggregations["trade_count"] = "count"
+    for statistic, (column, value) in TRADES_VOLUME_SPLITS.items():
+        if statistic in statistics:
+            selected = (df_trades[column] == value).to_numpy(bool, na_value=False)
+            columns[statistic] = volume.where(selected, 0.0)
+            aggregations[statistic] = "sum"
+    if trade_times:
+        columns["first_time"] = columns["last_time"] = df_trades.index.to_series()
+        aggregations.update({"first_time": "min", "last_time": "max"})
+    df_columns = pd.DataFrame(columns)
+    if is_anchored(anchoring) and not df_columns.empty:
+        df_partial = anchored_resample(df_columns, frequency, anchoring, aggregations)
     else:
-        df_ohlc = df_trades.resample(
+        df_partial = df_columns.resample(
             frequency, closed="left", label="left", origin="epoch"
-        ).agg({"price": "ohlc", "volume": "sum"})
+        ).agg(aggregations)
     # Remove multi-indexed columns
-    df_ohlc.columns = [i[1] for i in df_ohlc.columns]
+    df_partial.columns = [i[1] for i in df_partial.columns]
+    return df_partial
+
+
+def anchored_resample(
+    df: pd.DataFrame, frequency: str, anchoring: dict, aggregations: dict
+) -> pd.DataFrame:
+    """
+    Aggregate a time sorted DataFrame by anchored bars like resampling, each row
+    being assigned to its bar by a binary search of bar boundaries. Bars without
+    rows between the first and last bars are kept, with zero sums and counts.
+
+    :param df: Time sorted pandas DataFrame.
+    :param frequency: Frequency as string.
+    :param anchoring: Bars time zone, day start and week start as dict.
+    :param aggregations: Aggregation by column.
+    :return: Aggregated pandas DataFrame indexed by bars start dates.
+    """
+    boundaries = bar_boundaries(frequency, anchoring, df.index[0], df.index[-1])
+    positions = boundaries.searchsorted(df.index, side="right") - 1
+    df_bars = df.groupby(boundaries[positions]).agg(aggregations)
+    df_bars = df_bars.reindex(boundaries[positions[0] : positions[-1] + 1])
+    for column, aggregation in aggregations.items():
+        if aggregation in ["sum", "count"]:
+            df_bars[(column, column)] = df_bars[(column, column)].fillna(0)
+    df_bars.index.name = df.index.name
+    return df_bars
+
+
+def merge_partial_ohlc(
+    df_partial: pd.DataFrame, df_other_partial: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Merge partial OHLC bars computed from two sets of trades bar by bar.
+    Open and close are taken from the first and last trade of both sets, which
+    requires partial bars computed with trade times. Empty bars are removed.
+
+    :param df_partial: Partial OHLC DataFrame.
+    :param df_other_partial: Partial OHLC DataFrame to merge.
+    :return: Merged partial OHLC DataFrame with bars with trades only.
+    """
+    partials = [df for df in [df_partial, df_other_partial] if not df.empty]
+    if len(partials) < 2:
+        return partials[0].dropna(subset=["close"]) if partials else df_partial
+    df = pd.concat(partials).dropna(subset=["close"])
+    aggregations = {
+        column: "max" if column == "high" else "min" if column == "low" else "sum"
+        for column in df.columns
+        if column not in ["open", "close", "first_time", "last_time"]
+    }
+    aggregations.update({"first_time": "min", "last_time": "max"})
+    df_merged = df.groupby(level=0).agg(aggregations)
+    # Stable sorts keep the first set first when trades have the same date
+    df_merged["open"] = (
+        df.sort_values("first_time", kind="stable").groupby(level=0)["open"].first()
+    )
+    df_merged["close"] = (
+        df.sort_values("last_time", kind="stable").groupby(level=0)["close"].last()
+    )
+    return df_merged.reindex(columns=df.columns)
+
+
+def partial_ohlc_to_ohlc(
+    df_partial: pd.DataFrame,
+    frequency: str = None,
+    statistics: list = None,
+    anchoring: dict = None,
+) -> pd.DataFrame:
+    """
+    Convert partial OHLC bars to OHLC bars with requested statistics.
+    If frequency is specified, missing bars between the first and last bars are
+    added as empty bars like resampled trades.
+
+    :param df_partial: Partial OHLC DataFrame.
+    :param frequency: Frequency of the bars to add missing empty bars.
+    :param statistics: List of additional statistics to keep per bar.
+    :param anchoring: Bars time zone, day start and week start as dict, None for
+        default anchoring.
+    :return: OHLC DataFrame.
+    """
+    statistics = statistics or []
+    df_ohlc = df_partial.copy(deep=False)
+    if frequency is not None and not df_ohlc.empty:
+        if is_anchored(anchoring):
+            boundaries = bar_boundaries(
+                frequency, anchoring, df_ohlc.index[0], df_ohlc.index[-1]
+            )
+            start = boundaries.searchsorted(df_ohlc.index[0])
+            end = boundaries.searchsorted(df_ohlc.index[-1], side="right")
+            index = boundaries[start:end].rename("time")
+        else:
+            index = pd.date_range(
+                df_ohlc.index[0], df_ohlc.index[-1], freq=frequency, name="time"
+            )
+        df_ohlc = df_ohlc.reindex(index)
+        empty_bars = df_ohlc["close"].isna()
+        for column in df_ohlc.columns:
+            if column not in [
+                "open",
+                "high",
+                "low",
+                "close",
+                "first_time",
+                "last_time",
+            ]:
+                df_ohlc.loc[empty_bars, column] = 0
+    if "trade_count" in statistics:
+        df_ohlc["trade_count"] = df_ohlc["trade_count"].astype("int64")
+    if "vwap" in statistics:
+        df_ohlc["vwap"] = df_ohlc["notional"] / df_ohlc["base_volume"]
+    return df_ohlc.reindex(
+        columns=["open", "high", "low", "close", "volume"] + statistics
+    )
+
+
+def trades_to_ohlc(
+    df_trades: pd.DataFrame,
+    frequency: str,
+    volume_in_quote_asset: bool,
+    fill_policy: str = "nan",
+    statistics: list = None,
+    anchoring: dict = None,
+) -> pd.DataFrame:
+    """
+    Resamples the trades pandas DataFrame to an OHLCV DataFrame in specified timeline.
+    Optional statistics are aggregated in the same resampling pass:
+    - vwap: volume weighted average price.
+    - trade_count: number of trades.
+    - buy_volume, sell_volume: volume of buy and sell trades.
+    - market_volume, limit_volume: volume of market and limit trades.
+
+    :param df_trades: Trades pandas DataFrame.
+    :param frequency:  Frequency to resample in String.
+    :param volume_in_quote_asset:  If volume is aggregated in quote asset or not.
+    :param fill_policy: Policy applied to bars without trades (nan, ffill or drop).
+    :param statistics: List of additional statistics to compute per bar.
+    :param anchoring: Bars time zone, day start and week start as dict, None for
+        default anchoring on UTC days and weeks starting on Monday.
+    :return: OHLC DataFrame in specified frequency.
+    """
+    df_partial = trades_to_partial_ohlc(
+        df_trades, frequency, volume_in_quote_asset, statistics, anchoring=anchoring
+    )
+    df_ohlc = partial_ohlc_to_ohlc(df_partial, statistics=statistics)
+    df_ohlc = fill_ohlc_gaps(df_ohlc, fill_policy)
     return df_ohlc
@@ -0,0 +1,115 @@
+import contextlib
+import cProfile
+import io
+import pstats
+from pathlib import Path
+from typing import Iterator, Optional
+
+PROFILES_FOLDER: str = "profiles"
+# Pipeline stages that can be profiled, download includes the decoding of
+# downloaded trades and, with a memory budget, read and download include the
+# aggregation and writing of chunks processed in the same pass.
+PROFILE_STAGES: list[str] = ["download", "read", "verify", "resample", "trim", "write"]
+
+
+class StageProfiler:
+    """
+    Profile pipeline stages with cProfile, by pair and frequency. Profiles of a
+    stage are accumulated over calls and saved as pstats files, readable by
+    flame graph tools like snakeviz or flameprof, with a summary of the functions
+    taking the most time.
+    """
+
+    enabled: bool
+    stages: list
+    pairs: list
+    top_functions: int
+    profiles: dict
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        stages: list = None,
+        pairs: list = None,
+        top_functions: int = 20,
+    ) -> None:
+        """
+        Initialize the StageProfiler object.
+
+        :param enabled: Profile stages or not.
+        :param stages: Stages to profile, all stages if None.
+        :param pairs: Pairs to profile, all pairs if None or empty.
+        :param top_functions: Number of functions listed by profile in summary.
+        """
+        self.enabled = enabled
+        self.stages = stages or PROFILE_STAGES
+        self.pairs = pairs or []
+        self.top_functions = top_functions
+        self.profiles = dict()
+
+    def is_profiled(self, stage: str, pair: str) -> bool:
+        """
+        Check if a stage of a pair is profiled.
+
+        :param stage: Pipeline stage as string.
+        :param pair: Pair as string.
+        :return: True if profiled, False otherwise.
+        """
+        return (
+            self.enabled
+            and stage in self.stages
+            and (not self.pairs or pair in self.pairs)
+        )
+
+    @contextlib.contextmanager
+    def stage(self, stage: str, pair: str, frequency: str = None) -> Iterator[None]:
+        """
+        Profile the code run in the context if the stage of the pair is profiled.
+
+        :param stage: Pipeline stage as string.
+        :param pair: Pair as string.
+        :param frequency: OHLC frequency as string for OHLC stages.
+        :return: Context manager.
+        """
+        if not self.is_profiled(stage, pair):
+            yield
+            return
+        name = f"{pair}_{stage}" + (f"_{frequency}" if frequency else "")
+        profile = self.profiles.setdefault(name, cProfile.Profile())
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+
+    def write_profiles(
+        self, data_folder_path: str, subfolder: str = ""
+    ) -> Optional[str]:
+        """
+        Save profiles as pstats files and a summary of the profiles sorted by
+        total time with their top functions by cumulative time.
+
+        :param data_folder_path: Data folder path as string.
+        :param subfolder: Subfolder of profiles folder, for instance a worker.
+        :return: Summary file path, None if nothing was profiled.
+        """
+        if not self.profiles:
+            return None
+        folder_path = f"{data_folder_path}/{PROFILES_FOLDER}"
+        folder_path += f"/{subfolder}" if subfolder else ""
+        Path(folder_path).mkdir(parents=True, exist_ok=True)
+        summaries = list()
+        for name, profile in self.profiles.items():
+            profile.dump_stats(f"{folder_path}/{name}.prof")
+            stream = io.StringIO()
+            stats = pstats.Stats(profile, stream=stream)
+            stats.sort_stats("cumulative").print_stats(self.top_functions)
+            summaries.append((stats.total_tt, name, stream.getvalue()))
+        summaries.sort(reverse=True)
+        summary = [f"{name}: {total_time:.3f}s" for total_time, name, _ in summaries]
+        for total_time, name, stats in summaries:
+            summary += ["", f"=== {name}: {total_time:.3f}s ===", stats]
+        summary_filepath = f"{folder_path}/summary.txt"
+        with open(summary_filepath, "w") as stream:
+            stream.write("\n".join(summary))
+        return summary_filepath
@@ -0,0 +1,225 @@
+import logging
+import random
+import time
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from krakenapi import KrakenApi
+
+logger: logging.Logger = logging.getLogger(__name__)
+KRAKEN_API_URL: str = "https://api.kraken.com"
+# Kraken API errors returned when requests are sent too fast or the service is
+# overloaded, requests are sent again after a backoff.
+RATE_LIMIT_ERRORS: list[str] = [
+    "EAPI:Rate limit exceeded",
+    "EGeneral:Too many requests",
+    "EService:Throttled",
+    "EService:Unavailable",
+    "EService:Busy",
+]
+
+
+class KrakenApiEndpoint(KrakenApi):
+    """
+    KrakenApi object sending requests to a configurable API URL, for instance a
+    local replay server.
+    """
+
+    def __init__(self, api_url: str = KRAKEN_API_URL, *args, **kwargs) -> None:
+        """
+        Initialize the KrakenApiEndpoint object.
+
+        :param api_url: Kraken API URL without path.
+        """
+        super().__init__(*args, **kwargs)
+        self.api_url = api_url.rstrip("/")
+
+    def create_api_request(
+        self, public_method: bool, api_method: str, post_inputs: dict = None
+    ) -> Request:
+        """
+        Create a request object like KrakenApi with the configured API URL.
+
+        :param public_method: Is the method a public market data.
+        :param api_method: API method as string.
+        :param post_inputs: POST inputs as dict.
+        :return: Request object.
+        """
+        request = super().create_api_request(public_method, api_method, post_inputs)
+        if self.api_url != KRAKEN_API_URL:
+            request.full_url = self.api_url + request.full_url[len(KRAKEN_API_URL) :]
+        return request
+
+
+class AdaptiveRateLimiter:
+    """
+    Pace Kraken API requests from observed responses. The interval between
+    requests is decreased after each successful request to ramp up the request
+    rate, doubled after rate limit errors and increased when latency grows above
+    twice the lowest observed latency. Failed requests are sent again after an
+    exponential backoff with jitter.
+    """
+
+    def __init__(
+        self,
+        initial_interval: float = 1.76,
+        min_interval: float = 1.0,
+        max_interval: float = 60.0,
+        interval_step: float = 0.05,
+        max_retries: int = 10,
+    ) -> None:
+        """
+        Initialize the AdaptiveRateLimiter object.
+
+        :param initial_interval: Initial interval between requests in seconds.
+        :param min_interval: Minimum interval between requests in seconds.
+        :param max_interval: Maximum interval between requests and backoff in
+            seconds.
+        :param interval_step: Interval decrease after a successful request in
+            seconds.
+        :param max_retries: Maximum number of consecutive failed requests.
+        """
+        self.interval = initial_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval_step = interval_step
+        self.max_retries = max_retries
+        self.last_request_time = None
+        self.consecutive_failures = 0
+        self.latency = None
+        self.min_latency = None
+        self.requests = 0
+        self.rate_limit_errors = 0
+        self.connection_errors = 0
+        self.waited = 0.0
+
+    def sleep(self, seconds: float) -> None:
+        """
+        Sleep for specified duration and record waited time.
+
+        :param seconds: Duration in seconds.
+        :return: None
+        """
+        self.waited += seconds
+        time.sleep(seconds)
+
+    def wait(self) -> None:
+        """
+        Wait until the interval since the previous request is elapsed.
+
+        :return: None
+        """
+        if self.last_request_time is not None:
+            elapsed = time.monotonic() - self.last_request_time
+            if elapsed < self.interval:
+                self.sleep(self.interval - elapsed)
+        self.last_request_time = time.monotonic()
+        self.requests += 1
+
+    def backoff(self) -> None:
+        """
+        Wait an exponential backoff with jitter after a failed request.
+
+        :return: None
+        """
+        self.consecutive_failures += 1
+        if self.consecutive_failures > self.max_retries:
+            raise ValueError(
+                f"Kraken API request failed {self.consecutive_failures} times."
+            )
+        backoff = min(self.max_interval, self.interval * 2**self.consecutive_failures)
+        self.sleep(random.uniform(backoff / 2, backoff))
+
+    def on_success(self, latency: float) -> None:
+        """
+        Update pacing after a successful request.
+
+        :param latency: Request latency in seconds.
+        :return: None
+        """
+        self.consecutive_failures = 0
+        self.latency = (
+            latency if self.latency is None else (0.8 * self.latency + 0.2 * latency)
+        )
+        self.min_latency = min(latency, self.min_latency or latency)
+        if self.latency > 2 * self.min_latency:
+            self.interval = min(self.max_interval, self.interval * 1.25)
+        else:
+            self.interval = max(self.min_interval, self.interval - self.interval_step)
+
+    def on_rate_limit(self) -> None:
+        """
+        Slow down pacing and back off after a rate limit error.
+
+        :return: None
+        """
+        self.rate_limit_errors += 1
+        self.interval = min(self.max_interval, self.interval * 2)
+        logger.warning(
+            f"Kraken API rate limit exceeded, interval set to {self.interval:.2f}s."
+        )
+        self.backoff()
+
+    def on_connection_error(self) -> None:
+        """
+        Back off after a connection error without changing pacing.
+
+        :return: None
+        """
+        self.connection_errors += 1
+        logger.warning("Kraken API connection error, retrying request.")
+        self.backoff()
+
+    def metrics(self) -> dict:
+        """
+        Return the rate limiter state and counters.
+
+        :return: Metrics as dict.
+        """
+        return {
+            "interval": round(self.interval, 3),
+            "latency": None if self.latency is None else round(self.latency, 3),
+            "requests": self.requests,
+            "rate_limit_errors": self.rate_limit_errors,
+            "connection_errors": self.connection_errors,
+            "waited": round(self.waited, 3),
+        }
+
+
+def send_public_request(
+    ka: KrakenApi, method: str, post_inputs: dict, rate_limiter: AdaptiveRateLimiter
+) -> dict:
+    """
+    Send a Kraken API public request paced by rate limiter, send it again after
+    rate limit and connection errors.
+
+    :param ka: KrakenAPI object.
+    :param method: API method as string.
+    :param post_inputs: POST inputs as dict.
+    :param rate_limiter: AdaptiveRateLimiter object.
+    :return: Kraken API's response data as dict.
+    """
+    while True:
+        rate_limiter.wait()
+        request = ka.create_api_request(True, method, post_inputs)
+        start = time.monotonic()
+        try:
+            data = ka.extract_response_data(urlopen(request).read())
+        except HTTPError as e:
+            if e.code == 429:
+                rate_limiter.on_rate_limit()
+            elif e.code >= 500:
+                rate_limiter.on_connection_error()
+            else:
+                raise ValueError(f"Kraken API error -> {e}") from e
+            continue
+        except (ConnectionResetError, URLError, ValueError):
+            rate_limiter.on_connection_error()
+            continue
+        if isinstance(data, str):
+            if data in RATE_LIMIT_ERRORS:
+                rate_limiter.on_rate_limit()
+                continue
+            raise ValueError(f"Kraken API error -> {data}")
+        rate_limiter.on_success(time.monotonic() - start)
+        return data
@@ -0,0 +1,378 @@
+import bisect
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import yaml
+
+# Maximum number of trades returned by a Kraken API Trades request.
+TRADES_PAGE_SIZE: int = 1000
+# Number of most recent bars of an interval returned by a Kraken API OHLC request.
+OHLC_BARS: int = 720
+# Errors injected as Kraken API errors, or as HTTP status code if numeric.
+REPLAY_ERRORS: list[str] = ["429", "EAPI:Rate limit exceeded"]
+
+
+class ReplayData:
+    """
+    Kraken API public data served by the replay server: asset pairs, assets and
+    time sorted trades of each pair.
+    """
+
+    asset_pairs: dict
+    assets: dict
+    trades: dict
+
+    def __init__(
+        self, asset_pairs: dict = None, assets: dict = None, trades: dict = None
+    ) -> None:
+        """
+        Initialize the ReplayData object.
+
+        :param asset_pairs: AssetPairs result as dict.
+        :param assets: Assets result as dict.
+        :param trades: Lists of Kraken API trades by pair.
+        """
+        self.asset_pairs = asset_pairs or dict()
+        self.assets = assets or dict()
+        self.trades = {pair: list() for pair in self.asset_pairs}
+        for pair, pair_trades in (trades or dict()).items():
+            self.add_trades(pair, pair_trades)
+
+    def add_trades(self, pair: str, trades: list) -> None:
+        """
+        Add trades of a pair, declared as asset pair if unknown, the last 3
+        characters of its name being its quote asset. Trades are kept sorted by time
+        and a trade id is added to trades without one.
+
+        :param pair: Pair of trades.
+        :param trades: List of Kraken API trades.
+        :return: None
+        """
+        base, quote = pair[:-3], pair[-3:]
+        self.asset_pairs.setdefault(
+            pair,
+            {
+                "altname": pair,
+                "wsname": f"{base}/{quote}",
+                "base": base,
+                "quote": quote,
+            },
+        )
+        pair_trades = self.trades.setdefault(pair, list())
+        pair_trades += [list(trade[:6]) for trade in trades]
+        pair_trades.sort(key=lambda trade: float(trade[2]))
+        for trade_id, trade in enumerate(pair_trades, start=1):
+            trade[6:] = [trade_id]
+
+    def trades_page(self, pair: str, since: int, page_size: int) -> dict:
+        """
+        Return a page of trades from since date like the Kraken API Trades method.
+
+        :param pair: Pair of trades.
+        :param since: Page start unix time in seconds or nanoseconds.
+        :param page_size: Maximum number of trades in page.
+        :return: Trades result as dict, None if pair is unknown.
+        """
+        if pair not in self.trades:
+            return None
+        # Unix times after year 2286 in seconds are nanoseconds
+        since_ns = since if since > 10**10 else since * 10**9
+        pair_trades = self.trades[pair]
+        start = bisect.bisect_left(pair_trades, since_ns, key=trade_unix_time_ns)
+        page = pair_trades[start : start + page_size]
+        last = trade_unix_time_ns(page[-1]) if page else since_ns
+        return {pair: page, "last": str(last)}
+
+    def ohlc_bars(self, pair: str, interval: int, since: int) -> dict:
+        """
+        Return the most recent OHLC bars of an interval after since date like the
+        Kraken API OHLC method, aggregated from trades. The bar of the last trade
+        is the current bar, not committed yet.
+
+        :param pair: Pair of trades.
+        :param interval: Bars interval in minutes.
+        :param since: Unix time in seconds of the bars to return after.
+        :return: OHLC result as dict, None if pair is unknown.
+        """
+        if pair not in self.trades:
+            return None
+        bar_duration = interval * 60
+        bars = dict()
+        for trade in self.trades[pair]:
+            bar_time = int(float(trade[2]) // bar_duration * bar_duration)
+            bars.setdefault(bar_time, list()).append(trade)
+        bar_times = range(min(bars, default=0), max(bars, default=-1) + 1, bar_duration)
+        ohlc = list()
+        close = None
+        for bar_time in bar_times[-OHLC_BARS:]:
+            bar_trades = bars.get(bar_time, [])
+            prices = [float(trade[0]) for trade in bar_trades]
+            volumes = [float(trade[1]) for trade in bar_trades]
+            volume = sum(volumes)
+            if bar_trades:
+                close = bar_trades[-1][0]
+                vwap = sum(p * v for p, v in zip(prices, volumes)) / volume
+                bar = [bar_trades[0][0], str(max(prices)), str(min(prices)), close]
+                bar.append(f"{vwap:.10f}")
+            else:
+                bar = [close] * 5
+            ohlc.append([bar_time, *bar, f"{volume:.8f}", len(bar_trades)])
+        ohlc = [bar for bar in ohlc if bar[0] > since]
+        last = ohlc[-2][0] if len(ohlc) > 1 else since
+        return {pair: ohlc, "last": last}
+
+
+def trade_unix_time_ns(trade: list) -> int:
+    """
+    Return the unix time in nanoseconds of a Kraken API trade, compared as integer
+    to page trades at nanosecond precision.
+
+    :param trade: Kraken API trade.
+    :return: Unix time in nanoseconds.
+    """
+    return round(float(trade[2]) * 10**9)
+
+
+def synthetic_trades(
+    start_unix_time: float,
+    end_unix_time: float,
+    trades_per_hour: float,
+    seed: int = None,
+) -> list:
+    """
+    Generate random Kraken API trades between two dates with exponentially
+    distributed intervals and a random walk price.
+
+    :param start_unix_time: Trades start unix time in seconds.
+    :param end_unix_time: Trades end unix time in seconds.
+    :param trades_per_hour: Mean number of trades per hour.
+    :param seed: Random generator seed.
+    :return: Time sorted list of Kraken API trades.
+    """
+    generator = random.Random(seed)
+    trades = list()
+    price = 100.0
+    unix_time = start_unix_time
+    while True:
+        unix_time = round(unix_time + generator.expovariate(trades_per_hour / 3600), 4)
+        if unix_time >= end_unix_time:
+            return trades
+        price *= 1 + generator.gauss(0, 0.001)
+        trades.append(
+            [
+                f"{price:.5f}",
+                f"{generator.lognormvariate(0, 1.5):.8f}",
+                unix_time,
+                generator.choice("bs"),
+                generator.choice("ml"),
+                "",
+            ]
+        )
+
+
+def cassette_replay_data(cassette_filepath: str) -> ReplayData:
+    """
+    Read Kraken API public data recorded in a VCR cassette. Trades of all Trades
+    requests of a pair are merged.
+
+    :param cassette_filepath: VCR cassette file path as string.
+    :return: ReplayData object.
+    """
+    with open(cassette_filepath, "r") as stream:
+        cassette = yaml.load(stream, Loader=yaml.SafeLoader)
+    replay_data = ReplayData()
+    for interaction in cassette["interactions"]:
+        method = urlparse(interaction["request"]["uri"]).path.split("/")[-1]
+        body = interaction["response"]["body"]["string"]
+        result = json.loads(body).get("result")
+        if not result:
+            continue
+        if method == "AssetPairs":
+            replay_data.asset_pairs.update(result)
+        elif method == "Assets":
+            replay_data.assets.update(result)
+        elif method == "Trades":
+            pair = next(key for key in result if key != "last")
+            known_times = {trade[2] for trade in replay_data.trades.get(pair, [])}
+            replay_data.add_trades(
+                pair, [trade for trade in result[pair] if trade[2] not in known_times]
+            )
+    return replay_data
+
+
+class ReplayRequestHandler(BaseHTTPRequestHandler):
+    """
+    Answer Kraken API public requests from replay server data.
+    """
+
+    server: "ReplayServer"
+
+    def do_GET(self) -> None:
+        """
+        Answer GET requests.
+
+        :return: None
+        """
+        self.answer(parse_qs(urlparse(self.path).query))
+
+    def do_POST(self) -> None:
+        """
+        Answer POST requests.
+
+        :return: None
+        """
+        length = int(self.headers.get("Content-Length") or 0)
+        self.answer(parse_qs(self.rfile.read(length).decode()))
+
+    def answer(self, parameters: dict) -> None:
+        """
+        Answer a Kraken API public request after the configured latency, with an
+        injected error or the requested method result.
+
+        :param parameters: Request parameters parsed from query string or body.
+        :return: None
+        """
+        parameters = {key: values[0] for key, values in parameters.items()}
+        method = urlparse(self.path).path.split("/")[-1]
+        error = self.server.request_error()
+        if error and error.isdigit():
+            self.send_error(int(error))
+            return
+        errors, result = (
+            ([error], {}) if error else self.server.result(method, parameters)
+        )
+        body = json.dumps({"error": errors, "result": result}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        """
+        Do not log requests.
+
+        :return: None
+        """
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """
+    Local stand-in of the Kraken API public AssetPairs, Assets, Trades and OHLC
+    methods for load testing, with configurable latency, trades page size and injected
+    errors.
+    """
+
+    def __init__(
+        self,
+        replay_data: ReplayData,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        page_size: int = TRADES_PAGE_SIZE,
+        error_rate: float = 0.0,
+        errors: list = None,
+        seed: int = None,
+    ) -> None:
+        """
+        Initialize the ReplayServer object.
+
+        :param replay_data: ReplayData object to serve.
+        :param host: Listen address.
+        :param port: Listen port, a free port if 0.
+        :param latency: Delay in seconds before answering requests.
+        :param page_size: Maximum number of trades returned by a Trades request.
+        :param error_rate: Probability of answering a request with an error.
+        :param errors: Injected errors, Kraken API errors or HTTP status codes.
+        :param seed: Injected errors random generator seed.
+        """
+        super().__init__((host, port), ReplayRequestHandler)
+        self.replay_data = replay_data
+        self.latency = latency
+        self.page_size = page_size
+        self.error_rate = error_rate
+        self.errors = errors or REPLAY_ERRORS
+        self.generator = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.injected_errors = 0
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        """
+        Replay server URL to use as Kraken API URL.
+
+        :return: URL as string.
+        """
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def request_error(self) -> str:
+        """
+        Count a request, wait the configured latency and draw an injected error.
+
+        :return: Injected error as string, None if no error.
+        """
+        with self.lock:
+            self.requests += 1
+            error = None
+            if self.generator.random() < self.error_rate:
+                self.injected_errors += 1
+                error = self.generator.choice(self.errors)
+        time.sleep(self.latency)
+        return error
+
+    def result(self, method: str, parameters: dict) -> tuple[list, dict]:
+        """
+        Compute the result of a Kraken API public method.
+
+        :param method: API method as string.
+        :param parameters: Request parameters as dict.
+        :return: Kraken API errors and result.
+        """
+        if method == "AssetPairs":
+            return [], self.replay_data.asset_pairs
+        if method == "Assets":
+            return [], self.replay_data.assets
+        if method == "Trades":
+            page = self.replay_data.trades_page(
+                parameters.get("pair"),
+                int(parameters.get("since") or 0),
+                self.page_size,
+            )
+            if page is None:
+                return ["EQuery:Unknown asset pair"], {}
+            return [], page
+        if method == "OHLC":
+            bars = self.replay_data.ohlc_bars(
+                parameters.get("pair"),
+                int(parameters.get("interval") or 1),
+                int(parameters.get("since") or 0),
+            )
+            if bars is None:
+                return ["EQuery:Unknown asset pair"], {}
+            return [], bars
+        return ["EGeneral:Unknown method"], {}
+
+    def metrics(self) -> dict:
+        """
+        Return the number of answered requests and injected errors.
+
+        :return: Metrics as dict.
+        """
+        return {"requests": self.requests, "injected_errors": self.injected_errors}
+
+    def __enter__(self) -> "ReplayServer":
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+        self.thread.join()
+        self.server_close()
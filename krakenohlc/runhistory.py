@@ -0,0 +1,217 @@
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Optional
+
+RUN_HISTORY_FILENAME: str = "run_history.jsonl"
+# Metrics compared with previous runs, True if a higher value is a regression.
+RUN_METRICS: dict[str, bool] = {
+    "wall_seconds": True,
+    "cpu_seconds": True,
+    "peak_rss_mb": True,
+    "api_calls": True,
+    "trades_per_second": False,
+    "bars_per_second": False,
+}
+# A pair is an outlier if it took more than this factor times the median time per
+# trade of the run, and at least the minimum number of seconds.
+OUTLIER_FACTOR: float = 3.0
+OUTLIER_MIN_SECONDS: float = 1.0
+MAX_OUTLIERS: int = 10
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Get the peak resident set size of the process.
+
+    :return: Peak resident set size in megabytes, None if not available.
+    """
+    try:
+        import resource
+    except ImportError:
+        # Only available on Unix
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux and bytes on macOS
+    return round(peak_rss / (1024**2 if sys.platform == "darwin" else 1024), 1)
+
+
+class RunStats:
+    """
+    Record handling time, number of trades and number of written bars of the
+    pairs of a run to summarize its resource usage and throughput.
+    """
+
+    start_time: float
+    start_cpu_time: float
+    pairs: dict
+
+    def __init__(self) -> None:
+        """
+        Initialize the RunStats object, the run starts at initialization.
+        """
+        self.start_time = time.perf_counter()
+        self.start_cpu_time = time.process_time()
+        self.pairs = dict()
+
+    def pair_stats(self, pair: str) -> dict:
+        """
+        Get the recorded statistics of a pair.
+
+        :param pair: Pair as string.
+        :return: Seconds, number of trades and number of written bars as dict.
+        """
+        return self.pairs.setdefault(
+            pair, {"seconds": 0.0, "trade_count": 0, "bar_count": 0}
+        )
+
+    def add_pair(self, pair: str, seconds: float, trade_count: int) -> None:
+        """
+        Record the handling time and number of trades of a pair.
+
+        :param pair: Pair as string.
+        :param seconds: Pair handling time in seconds.
+        :param trade_count: Number of trades of the pair.
+        :return: None
+        """
+        pair_stats = self.pair_stats(pair)
+        pair_stats["seconds"] += seconds
+        pair_stats["trade_count"] += trade_count
+
+    def add_bars(self, pair: str, bar_count: int) -> None:
+        """
+        Record written OHLC bars of a pair.
+
+        :param pair: Pair as string.
+        :param bar_count: Number of written bars.
+        :return: None
+        """
+        self.pair_stats(pair)["bar_count"] += bar_count
+
+    def outliers(self) -> list[dict]:
+        """
+        List pairs which took much more time per trade than other pairs of the
+        run, slowest first.
+
+        :return: List of outlier pairs with their seconds and number of trades.
+        """
+        seconds_per_trade = {
+            pair: pair_stats["seconds"] / max(pair_stats["trade_count"], 1)
+            for pair, pair_stats in self.pairs.items()
+        }
+        if not seconds_per_trade:
+            return []
+        median = statistics.median(seconds_per_trade.values())
+        outliers = [
+            {
+                "pair": pair,
+                "seconds": round(self.pairs[pair]["seconds"], 3),
+                "trade_count": self.pairs[pair]["trade_count"],
+            }
+            for pair, pair_seconds_per_trade in seconds_per_trade.items()
+            if pair_seconds_per_trade > OUTLIER_FACTOR * median
+            and self.pairs[pair]["seconds"] >= OUTLIER_MIN_SECONDS
+        ]
+        outliers.sort(key=lambda outlier: -outlier["seconds"])
+        return outliers[:MAX_OUTLIERS]
+
+    def summary(self, api_calls: int) -> dict:
+        """
+        Summarize resource usage and throughput of the run until now.
+
+        :param api_calls: Number of Kraken API requests of the run.
+        :return: Run summary as dict.
+        """
+        wall_seconds = time.perf_counter() - self.start_time
+        trade_count = sum(i["trade_count"] for i in self.pairs.values())
+        bar_count = sum(i["bar_count"] for i in self.pairs.values())
+        return {
+            "wall_seconds": round(wall_seconds, 3),
+            "cpu_seconds": round(time.process_time() - self.start_cpu_time, 3),
+            "peak_rss_mb": peak_rss_mb(),
+            "api_calls": api_calls,
+            "pairs": len(self.pairs),
+            "trade_count": trade_count,
+            "bar_count": bar_count,
+            "trades_per_second": round(trade_count / wall_seconds, 1),
+            "bars_per_second": round(bar_count / wall_seconds, 1),
+            "outliers": self.outliers(),
+        }
+
+
+def append_run_history(data_folder_path: str, summary: dict) -> None:
+    """
+    Append a run summary to the data folder run history.
+
+    :param data_folder_path: Data folder path as string.
+    :param summary: Run summary as dict.
+    :return: None
+    """
+    with open(f"{data_folder_path}/{RUN_HISTORY_FILENAME}", "a") as stream:
+        stream.write(json.dumps(summary) + "\n")
+
+
+def read_run_history(data_folder_path: str) -> list[dict]:
+    """
+    Read run summaries of the data folder run history, oldest first. Lines of
+    interrupted writes are skipped.
+
+    :param data_folder_path: Data folder path as string.
+    :return: List of run summaries.
+    """
+    filepath = f"{data_folder_path}/{RUN_HISTORY_FILENAME}"
+    if not os.path.exists(filepath):
+        return []
+    history = list()
+    with open(filepath, "r") as stream:
+        for line in stream:
+            try:
+                history.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return history
+
+
+def run_regressions(
+    history: list[dict], trailing_runs: int = 10, tolerance: float = 0.25
+) -> list[dict]:
+    """
+    Compare metrics of the latest run to their median over previous runs with the
+    same configuration file and mode (download or aggregate).
+
+    :param history: List of run summaries, oldest first.
+    :param trailing_runs: Number of previous runs of the median.
+    :param tolerance: Relative change to the median flagged as a regression.
+    :return: List of metrics with latest value, median, relative change and
+        regression flag, empty if no previous run to compare to.
+    """
+    if not history:
+        return []
+    latest = history[-1]
+    previous = [
+        run
+        for run in history[:-1]
+        if run.get("config_file") == latest.get("config_file")
+        and run.get("download") == latest.get("download")
+    ][-trailing_runs:]
+    comparisons = list()
+    for metric, higher_is_worse in RUN_METRICS.items():
+        values = [run[metric] for run in previous if run.get(metric) is not None]
+        if latest.get(metric) is None or not values:
+            continue
+        median = statistics.median(values)
+        change = (latest[metric] - median) / median if median else 0.0
+        comparisons.append(
+            {
+                "metric": metric,
+                "latest": latest[metric],
+                "median": median,
+                "change": round(change, 3),
+                "regression": (
+                    change > tolerance if higher_is_worse else change < -tolerance
+                ),
+            }
+        )
+    return comparisons
@@ -0,0 +1,133 @@
+import datetime
+import fnmatch
+import statistics
+import time
+from typing import Optional
+
+SCHEDULING_DEFAULTS: dict = {
+    "priorities": {},
+    "deadline_minutes": 0,
+    "deferred_max_priority": 0,
+}
+
+
+def pair_priority(pair: str, priorities: dict) -> int:
+    """
+    Get the priority of a pair, the highest priority of the patterns it matches.
+
+    :param pair: Pair name as string.
+    :param priorities: Priorities by pair shell-style wildcard pattern.
+    :return: Pair priority, 0 if no pattern matches.
+    """
+    return max(
+        (
+            priority
+            for pattern, priority in priorities.items()
+            if fnmatch.fnmatchcase(pair, pattern)
+        ),
+        default=0,
+    )
+
+
+def estimated_trade_counts(
+    metadata: dict,
+    pairs: list,
+    start_datetime: datetime.datetime,
+    end_datetime: datetime.datetime,
+) -> dict:
+    """
+    Estimate the number of trades of pairs between dates from the trade rate of
+    their previous dates ranges in metadata. Pairs never run are estimated at the
+    median of estimated pairs.
+
+    :param metadata: Metadata as dict.
+    :param pairs: List of pairs.
+    :param start_datetime: Start date.
+    :param end_datetime: End date.
+    :return: Estimated number of trades by pair.
+    """
+    duration = (end_datetime - start_datetime).total_seconds()
+    estimates = dict()
+    for pair in pairs:
+        pair_ranges = [
+            i
+            for i in metadata["pairs"].get(pair, [])
+            if i.get("trade_count") is not None
+        ]
+        previous_duration = sum(
+            (
+                datetime.datetime.fromisoformat(i["end_datetime"])
+                - datetime.datetime.fromisoformat(i["start_datetime"])
+            ).total_seconds()
+            for i in pair_ranges
+        )
+        if previous_duration > 0:
+            trade_count = sum(i["trade_count"] for i in pair_ranges)
+            estimates[pair] = trade_count / previous_duration * duration
+    median = statistics.median(estimates.values()) if estimates else 0
+    return {pair: estimates.get(pair, median) for pair in pairs}
+
+
+def schedule_pairs(
+    pairs: list, priorities: dict, trade_counts: dict, deferred_pairs: list = None
+) -> list:
+    """
+    Order pairs by decreasing priority, then pairs of the same priority deferred
+    by the previous run first and by increasing estimated number of trades so
+    that most OHLC files are saved early. Pairs with the same priority, deferral
+    and estimate keep their order.
+
+    :param pairs: List of pairs.
+    :param priorities: Priorities by pair shell-style wildcard pattern.
+    :param trade_counts: Estimated number of trades by pair.
+    :param deferred_pairs: List of pairs deferred by the previous run.
+    :return: Ordered list of pairs.
+    """
+    deferred_pairs = set(deferred_pairs or [])
+    return sorted(
+        pairs,
+        key=lambda pair: (
+            -pair_priority(pair, priorities),
+            pair not in deferred_pairs,
+            trade_counts.get(pair, 0),
+        ),
+    )
+
+
+class RunDeadline:
+    """
+    Deadline of a run after which pairs up to a priority are deferred to the
+    next run.
+    """
+
+    deadline: Optional[float]
+    deferred_max_priority: int
+
+    def __init__(
+        self, deadline_minutes: float = 0, deferred_max_priority: int = 0
+    ) -> None:
+        """
+        Initialize the RunDeadline object, the run starts at initialization.
+
+        :param deadline_minutes: Minutes after run start of the deadline, no
+            deadline if 0.
+        :param deferred_max_priority: Maximum priority of deferred pairs.
+        """
+        self.deadline = (
+            time.monotonic() + deadline_minutes * 60 if deadline_minutes else None
+        )
+        self.deferred_max_priority = deferred_max_priority
+
+    def is_deferred(self, priority: int) -> bool:
+        """
+        Check if a pair of a priority is deferred.
+
+        :param priority: Pair priority.
+        :return: True if deadline passed and the priority is deferred, False
+            otherwise.
+        """
+        return (
+            self.deadline is not None
+            and priority <= self.deferred_max_priority
+            and time.monotonic() >= self.deadline
+        )
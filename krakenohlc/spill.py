@@ -0,0 +1,134 @@
+from typing import Iterable, Iterator
+
+import pandas as pd
+
+from .finalization import BarFinalizer
+from .ohlc import fill_ohlc_gaps, partial_ohlc_to_ohlc
+
+# Estimated memory in bytes of a trade row, with its string columns.
+TRADE_ROW_BYTES: int = 250
+MIN_CHUNK_ROWS: int = 10_000
+
+
+def memory_budget_rows(memory_budget_mb: int) -> int:
+    """
+    Compute the number of trades rows processed at once for a memory budget.
+
+    :param memory_budget_mb: Memory budget for trades in megabytes.
+    :return: Number of trades rows per chunk.
+    """
+    return max(MIN_CHUNK_ROWS, memory_budget_mb * 1024 * 1024 // TRADE_ROW_BYTES)
+
+
+def regroup_trades(
+    frames: Iterable[pd.DataFrame], chunk_rows: int
+) -> Iterator[pd.DataFrame]:
+    """
+    Regroup time ordered trades pages in chunks of at least specified number of
+    rows, except the last one.
+
+    :param frames: Iterable of time ordered trades pandas DataFrame.
+    :param chunk_rows: Number of trades rows per chunk.
+    :return: Iterator of trades pandas DataFrame chunks.
+    """
+    frames_buffer = list()
+    rows = 0
+    for df in frames:
+        frames_buffer.append(df)
+        rows += len(df)
+        if rows >= chunk_rows:
+            yield pd.concat(frames_buffer)
+            frames_buffer = list()
+            rows = 0
+    if rows:
+        yield pd.concat(frames_buffer)
+
+
+class ChunkedOHLC:
+    """
+    Aggregate time ordered chunks of trades into OHLC bars of several frequencies,
+    so that trades are processed once and only a chunk is in memory at once.
+    Only partial bars are kept between chunks, finalized by a BarFinalizer per
+    frequency: the bar overlapping two chunks stays open and is merged with the
+    open of the first chunk and close of the last one.
+    """
+
+    frequencies: list
+    volume_in_quote_asset: bool
+    statistics: list
+    anchoring: dict
+    finalizers: dict
+    trade_count: int
+
+    def __init__(
+        self,
+        frequencies: list,
+        volume_in_quote_asset: bool,
+        statistics: list = None,
+        anchoring: dict = None,
+    ) -> None:
+        """
+        Initialize the ChunkedOHLC object.
+
+        :param frequencies: List of OHLC frequencies as string.
+        :param volume_in_quote_asset: If volume is aggregated in quote asset or not.
+        :param statistics: List of additional statistics to compute per bar.
+        :param anchoring: Bars time zone, day start and week start as dict, None
+            for default anchoring.
+        """
+        self.frequencies = frequencies
+        self.volume_in_quote_asset = volume_in_quote_asset
+        self.statistics = statistics or []
+        self.anchoring = anchoring
+        self.finalizers = {
+            frequency: BarFinalizer(
+                frequency,
+                volume_in_quote_asset,
+                self.statistics,
+                anchoring=anchoring,
+            )
+            for frequency in frequencies
+        }
+        self.trade_count = 0
+
+    def update(self, df_chunk: pd.DataFrame) -> None:
+        """
+        Aggregate a chunk of trades following previous chunks.
+
+        :param df_chunk: Trades pandas DataFrame chunk.
+        :return: None
+        """
+        if df_chunk.empty:
+            return
+        self.trade_count += len(df_chunk)
+        for finalizer in self.finalizers.values():
+            finalizer.add_trades(df_chunk)
+
+    def aggregate(self, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """
+        Aggregate chunks of trades as they are iterated and yield them, to process
+        chunks in the same pass, for instance to write them as CSV.
+
+        :param chunks: Iterable of time ordered trades pandas DataFrame chunks.
+        :return: Iterator of trades pandas DataFrame chunks.
+        """
+        for df_chunk in chunks:
+            self.update(df_chunk)
+            yield df_chunk
+
+    def ohlc(self, frequency: str, fill_policy: str = "nan") -> pd.DataFrame:
+        """
+        Return OHLC bars of aggregated trades for a frequency like trades_to_ohlc.
+
+        :param frequency: OHLC frequency as string.
+        :param fill_policy: Policy applied to bars without trades (nan, ffill or
+            drop).
+        :return: OHLC DataFrame in specified frequency.
+        """
+        df_partial = self.finalizers[frequency].partial_bars()
+        if df_partial.empty:
+            return pd.DataFrame()
+        df_ohlc = partial_ohlc_to_ohlc(
+            df_partial, frequency, self.statistics, self.anchoring
+        )
+        return fill_ohlc_gaps(df_ohlc, fill_policy)
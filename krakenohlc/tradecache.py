@@ -0,0 +1,216 @@
+import contextlib
+import datetime
+import logging
+import os
+from pathlib import Path
+from typing import Iterator
+
+import pandas as pd
+from krakenapi import KrakenApi
+
+from .io import read_csv, write_csv
+from .ratelimit import AdaptiveRateLimiter
+from .trades import download_trades
+
+logger: logging.Logger = logging.getLogger(__name__)
+# Trades are cached by complete UTC day, shared by runs with different dates.
+TRADE_CACHE_DAY: datetime.timedelta = datetime.timedelta(days=1)
+TRADE_CACHE_LOCK_FILENAME: str = ".lock"
+
+
+def cached_trades_filepath(
+    cache_folder_path: str, pair: str, day: datetime.datetime
+) -> str:
+    """
+    Generate the shared trade cache file path of a pair day of trades.
+
+    :param cache_folder_path: Shared trade cache folder path as string.
+    :param pair: Pair of trades.
+    :param day: Day start date.
+    :return: Cached trades file path as string.
+    """
+    return f"{cache_folder_path}/{pair}/{day:%Y-%m-%d}.csv.gz"
+
+
+def trade_cache_days(
+    start_datetime: datetime.datetime, end_datetime: datetime.datetime
+) -> list[datetime.datetime]:
+    """
+    List start dates of complete days between two dates.
+
+    :param start_datetime: Start date.
+    :param end_datetime: End date.
+    :return: List of day start dates.
+    """
+    day = datetime.datetime.combine(start_datetime.date(), datetime.time())
+    if day < start_datetime:
+        day += TRADE_CACHE_DAY
+    days = list()
+    while day + TRADE_CACHE_DAY <= end_datetime:
+        days.append(day)
+        day += TRADE_CACHE_DAY
+    return days
+
+
+def uncached_ranges(
+    start_datetime: datetime.datetime,
+    end_datetime: datetime.datetime,
+    cached_days: list[datetime.datetime],
+) -> list[tuple[datetime.datetime, datetime.datetime]]:
+    """
+    Split dates in ranges not covered by cached days.
+
+    :param start_datetime: Start date.
+    :param end_datetime: End date.
+    :param cached_days: Sorted start dates of cached days between dates.
+    :return: List of start and end dates of uncached ranges.
+    """
+    ranges = list()
+    range_start = start_datetime
+    for day in cached_days:
+        if day > range_start:
+            ranges.append((range_start, day))
+        range_start = max(range_start, day + TRADE_CACHE_DAY)
+    if range_start < end_datetime:
+        ranges.append((range_start, end_datetime))
+    return ranges
+
+
+@contextlib.contextmanager
+def pair_cache_lock(cache_folder_path: str, pair: str) -> Iterator[None]:
+    """
+    Lock the shared trade cache of a pair for writing, until other runs writing it
+    release it. Readers do not lock, cached files are replaced atomically.
+
+    :param cache_folder_path: Shared trade cache folder path as string.
+    :param pair: Pair of trades.
+    :return: Context manager.
+    """
+    # Only available on Unix, checked by configuration
+    import fcntl
+
+    Path(f"{cache_folder_path}/{pair}").mkdir(parents=True, exist_ok=True)
+    with open(f"{cache_folder_path}/{pair}/{TRADE_CACHE_LOCK_FILENAME}", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def read_cached_trades(
+    cache_folder_path: str,
+    pair: str,
+    days: list[datetime.datetime],
+    dtype_backend: str = "numpy",
+) -> dict:
+    """
+    Read cached days of trades of a pair.
+
+    :param cache_folder_path: Shared trade cache folder path as string.
+    :param pair: Pair of trades.
+    :param days: Start dates of days to read.
+    :param dtype_backend: DataFrame dtype backend (numpy or pyarrow).
+    :return: Trades pandas DataFrame by day start date of cached days.
+    """
+    cached_trades = dict()
+    for day in days:
+        filepath = cached_trades_filepath(cache_folder_path, pair, day)
+        # Days without trades are cached as empty files
+        if os.path.exists(filepath):
+            df_trades = read_csv(filepath, "trades", dtype_backend=dtype_backend)
+            # Empty miscellaneous values are read as missing values
+            df_trades["miscellaneous"] = df_trades["miscellaneous"].fillna("")
+            cached_trades[day] = df_trades
+    return cached_trades
+
+
+def write_cached_trades(
+    cache_folder_path: str,
+    pair: str,
+    df_trades: pd.DataFrame,
+    start_datetime: datetime.datetime,
+    end_datetime: datetime.datetime,
+) -> int:
+    """
+    Cache complete days of downloaded trades of a pair, days not ended yet are
+    not cached. Must be called with the pair cache lock.
+
+    :param cache_folder_path: Shared trade cache folder path as string.
+    :param pair: Pair of trades.
+    :param df_trades: Trades pandas DataFrame downloaded between dates.
+    :param start_datetime: Trades start date.
+    :param end_datetime: Trades end date.
+    :return: Number of cached days.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    days = [
+        day
+        for day in trade_cache_days(start_datetime, end_datetime)
+        if day + TRADE_CACHE_DAY <= now
+    ]
+    for day in days:
+        start = df_trades.index.searchsorted(day)
+        end = df_trades.index.searchsorted(day + TRADE_CACHE_DAY)
+        write_csv(
+            df_trades.iloc[start:end],
+            cached_trades_filepath(cache_folder_path, pair, day),
+            compression="gzip",
+        )
+    return len(days)
+
+
+def download_trades_cached(
+    ka: KrakenApi,
+    pair: str,
+    start_datetime: datetime.datetime,
+    end_datetime: datetime.datetime,
+    cache_folder_path: str,
+    rate_limiter: AdaptiveRateLimiter = None,
+    dtype_backend: str = "numpy",
+) -> pd.DataFrame:
+    """
+    Get trades of a pair between two dates from a trade cache shared by runs,
+    only trades of days not cached yet being downloaded and then cached. A run
+    downloading trades of a pair locks its cache, so concurrent runs wait for
+    its trades instead of downloading them again.
+
+    :param ka: KrakenAPI object.
+    :param pair: Pair to download trades history.
+    :param start_datetime: Trades start date as datetime.
+    :param end_datetime: Trades end date as datetime.
+    :param cache_folder_path: Shared trade cache folder path as string.
+    :param rate_limiter: AdaptiveRateLimiter object, a new one if None.
+    :param dtype_backend: DataFrame dtype backend (numpy or pyarrow).
+    :return: Trade history as pandas DataFrame.
+    """
+    days = trade_cache_days(start_datetime, end_datetime)
+    pieces = read_cached_trades(cache_folder_path, pair, days, dtype_backend)
+    ranges = uncached_ranges(start_datetime, end_datetime, sorted(pieces))
+    cached_days = len(pieces)
+    if ranges:
+        with pair_cache_lock(cache_folder_path, pair):
+            # Days cached by another run while waiting for the lock
+            pieces.update(
+                read_cached_trades(
+                    cache_folder_path,
+                    pair,
+                    [day for day in days if day not in pieces],
+                    dtype_backend,
+                )
+            )
+            ranges = uncached_ranges(start_datetime, end_datetime, sorted(pieces))
+            cached_days = len(pieces)
+            for range_start, range_end in ranges:
+                df_range = download_trades(
+                    ka, pair, range_start, range_end, rate_limiter, dtype_backend
+                )
+                write_cached_trades(
+                    cache_folder_path, pair, df_range, range_start, range_end
+                )
+                pieces[range_start] = df_range
+    logger.info(
+        f"{pair}: {cached_days} days of trades read from shared trade cache, "
+        f"{len(ranges)} ranges downloaded."
+    )
+    return pd.concat([pieces[start] for start in sorted(pieces)])
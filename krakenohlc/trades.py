@@ -1,7 +1,16 @@
+import bisect
+import logging
 from datetime import datetime, timezone
+from typing import Iterator
 
 import pandas as pd
 from krakenapi import KrakenApi
+from krakenapi.utils import utc_unix_time_datetime
+
+from .io import import_pyarrow
+from .ratelimit import AdaptiveRateLimiter, send_public_request
+
+logger: logging.Logger = logging.getLogger(__name__)
 
 
 def datetime_as_utc_unix(date: datetime) -> int:
@@ -14,14 +23,17 @@ def datetime_as_utc_unix(date: datetime) -> int:
     return int(date.replace(tzinfo=timezone.utc).timestamp())
 
 
-def trades_as_dataframe(trades: list) -> pd.DataFrame:
+def trades_as_dataframe(trades: list, dtype_backend: str = "numpy") -> pd.DataFrame:
     """
     Convert Kraken api downloaded trades ass pandas DataFrame.
     Is called by get_trades function.
 
     :param trades: Downloaded data from kraken api as dictionary.
+    :param dtype_backend: DataFrame dtype backend (numpy or pyarrow).
     :return: Pandas DataFrame of trades data.
     """
+    if dtype_backend == "pyarrow":
+        return trades_as_arrow_dataframe(trades)
     # Trade id was added to the response since the first version of the
     # API. We remove it to keep compatibility. See:
     # https://docs.kraken.com/rest/#tag/Market-Data/operation/getRecentTrades
@@ -45,22 +57,115 @@ def trades_as_dataframe(trades: list) -> pd.DataFrame:
     return df
 
 
+def trades_as_arrow_dataframe(trades: list) -> pd.DataFrame:
+    """
+    Convert Kraken api downloaded trades as pandas DataFrame backed by Arrow
+    arrays. Columns are converted once to Arrow arrays used by pandas without copy,
+    instead of intermediate object columns.
+
+    :param trades: Downloaded data from kraken api as dictionary.
+    :return: Pandas DataFrame of trades data with Arrow dtypes.
+    """
+    pa = import_pyarrow()
+    columns = list(zip(*[i[:6] for i in trades])) or [()] * 6
+    times = pa.array(columns[2], pa.float64()).to_numpy(zero_copy_only=False)
+    index = pd.to_datetime(times, unit="s").round("us")
+    return pd.DataFrame(
+        {
+            "price": pd.arrays.ArrowExtensionArray(
+                pa.array(columns[0], pa.string()).cast(pa.float64())
+            ),
+            "volume": pd.arrays.ArrowExtensionArray(
+                pa.array(columns[1], pa.string()).cast(pa.float64())
+            ),
+            "buy/sell": pd.arrays.ArrowExtensionArray(
+                pa.array(columns[3], pa.string())
+            ),
+            "market/limit": pd.arrays.ArrowExtensionArray(
+                pa.array(columns[4], pa.string())
+            ),
+            "miscellaneous": pd.arrays.ArrowExtensionArray(
+                pa.array(columns[5], pa.string())
+            ),
+        },
+        index=pd.DatetimeIndex(index, name="time"),
+    )
+
+
+def iter_trades_pages(
+    ka: KrakenApi,
+    pair: str,
+    start_datetime: datetime,
+    end_datetime: datetime,
+    rate_limiter: AdaptiveRateLimiter = None,
+    dtype_backend: str = "numpy",
+) -> Iterator[pd.DataFrame]:
+    """
+    Download trades for a specified pair from start to end dates and yield them by
+    pages of trades, requests are paced by an adaptive rate limiter.
+
+    :param ka: KrakenAPI object.
+    :param pair: Pair to download trades history.
+    :param start_datetime: Trades start date as datetime.
+    :param end_datetime: Trades end date as datetime.
+    :param rate_limiter: AdaptiveRateLimiter object, a new one if None.
+    :param dtype_backend: DataFrame dtype backend (numpy or pyarrow).
+    :return: Iterator of trades pages as pandas DataFrame before end date.
+    """
+    rate_limiter = rate_limiter or AdaptiveRateLimiter()
+    since = datetime_as_utc_unix(start_datetime)
+    end_unix_time = end_datetime.replace(tzinfo=timezone.utc).timestamp()
+    while True:
+        data = send_public_request(
+            ka, "Trades", {"pair": pair, "since": str(since)}, rate_limiter
+        )
+        # Trades are stored as first key values in returned dict from API
+        trades = list(data.values())[0]
+        # Only trades before end date are converted
+        end_position = bisect.bisect_left(
+            trades, end_unix_time, key=lambda trade: float(trade[2])
+        )
+        df_page = trades_as_dataframe(trades[:end_position], dtype_backend)
+        yield df_page[df_page.index < end_datetime]
+        page_start_date = utc_unix_time_datetime(since)
+        # Last trade unix time in nanoseconds is the next page start
+        since = int(data.get("last")) + 1
+        page_end_date = utc_unix_time_datetime(since)
+        logger.info(
+            f"{pair}: Downloaded trades from {page_start_date} to {page_end_date}."
+        )
+        # Stop paging as soon as the page passes end date
+        if (
+            end_position < len(trades)
+            or page_end_date >= end_datetime
+            or page_start_date == page_end_date
+        ):
+            break
+    logger.info(f"{pair}: Download rate limiter state {rate_limiter.metrics()}.")
+
+
 def download_trades(
-    ka: KrakenApi, pair: str, start_datetime: datetime, end_datetime: datetime
+    ka: KrakenApi,
+    pair: str,
+    start_datetime: datetime,
+    end_datetime: datetime,
+    rate_limiter: AdaptiveRateLimiter = None,
+    dtype_backend: str = "numpy",
 ) -> pd.DataFrame:
     """
-    Call KrakenAPI get_trades_history method to download trades for a specified
-    pair from start to end dates.
+    Download trades for a specified pair from start to end dates by pages of
+    trades, requests are paced by an adaptive rate limiter.
 
     :param ka: KrakenAPI object.
     :param pair: Pair to download trades history.
     :param start_datetime: Trades start date as datetime.
     :param end_datetime: Trades end date as datetime.
+    :param rate_limiter: AdaptiveRateLimiter object, a new one if None.
+    :param dtype_backend: DataFrame dtype backend (numpy or pyarrow).
     :return: Trade history as pandas DataFrame.
     """
-    start_unix_time = datetime_as_utc_unix(start_datetime)
-    end_unix_time = datetime_as_utc_unix(end_datetime)
-    trades = ka.get_trades_history(pair, start_unix_time, end_unix_time)
-    df_trades = trades_as_dataframe(trades)
-    df_trades = df_trades[df_trades.index < end_datetime]
-    return df_trades
+    return pd.concat(
+        iter_trades_pages(
+            ka, pair, start_datetime, end_datetime, rate_limiter, dtype_backend
+        )
+    )
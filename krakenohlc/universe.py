@@ -0,0 +1,162 @@
+import fnmatch
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from krakenapi import KrakenApi
+
+# Trading status of asset pairs open for trading, pairs without status are online.
+ONLINE_STATUS: str = "online"
+ASSET_PAIRS_CACHE_DEFAULTS: dict = {
+    "path": None,
+    "max_age_hours": 24,
+}
+
+
+def cached_asset_pairs(
+    ka: KrakenApi, api_url: str, cache_filepath: str = None, max_age_hours: float = 24
+) -> dict:
+    """
+    Get Kraken API AssetPairs result from the cache file if saved from the same API
+    less than maximum age ago, otherwise request it and save it to the cache file.
+
+    :param ka: KrakenApi object.
+    :param api_url: Kraken API URL the cache file was saved from.
+    :param cache_filepath: AssetPairs cache file path, always requested if None.
+    :param max_age_hours: Maximum age of the cache file in hours.
+    :return: AssetPairs result as dict.
+    """
+    if (
+        cache_filepath
+        and os.path.exists(cache_filepath)
+        and time.time() - os.path.getmtime(cache_filepath) < max_age_hours * 3600
+    ):
+        try:
+            with open(cache_filepath, "r") as stream:
+                cache = json.load(stream)
+            if cache.get("api_url") == api_url:
+                return cache["asset_pairs"]
+        except (json.JSONDecodeError, KeyError, AttributeError):
+            # Interrupted writes are requested again
+            pass
+    asset_pairs = ka.get_asset_pairs()
+    if cache_filepath:
+        temporary_filepath = f"{cache_filepath}.tmp"
+        with open(temporary_filepath, "w") as stream:
+            json.dump({"api_url": api_url, "asset_pairs": asset_pairs}, stream)
+        os.replace(temporary_filepath, cache_filepath)
+    return asset_pairs
+
+
+def asset_pairs_frame(asset_pairs: dict) -> pd.DataFrame:
+    """
+    Tabulate Kraken API AssetPairs result by pair name with explicit base and
+    quote assets, their alternative names from pair websocket name, and trading
+    status.
+
+    :param asset_pairs: AssetPairs result as dict.
+    :return: Asset pairs pandas DataFrame indexed by pair name.
+    """
+    df = pd.DataFrame(
+        list(asset_pairs.values()), index=pd.Index(list(asset_pairs), dtype=object)
+    ).reindex(columns=["altname", "wsname", "base", "quote", "status"])
+    names = df.index.to_series()
+    base = df["base"].fillna("").astype(str)
+    quote = df["quote"].fillna("").astype(str)
+    # Websocket names like XBT/USD hold assets alternative names
+    wsnames = df["wsname"].fillna("").astype(str).str.partition("/")
+    wsnames = wsnames.reindex(columns=[0, 1, 2], fill_value="")
+    return pd.DataFrame(
+        {
+            "altname": df["altname"].fillna(names).astype(str),
+            "base": base,
+            "quote": quote,
+            "base_altname": wsnames[0].mask(wsnames[2] == "", base),
+            "quote_altname": wsnames[2].mask(wsnames[2] == "", quote),
+            "status": df["status"].fillna(ONLINE_STATUS).astype(str),
+        },
+        index=df.index,
+    )
+
+
+def patterns_regex(patterns: list) -> str:
+    """
+    Translate shell-style wildcard patterns (*, ?, [seq]) to a regular expression
+    matching any of them.
+
+    :param patterns: List of patterns as string.
+    :return: Regular expression as string.
+    """
+    return "|".join(fnmatch.translate(str(pattern)) for pattern in patterns)
+
+
+def assets_mask(df_pairs: pd.DataFrame, side: str, patterns: list) -> pd.Series:
+    """
+    Select asset pairs whose base or quote asset identifier (e.g. XXBT) or
+    alternative name (e.g. XBT) matches a pattern.
+
+    :param df_pairs: Asset pairs pandas DataFrame.
+    :param side: Asset side, base or quote.
+    :param patterns: List of asset patterns as string.
+    :return: Boolean pandas Series indexed by pair name.
+    """
+    regex = patterns_regex(patterns)
+    return df_pairs[side].str.match(regex) | df_pairs[f"{side}_altname"].str.match(
+        regex
+    )
+
+
+def pairs_mask(df_pairs: pd.DataFrame, patterns: list) -> pd.Series:
+    """
+    Select asset pairs whose name or alternative name matches a pattern.
+
+    :param df_pairs: Asset pairs pandas DataFrame.
+    :param patterns: List of pair patterns as string.
+    :return: Boolean pandas Series indexed by pair name.
+    """
+    regex = patterns_regex(patterns)
+    return df_pairs.index.to_series().str.match(regex) | df_pairs["altname"].str.match(
+        regex
+    )
+
+
+def select_pairs(
+    df_pairs: pd.DataFrame,
+    quote_assets: list,
+    excluded_base_assets: list = None,
+    included_pairs: list = None,
+    excluded_pairs: list = None,
+    online_only: bool = False,
+) -> list[str]:
+    """
+    Select asset pairs by quote asset with vectorized masks over all pairs, then
+    apply exclusion and inclusion rules. Assets and pairs are matched exactly or
+    with shell-style wildcard patterns. Pairs are listed by quote asset in quote
+    assets order, then in asset pairs order.
+
+    :param df_pairs: Asset pairs pandas DataFrame.
+    :param quote_assets: Quote assets of selected pairs.
+    :param excluded_base_assets: Base assets of excluded pairs.
+    :param included_pairs: Only select pairs matching these patterns if not empty.
+    :param excluded_pairs: Exclude pairs matching these patterns.
+    :param online_only: Only select pairs open for trading.
+    :return: List of selected pair names.
+    """
+    # Index of the first quote asset matching pairs quote asset
+    quote_ranks = np.full(len(df_pairs), len(quote_assets))
+    for rank, quote_asset in reversed(list(enumerate(quote_assets))):
+        quote_ranks[assets_mask(df_pairs, "quote", [quote_asset]).to_numpy(bool)] = rank
+    selected = pd.Series(quote_ranks < len(quote_assets), index=df_pairs.index)
+    if excluded_base_assets:
+        selected &= ~assets_mask(df_pairs, "base", excluded_base_assets)
+    if included_pairs:
+        selected &= pairs_mask(df_pairs, included_pairs)
+    if excluded_pairs:
+        selected &= ~pairs_mask(df_pairs, excluded_pairs)
+    if online_only:
+        selected &= df_pairs["status"] == ONLINE_STATUS
+    selected = selected.to_numpy(bool)
+    order = np.argsort(quote_ranks[selected], kind="stable")
+    return df_pairs.index[selected][order].tolist()
@@ -0,0 +1,205 @@
+import datetime
+import logging
+
+import numpy as np
+import pandas as pd
+from krakenapi import KrakenApi
+
+from .ratelimit import AdaptiveRateLimiter
+from .trades import download_trades
+
+logger: logging.Logger = logging.getLogger(__name__)
+# Number of previous trades used to estimate the expected time between trades.
+TRADE_RATE_WINDOW: int = 1000
+# Below this number of previous trades, the whole period trade rate is used.
+TRADE_RATE_MIN_WINDOW: int = 100
+
+
+def overlapping_trades(trade_dates: pd.DatetimeIndex) -> np.ndarray:
+    """
+    Find trades of overlapping pages, from a time regression to the first trade
+    after the latest previous trade.
+
+    :param trade_dates: Trades dates.
+    :return: Boolean array, True for trades of an overlapping page.
+    """
+    times = trade_dates.asi8
+    previous_max = np.full(len(times), np.iinfo(np.int64).min)
+    previous_max[1:] = np.maximum.accumulate(times)[:-1]
+    not_after = times <= previous_max
+    # Overlaps start at a time regression and last while trades are not after the
+    # latest previous trade
+    runs = np.cumsum(~not_after)
+    regressed = pd.Series(times < previous_max).groupby(runs).cummax().to_numpy()
+    return not_after & regressed
+
+
+def duplicated_trades(df_trades: pd.DataFrame) -> np.ndarray:
+    """
+    Find trades of overlapping pages duplicated with all their columns and time,
+    as downloaded twice. Kraken trade ids are not kept, so identical trades in
+    time order, like fills of an order at the same price and time, are not
+    duplicates.
+
+    :param df_trades: Trades pandas DataFrame.
+    :return: Boolean array, True for duplicates of a previous trade.
+    """
+    duplicated = df_trades.reset_index().duplicated(keep="first").to_numpy()
+    return duplicated & overlapping_trades(df_trades.index)
+
+
+def trades_gaps(
+    trade_dates: pd.DatetimeIndex,
+    gap_factor: float,
+    min_gap: pd.Timedelta,
+    start_datetime: datetime.datetime = None,
+    end_datetime: datetime.datetime = None,
+) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+    """
+    Find suspicious gaps between trades compared with the expected time between
+    trades, estimated from the previous trades rate. A gap is suspicious if longer
+    than the minimum gap and gap factor times the expected time between trades.
+
+    :param trade_dates: Time sorted trades dates.
+    :param gap_factor: Gap factor applied to the expected time between trades.
+    :param min_gap: Minimum duration of a suspicious gap.
+    :param start_datetime: Trades start date to check gap before first trade.
+    :param end_datetime: Trades end date to check gap after last trade.
+    :return: List of gaps start and end dates.
+    """
+    dates = trade_dates
+    if start_datetime is not None:
+        dates = pd.DatetimeIndex([start_datetime]).append(dates)
+    if end_datetime is not None:
+        dates = dates.append(pd.DatetimeIndex([end_datetime]))
+    times = dates.asi8
+    if len(times) < 2:
+        return []
+    diffs = np.diff(times)
+    mean_diff = (times[-1] - times[0]) / len(diffs)
+    # Expected time between trades from the rate of previous trades
+    positions = np.arange(len(diffs))
+    window_starts = np.maximum(positions - TRADE_RATE_WINDOW, 0)
+    window_sizes = positions - window_starts
+    expected_diffs = np.full(len(diffs), mean_diff, dtype=float)
+    has_window = window_sizes >= TRADE_RATE_MIN_WINDOW
+    expected_diffs[has_window] = (
+        times[positions[has_window]] - times[window_starts[has_window]]
+    ) / window_sizes[has_window]
+    thresholds = np.maximum(gap_factor * expected_diffs, min_gap.value)
+    gaps = np.flatnonzero(diffs > thresholds)
+    return [(dates[i], dates[i + 1]) for i in gaps]
+
+
+def verify_trades(
+    df_trades: pd.DataFrame,
+    gap_factor: float = 50,
+    min_gap: pd.Timedelta = pd.Timedelta(hours=1),
+    start_datetime: datetime.datetime = None,
+    end_datetime: datetime.datetime = None,
+    confirmed_gaps: list = None,
+) -> dict:
+    """
+    Verify trade history integrity: duplicated trades, time regressions and
+    suspicious gaps compared with the expected trade rate. Gaps confirmed without
+    trades, like quiet periods of illiquid pairs, are not suspicious.
+
+    :param df_trades: Trades pandas DataFrame.
+    :param gap_factor: Gap factor applied to the expected time between trades.
+    :param min_gap: Minimum duration of a suspicious gap.
+    :param start_datetime: Trades start date to check gap before first trade.
+    :param end_datetime: Trades end date to check gap after last trade.
+    :param confirmed_gaps: List of gaps start and end dates confirmed without
+        trades.
+    :return: Verification report as dict.
+    """
+    time_regressions = int((np.diff(df_trades.index.asi8) < 0).sum())
+    sorted_dates = (
+        df_trades.index if not time_regressions else df_trades.index.sort_values()
+    )
+    gaps = trades_gaps(sorted_dates, gap_factor, min_gap, start_datetime, end_datetime)
+    confirmed_gaps = set(confirmed_gaps or [])
+    return {
+        "trade_count": len(df_trades),
+        "duplicates": int(duplicated_trades(df_trades).sum()),
+        "time_regressions": time_regressions,
+        "gaps": [gap for gap in gaps if gap not in confirmed_gaps],
+    }
+
+
+def gaps_without_trades(
+    trade_dates: pd.DatetimeIndex, gaps: list[tuple[pd.Timestamp, pd.Timestamp]]
+) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+    """
+    Find gaps without trades between their start and end dates, for instance gaps
+    still without trades once downloaded again.
+
+    :param trade_dates: Time sorted trades dates.
+    :param gaps: List of gaps start and end dates.
+    :return: List of gaps start and end dates without trades.
+    """
+    return [
+        (gap_start, gap_end)
+        for gap_start, gap_end in gaps
+        if trade_dates.searchsorted(gap_start, side="right")
+        == trade_dates.searchsorted(gap_end, side="left")
+    ]
+
+
+def is_trades_report_valid(report: dict) -> bool:
+    """
+    Check if a trades verification report has no issue.
+
+    :param report: Verification report as dict.
+    :return: True if trades have no issue, False otherwise.
+    """
+    return not (report["duplicates"] or report["time_regressions"] or report["gaps"])
+
+
+def repair_trades(
+    ka: KrakenApi,
+    pair: str,
+    df_trades: pd.DataFrame,
+    report: dict,
+    rate_limiter: AdaptiveRateLimiter = None,
+    dtype_backend: str = "numpy",
+) -> pd.DataFrame:
+    """
+    Repair trade history from its verification report: remove duplicated trades,
+    sort trades by time and download again trades of suspicious gaps only.
+
+    :param ka: KrakenAPI object.
+    :param pair: Pair of trades.
+    :param df_trades: Trades pandas DataFrame.
+    :param report: Verification report as dict.
+    :param rate_limiter: AdaptiveRateLimiter object, a new one if None.
+    :param dtype_backend: DataFrame dtype backend (numpy or pyarrow).
+    :return: Repaired trades pandas DataFrame.
+    """
+    if report["duplicates"]:
+        df_trades = df_trades[~duplicated_trades(df_trades)]
+    if report["time_regressions"]:
+        df_trades = df_trades.sort_index(kind="stable")
+    rate_limiter = rate_limiter or AdaptiveRateLimiter()
+    gaps_trades = list()
+    for gap_start, gap_end in report["gaps"]:
+        df_gap_trades = download_trades(
+            ka,
+            pair,
+            gap_start.to_pydatetime(),
+            gap_end.to_pydatetime(),
+            rate_limiter,
+            dtype_backend,
+        )
+        # Trades at gap dates are already known
+        df_gap_trades = df_gap_trades[
+            (df_gap_trades.index > gap_start) & (df_gap_trades.index < gap_end)
+        ]
+        logger.info(
+            f"{pair}: {len(df_gap_trades)} trades downloaded again from "
+            f"{gap_start} to {gap_end}."
+        )
+        gaps_trades.append(df_gap_trades)
+    if gaps_trades:
+        df_trades = pd.concat([df_trades] + gaps_trades).sort_index(kind="stable")
+    return df_trades
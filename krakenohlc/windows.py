@@ -0,0 +1,72 @@
+import datetime
+
+import pandas as pd
+
+# pandas frequencies of calendar periods splitting download dates in windows.
+WINDOW_PERIODS: dict[str, str] = {
+    "day": "D",
+    "week": "W-MON",
+    "month": "MS",
+    "year": "YS",
+}
+WINDOW_DATE_FORMAT: str = "%Y-%m-%d %H:%M:%S"
+OUTPUT_WINDOWS_DEFAULTS: dict = {
+    "period": None,
+    "dates": [],
+}
+
+
+def period_windows(
+    start_datetime: datetime.datetime,
+    end_datetime: datetime.datetime,
+    period: str,
+) -> list[tuple[datetime.datetime, datetime.datetime]]:
+    """
+    Split dates in consecutive calendar period windows, first and last windows
+    being cut at start and end dates.
+
+    :param start_datetime: Start date.
+    :param end_datetime: End date.
+    :param period: Calendar period (day, week, month or year).
+    :return: List of windows start and end dates.
+    """
+    boundaries = [
+        boundary.to_pydatetime()
+        for boundary in pd.date_range(
+            start_datetime, end_datetime, freq=WINDOW_PERIODS[period], normalize=True
+        )
+        if start_datetime < boundary < end_datetime
+    ]
+    boundaries = [start_datetime] + boundaries + [end_datetime]
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def ohlc_windows(
+    start_datetime: datetime.datetime,
+    end_datetime: datetime.datetime,
+    period: str = None,
+    dates: list = None,
+) -> list[tuple[datetime.datetime, datetime.datetime]]:
+    """
+    List OHLC output windows of download dates, calendar period windows and
+    windows of explicit dates, sorted and without duplicates.
+
+    :param start_datetime: Download start date.
+    :param end_datetime: Download end date.
+    :param period: Calendar period (day, week, month or year), None for no period
+        windows.
+    :param dates: List of windows start and end dates as strings.
+    :return: List of windows start and end dates.
+    """
+    windows = period_windows(start_datetime, end_datetime, period) if period else []
+    for window_start, window_end in dates or []:
+        window = (
+            datetime.datetime.strptime(window_start, WINDOW_DATE_FORMAT),
+            datetime.datetime.strptime(window_end, WINDOW_DATE_FORMAT),
+        )
+        if not start_datetime <= window[0] < window[1] <= end_datetime:
+            raise ValueError(
+                f"Window {window_start} - {window_end} not between download dates."
+            )
+        windows.append(window)
+    return sorted(set(windows))
@@ -0,0 +1,308 @@
+import datetime
+import json
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional
+
+QUEUE_FILENAME: str = "queue.sqlite"
+# Leases not renewed by a heartbeat for this duration in seconds are expired, and
+# their jobs leased again by another worker.
+LEASE_DURATION: float = 300.0
+MAX_ATTEMPTS: int = 3
+JOB_STATUSES: list[str] = ["pending", "leased", "done", "failed"]
+
+
+def queue_filepath(data_folder_path: str) -> str:
+    """
+    Generate the work queue database file path of a data folder.
+
+    :param data_folder_path: Data folder path as string.
+    :return: Work queue file path as string.
+    """
+    return f"{data_folder_path}/{QUEUE_FILENAME}"
+
+
+def connect_queue(data_folder_path: str) -> sqlite3.Connection:
+    """
+    Open the work queue database of a data folder, created if not existing.
+    Transactions are explicit so a job lease is atomic between processes.
+
+    :param data_folder_path: Data folder path as string.
+    :return: SQLite connection.
+    """
+    connection = sqlite3.connect(
+        queue_filepath(data_folder_path), timeout=60, isolation_level=None
+    )
+    connection.row_factory = sqlite3.Row
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS jobs ("
+        "id TEXT PRIMARY KEY, pair TEXT, start TEXT, end TEXT, "
+        "status TEXT DEFAULT 'pending', worker TEXT, lease_expires REAL, "
+        "attempts INTEGER DEFAULT 0, result TEXT)"
+    )
+    return connection
+
+
+def job_ranges(
+    start_datetime: datetime.datetime,
+    end_datetime: datetime.datetime,
+    range_days: int = None,
+) -> list[tuple[datetime.datetime, datetime.datetime]]:
+    """
+    Split download dates in consecutive ranges of specified number of days.
+
+    :param start_datetime: Download start date as datetime.
+    :param end_datetime: Download end date as datetime.
+    :param range_days: Number of days per range, a single range if None.
+    :return: List of ranges start and end dates.
+    """
+    if not range_days:
+        return [(start_datetime, end_datetime)]
+    ranges = list()
+    range_start = start_datetime
+    while range_start < end_datetime:
+        range_end = min(range_start + datetime.timedelta(days=range_days), end_datetime)
+        ranges.append((range_start, range_end))
+        range_start = range_end
+    return ranges
+
+
+def enqueue_jobs(
+    connection: sqlite3.Connection,
+    pairs: list,
+    start_datetime: datetime.datetime,
+    end_datetime: datetime.datetime,
+    range_days: int = None,
+) -> int:
+    """
+    Add a job per pair and dates range to the work queue. Jobs already queued are
+    ignored, so enqueuing again the same pairs and dates is idempotent.
+
+    :param connection: Work queue SQLite connection.
+    :param pairs: List of pairs.
+    :param start_datetime: Download start date as datetime.
+    :param end_datetime: Download end date as datetime.
+    :param range_days: Number of days per job, a job per pair if None.
+    :return: Number of added jobs.
+    """
+    jobs = [
+        (f"{pair}_{start}_{end}", pair, str(start), str(end))
+        for pair in pairs
+        for start, end in job_ranges(start_datetime, end_datetime, range_days)
+    ]
+    connection.execute("BEGIN IMMEDIATE")
+    added = connection.executemany(
+        "INSERT OR IGNORE INTO jobs (id, pair, start, end) VALUES (?, ?, ?, ?)", jobs
+    ).rowcount
+    connection.execute("COMMIT")
+    return added
+
+
+def lease_job(
+    connection: sqlite3.Connection,
+    worker: str,
+    lease_duration: float = LEASE_DURATION,
+) -> Optional[dict]:
+    """
+    Lease the next pending job, or a job whose lease expired, to a worker. Jobs
+    whose lease expired after the maximum number of attempts are marked as failed.
+
+    :param connection: Work queue SQLite connection.
+    :param worker: Worker identifier as string.
+    :param lease_duration: Lease duration in seconds.
+    :return: Leased job as dict, None if no job to lease.
+    """
+    now = time.time()
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        connection.execute(
+            "UPDATE jobs SET status = 'failed', result = ? WHERE status = 'leased' "
+            "AND lease_expires < ? AND attempts >= ?",
+            (json.dumps({"error": "Job lease expired."}), now, MAX_ATTEMPTS),
+        )
+        job = connection.execute(
+            "SELECT * FROM jobs WHERE (status = 'pending' OR (status = 'leased' "
+            "AND lease_expires < ?)) AND attempts < ? ORDER BY rowid LIMIT 1",
+            (now, MAX_ATTEMPTS),
+        ).fetchone()
+        if job is not None:
+            connection.execute(
+                "UPDATE jobs SET status = 'leased', worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                (worker, now + lease_duration, job["id"]),
+            )
+        connection.execute("COMMIT")
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    if job is None:
+        return None
+    return {**dict(job), "worker": worker, "attempts": job["attempts"] + 1}
+
+
+def heartbeat_job(
+    connection: sqlite3.Connection,
+    job_id: str,
+    worker: str,
+    lease_duration: float = LEASE_DURATION,
+) -> bool:
+    """
+    Extend the lease of a job still leased by worker.
+
+    :param connection: Work queue SQLite connection.
+    :param job_id: Job identifier as string.
+    :param worker: Worker identifier as string.
+    :param lease_duration: Lease duration in seconds from now.
+    :return: True if lease extended, False if the job is not leased by worker.
+    """
+    cursor = connection.execute(
+        "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? "
+        "AND status = 'leased'",
+        (time.time() + lease_duration, job_id, worker),
+    )
+    return cursor.rowcount == 1
+
+
+def complete_job(
+    connection: sqlite3.Connection,
+    job_id: str,
+    worker: str,
+    result: dict,
+    commit_result: Callable[[], None] = None,
+) -> bool:
+    """
+    Mark a job leased by worker as done with its result. The result commit
+    function is called in the same transaction, so results of a job are committed
+    once even if the job was leased again by another worker after a lease expiry.
+
+    :param connection: Work queue SQLite connection.
+    :param job_id: Job identifier as string.
+    :param worker: Worker identifier as string.
+    :param result: Job result serializable as JSON.
+    :param commit_result: Function committing job results, called only if the
+        job is still leased by worker.
+    :return: True if job completed by worker, False if already completed or
+        leased by another worker.
+    """
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        completed = (
+            connection.execute(
+                "UPDATE jobs SET status = 'done', result = ? WHERE id = ? AND "
+                "worker = ? AND status = 'leased'",
+                (json.dumps(result, default=str), job_id, worker),
+            ).rowcount
+            == 1
+        )
+        if completed and commit_result is not None:
+            commit_result()
+        connection.execute("COMMIT")
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    return completed
+
+
+def fail_job(
+    connection: sqlite3.Connection, job_id: str, worker: str, error: str
+) -> None:
+    """
+    Release a job leased by worker after an error, to be leased again until the
+    maximum number of attempts is reached.
+
+    :param connection: Work queue SQLite connection.
+    :param job_id: Job identifier as string.
+    :param worker: Worker identifier as string.
+    :param error: Error message as string.
+    :return: None
+    """
+    connection.execute(
+        "UPDATE jobs SET status = CASE WHEN attempts < ? THEN 'pending' ELSE "
+        "'failed' END, result = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+        (MAX_ATTEMPTS, json.dumps({"error": error}), job_id, worker),
+    )
+
+
+def queue_status(connection: sqlite3.Connection) -> dict:
+    """
+    Count work queue jobs by status.
+
+    :param connection: Work queue SQLite connection.
+    :return: Number of jobs by status as dict.
+    """
+    counts = dict(
+        connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+    )
+    return {status: counts.get(status, 0) for status in JOB_STATUSES}
+
+
+class JobHeartbeat:
+    """
+    Extend a job lease periodically from a background thread while the job is
+    processed, with its own connection to the work queue. If the lease is lost or
+    can't be extended, the heartbeat stops and records the error so the job can
+    be abandoned, and is checked by the job before writing files.
+    """
+
+    error: Optional[str]
+
+    def __init__(
+        self,
+        data_folder_path: str,
+        job: dict,
+        lease_duration: float = LEASE_DURATION,
+    ) -> None:
+        """
+        Initialize the JobHeartbeat object.
+
+        :param data_folder_path: Data folder path as string.
+        :param job: Leased job as dict.
+        :param lease_duration: Lease duration in seconds.
+        """
+        self.data_folder_path = data_folder_path
+        self.job = job
+        self.lease_duration = lease_duration
+        self.error = None
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self) -> None:
+        """
+        Extend the job lease every third of lease duration until stopped, the
+        lease lost or an error.
+
+        :return: None
+        """
+        connection = None
+        try:
+            connection = connect_queue(self.data_folder_path)
+            while not self.stopped.wait(self.lease_duration / 3):
+                if not heartbeat_job(
+                    connection, self.job["id"], self.job["worker"], self.lease_duration
+                ):
+                    self.error = "Job lease lost."
+                    return
+        except Exception as e:
+            self.error = f"Job heartbeat failed -> {e}"
+        finally:
+            if connection is not None:
+                connection.close()
+
+    def check(self) -> None:
+        """
+        Stop the job if its lease was lost or can't be extended, as another worker
+        may be processing the job since the lease expired.
+
+        :return: None
+        """
+        if self.error:
+            raise RuntimeError(self.error)
+
+    def __enter__(self) -> "JobHeartbeat":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stopped.set()
+        self.thread.join()
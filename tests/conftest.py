@@ -10,7 +10,7 @@ import pytest
 import vcr
 from krakenapi import KrakenApi
 
-from krakenohlc import Config, handle_pair_trades
+from krakenohlc import AdaptiveRateLimiter, Config, handle_pair_trades
 
 
 @pytest.fixture
@@ -95,6 +95,28 @@ def mock_test_data_path() -> str:
     return "tests/fixtures/data"
 
 
+@pytest.fixture
+def mock_rate_limiter() -> Callable[[], AdaptiveRateLimiter]:
+    """
+    Mock rate limiters of downloads from a local replay server.
+
+    Returns:
+        Callable[[], AdaptiveRateLimiter]: Create a rate limiter with short
+            delays.
+    """
+
+    def _mock_rate_limiter() -> AdaptiveRateLimiter:
+        """
+        Create a rate limiter with short delays for a local replay server.
+
+        Returns:
+            AdaptiveRateLimiter: Rate limiter.
+        """
+        return AdaptiveRateLimiter(0.001, 0.001, 0.01, 0.0, 50)
+
+    return _mock_rate_limiter
+
+
 @pytest.fixture
 @vcr.use_cassette("tests/fixtures/vcr_cassettes/krakenohlc_setup.yaml")
 def mock_df_trade(mock_pair, mock_config, mock_test_data_path) -> pd.DataFrame:
@@ -0,0 +1,149 @@
+import datetime
+import logging
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from krakenohlc import (KrakenApiEndpoint, ReplayData, ReplayServer,
+                        handle_pair, handle_pair_frequency_ohlc,
+                        partial_ohlc_keys, prune_ohlc_cache, read_csv,
+                        synthetic_trades, trades_chunks, trades_to_ohlc,
+                        trades_to_ohlc_cached)
+
+STATISTICS = ["vwap", "trade_count", "sell_volume", "market_volume"]
+TRADES_FILEPATH = (
+    "tests/fixtures/tests_data/GRTETH_2021-03-28T00-00-00_2021-05-04T15-00-00.csv"
+)
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_trades_chunks(mock_df_trade):
+    chunks = trades_chunks(mock_df_trade)
+    assert [len(df_chunk) for df_chunk in chunks] == [749, 3863, 438]
+    assert chunks[1].index[0] >= pd.Timestamp("2021-04-01")
+    assert chunks[1].index[-1] < pd.Timestamp("2021-05-01")
+    assert trades_chunks(mock_df_trade.iloc[:0]) == []
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_trades_to_ohlc_cached(tmpdir, mock_df_trade):
+    chunks = trades_chunks(mock_df_trade)
+    for frequency in ["1min", "4h", "1D", "3D", "1W-MON"]:
+        for fill_policy in ["nan", "ffill", "drop"]:
+            keys = partial_ohlc_keys(chunks, frequency, True, STATISTICS)
+            df_ohlc = trades_to_ohlc_cached(
+                chunks, keys, str(tmpdir), frequency, True, fill_policy, STATISTICS
+            )
+            df_ohlc_test = trades_to_ohlc(
+                mock_df_trade, frequency, True, fill_policy, STATISTICS
+            )
+            pd.testing.assert_frame_equal(df_ohlc, df_ohlc_test, check_freq=False)
+
+    # Only partial bars of a changed chunk are computed again
+    keys = partial_ohlc_keys(chunks, "1D", False)
+    trades_to_ohlc_cached(chunks, keys, str(tmpdir), "1D", False)
+    df_repaired = mock_df_trade.drop(mock_df_trade.index[1000])
+    repaired_keys = partial_ohlc_keys(trades_chunks(df_repaired), "1D", False)
+    assert [i == j for i, j in zip(keys, repaired_keys)] == [True, False, True]
+    partial_ohlc_files = [
+        filename
+        for _, _, filenames in os.walk(tmpdir.join("partial_ohlc"))
+        for filename in filenames
+    ]
+    assert f"{repaired_keys[1]}.npz" not in partial_ohlc_files
+    assert f"{repaired_keys[0]}.npz" in partial_ohlc_files
+
+
+def test_ohlc_cache_downloaded_trades(tmpdir, mock_config, mock_rate_limiter, caplog):
+    trades = synthetic_trades(1616889600, 1620140400, trades_per_hour=30, seed=5)
+    mock_config.start_datetime = datetime.datetime(2021, 3, 28)
+    mock_config.end_datetime = datetime.datetime(2021, 5, 4, 15)
+    mock_config.ohlc_frequencies = ["1D"]
+    mock_config.ohlc_cache = True
+    mock_config.native_ohlc = False
+    mock_config.rate_limiter = mock_rate_limiter()
+    data_folder_path = str(tmpdir)
+    tmpdir.mkdir("trade_history")
+    tmpdir.mkdir("ohlc")
+    with ReplayServer(ReplayData(trades={"XYZEUR": trades})) as server:
+        mock_config.ka = KrakenApiEndpoint(server.url)
+        handle_pair("XYZEUR", mock_config, data_folder_path)
+    df_trades = read_csv(
+        f"{data_folder_path}/trade_history/"
+        "XYZEUR_2021-03-28T00-00-00_2021-05-04T15-00-00.csv",
+        "trades",
+    )
+    assert df_trades["miscellaneous"].isna().all()
+    caplog.clear()
+
+    # Trades read from CSV have the cache keys of the same downloaded trades
+    with caplog.at_level(logging.INFO):
+        handle_pair("XYZEUR", mock_config, data_folder_path, False)
+    assert "1D: Already existing" in caplog.text
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_handle_pair_frequency_ohlc_cache(
+    caplog, mock_pair, mock_config, mock_df_trade, mock_test_data_path
+):
+    caplog.set_level(logging.INFO)
+    mock_config.ohlc_cache = True
+    handle_pair_frequency_ohlc(
+        mock_pair, mock_config, mock_df_trade, "1D", mock_test_data_path
+    )
+    ohlc_filepath = "ohlc/GRTETH_2021-03-28T00-00-00_2021-05-04T15-00-00_1D.csv"
+    assert f"GRTETH 1D: Saved to {ohlc_filepath}." in caplog.text
+
+    # OHLC is not created again if trades didn't change
+    caplog.clear()
+    handle_pair_frequency_ohlc(
+        mock_pair, mock_config, mock_df_trade, "1D", mock_test_data_path
+    )
+    assert f"GRTETH 1D: Already existing at {ohlc_filepath}." in caplog.text
+
+    # OHLC is created again if trades changed
+    caplog.clear()
+    handle_pair_frequency_ohlc(
+        mock_pair, mock_config, mock_df_trade.iloc[1:], "1D", mock_test_data_path
+    )
+    assert f"GRTETH 1D: Saved to {ohlc_filepath}." in caplog.text
+
+
+def partial_ohlc_files(cache_folder) -> list[str]:
+    return sorted(
+        filename
+        for _, _, filenames in os.walk(cache_folder.join("partial_ohlc"))
+        for filename in filenames
+    )
+
+
+def test_prune_ohlc_cache(tmpdir, mock_pair, mock_config):
+    mock_config.ohlc_frequencies = ["1h", "1D"]
+    mock_config.ohlc_cache = True
+    mock_config.native_ohlc = False
+    data_folder_path = str(tmpdir)
+    tmpdir.mkdir("ohlc")
+    shutil.copy(TRADES_FILEPATH, tmpdir.mkdir("trade_history"))
+    result = handle_pair(mock_pair, mock_config, data_folder_path, False)
+    cache_folder = tmpdir.join("cache")
+    # Partial bars of 3 months of trades by frequency
+    assert len(partial_ohlc_files(cache_folder)) == 6
+    # Files of interrupted writes and previous versions
+    stale_folder = cache_folder.join("partial_ohlc").mkdir("00")
+    stale_folder.join("00.npz.tmp").write("")
+    stale_folder.join("00.pkl").write("")
+    assert prune_ohlc_cache(data_folder_path) == 2
+    assert len(partial_ohlc_files(cache_folder)) == 6
+
+    # Partial bars of removed OHLC files are removed
+    os.remove(f"{data_folder_path}/{result['ohlc_filepaths']['1h']}")
+    assert prune_ohlc_cache(data_folder_path) == 3
+    assert len(partial_ohlc_files(cache_folder)) == 3
+    assert not os.path.exists(
+        f"{cache_folder}/outputs/{result['ohlc_filepaths']['1h']}.key"
+    )
+    assert os.path.exists(
+        f"{cache_folder}/outputs/{result['ohlc_filepaths']['1D']}.key"
+    )
@@ -0,0 +1,184 @@
+import datetime
+import json
+import subprocess
+import sys
+import threading
+import urllib.request
+from functools import partial
+from http.server import ThreadingHTTPServer
+from unittest.mock import patch
+
+from krakenohlc import append_run_history, update_pair_metadata, write_metadata
+from krakenohlc.cli import DataRequestHandler, main, parse_arguments
+
+
+def write_test_metadata(data_folder_path: str) -> None:
+    metadata = {
+        "last_run": {
+            "config_file": "config.yaml",
+            "started_at": "2021-05-05 00:00:00",
+            "finished_at": "2021-05-05 00:10:00",
+            "pairs": 1,
+        },
+        "pairs": {},
+    }
+    update_pair_metadata(
+        metadata,
+        "GRTETH",
+        datetime.datetime(2021, 3, 28),
+        datetime.datetime(2021, 5, 4, 15),
+        "trade_history/GRTETH.csv",
+        42,
+        {"1h": "ohlc/GRTETH_1H.csv", "1W-MON": None},
+    )
+    write_metadata(data_folder_path, metadata)
+
+
+def test_parse_arguments():
+    # Download is the default command
+    args = parse_arguments([])
+    assert args.command == "download"
+    assert args.config == "config.yaml"
+    assert args.data == "data"
+    args = parse_arguments(["--data", "other"])
+    assert args.command == "download"
+    assert args.data == "other"
+
+    args = parse_arguments(["aggregate", "--config", "other.yaml"])
+    assert args.command == "aggregate"
+    assert args.config == "other.yaml"
+    args = parse_arguments(["serve", "--port", "0"])
+    assert args.port == 0
+    args = parse_arguments(["enqueue", "--range-days", "30"])
+    assert args.range_days == 30
+    args = parse_arguments(["worker", "--worker-id", "w1"])
+    assert args.worker_id == "w1"
+    assert args.lease_duration == 300
+    args = parse_arguments(["replay", "--pairs", "XYZEUR", "--error-rate", "0.1"])
+    assert args.pairs == ["XYZEUR"]
+    assert args.error_rate == 0.1
+    assert args.page_size == 1000
+    args = parse_arguments(["compact", "--compression", "none"])
+    assert args.compression == "none"
+    assert args.max_partition_days == 366
+    assert args.trades_retention_days is None
+    args = parse_arguments(["report", "--runs", "5"])
+    assert args.runs == 5
+    assert args.tolerance == 0.25
+
+
+def test_download_aggregate_commands():
+    with patch("krakenohlc.krakenohlc.kraken_ohlc") as mock_kraken_ohlc:
+        assert main(["download", "--data", "folder", "--config", "c.yaml"]) == 0
+        mock_kraken_ohlc.assert_called_once_with("folder", "c.yaml", profile=False)
+        assert main(["aggregate", "--profile"]) == 0
+        mock_kraken_ohlc.assert_called_with(
+            "data", "config.yaml", download=False, profile=True
+        )
+
+
+def test_queue_command(tmpdir, capsys):
+    assert main(["queue", "--data", str(tmpdir)]) == 0
+    assert "0 pending, 0 leased, 0 done, 0 failed" in capsys.readouterr().out
+
+
+def test_status_command(tmpdir, capsys):
+    assert main(["status", "--data", str(tmpdir)]) == 0
+    assert f"No run recorded in {tmpdir}." in capsys.readouterr().out
+
+    write_test_metadata(str(tmpdir))
+    assert main(["status", "--data", str(tmpdir)]) == 0
+    output = capsys.readouterr().out
+    assert "finished at 2021-05-05 00:10:00, 1 pairs (config.yaml)." in output
+    assert (
+        "GRTETH: 42 trades from 2021-03-28 00:00:00 to 2021-05-04 15:00:00, "
+        "OHLC: 1h." in output
+    )
+    assert main(["status", "--data", str(tmpdir), "--json"]) == 0
+    assert (
+        json.loads(capsys.readouterr().out)["pairs"]["GRTETH"][0]["trade_count"] == 42
+    )
+
+
+def test_status_command_lazy_imports(tmpdir):
+    # Status command does not import pandas or the Kraken API
+    code = (
+        "import sys; from krakenohlc.cli import main; "
+        f"main(['status', '--data', {str(tmpdir)!r}]); "
+        "print('pandas' in sys.modules, 'krakenapi' in sys.modules)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    assert output.splitlines()[-1] == "False False"
+
+
+def test_verify_command(tmpdir, capsys):
+    write_test_metadata(str(tmpdir))
+    assert main(["verify", "--data", str(tmpdir)]) == 1
+    output = capsys.readouterr().out
+    assert "Missing file: trade_history/GRTETH.csv" in output
+    assert "1 pairs verified, 2 missing files." in output
+
+    tmpdir.mkdir("trade_history").join("GRTETH.csv").write("")
+    tmpdir.mkdir("ohlc").join("GRTETH_1H.csv").write("")
+    assert main(["verify", "--data", str(tmpdir)]) == 0
+
+    # Trade history with duplicated trades of overlapping pages
+    trades = "2021-03-28 00:00:00,1.0,1.0\n2021-03-28 00:00:01,1.0,1.0\n"
+    tmpdir.join("trade_history", "GRTETH.csv").write(
+        "time,price,volume\n" + trades + trades
+    )
+    assert main(["verify", "--data", str(tmpdir), "--trades"]) == 1
+    output = capsys.readouterr().out
+    assert "GRTETH: 2 duplicated trades and 1 time regressions" in output
+    assert "1 pairs with trade history issues." in output
+
+
+def test_report_command(tmpdir, capsys):
+    assert main(["report", "--data", str(tmpdir)]) == 0
+    assert f"No run recorded in {tmpdir}." in capsys.readouterr().out
+
+    run = {
+        "started_at": "2021-05-05 00:00:00",
+        "config_file": "config.yaml",
+        "download": True,
+        "pairs": 1,
+        "trade_count": 42,
+        "bar_count": 24,
+        "wall_seconds": 10.0,
+        "outliers": [],
+    }
+    append_run_history(str(tmpdir), run)
+    assert main(["report", "--data", str(tmpdir)]) == 0
+    assert "No previous run" in capsys.readouterr().out
+
+    append_run_history(
+        str(tmpdir),
+        {
+            **run,
+            "wall_seconds": 20.0,
+            "outliers": [{"pair": "GRTETH", "seconds": 15.0, "trade_count": 42}],
+        },
+    )
+    assert main(["report", "--data", str(tmpdir)]) == 1
+    output = capsys.readouterr().out
+    assert "42 trades, 24 bars (config.yaml, download)." in output
+    assert "wall_seconds: 20.0 (median 10.0, +100%) REGRESSION" in output
+    assert "Slow pair GRTETH: 15.0s for 42 trades." in output
+    assert main(["report", "--data", str(tmpdir), "--tolerance", "2"]) == 0
+
+
+def test_data_request_handler(tmpdir):
+    write_test_metadata(str(tmpdir))
+    tmpdir.mkdir("ohlc").join("GRTETH_1H.csv").write("time,open\n")
+    handler = partial(DataRequestHandler, directory=str(tmpdir))
+    with ThreadingHTTPServer(("127.0.0.1", 0), handler) as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{url}/status") as response:
+            assert json.load(response)["pairs"]["GRTETH"][0]["trade_count"] == 42
+        with urllib.request.urlopen(f"{url}/ohlc/GRTETH_1H.csv") as response:
+            assert response.read() == b"time,open\n"
+        server.shutdown()
@@ -0,0 +1,235 @@
+import datetime
+import os
+from unittest.mock import patch
+
+import pandas as pd
+import vcr
+
+from krakenohlc import (compact_data_folder, compaction_partitions, data_files,
+                        define_filepath, kraken_ohlc, read_csv, read_metadata,
+                        trades_to_ohlc, update_pair_metadata, write_csv,
+                        write_metadata)
+
+RANGES = [
+    (datetime.datetime(2021, 3, 28), datetime.datetime(2021, 4, 10)),
+    (datetime.datetime(2021, 4, 10), datetime.datetime(2021, 4, 20)),
+    (datetime.datetime(2021, 4, 20), datetime.datetime(2021, 5, 4, 15)),
+]
+
+
+def write_ranges_files(data_folder_path: str) -> pd.DataFrame:
+    df_trades = read_csv(
+        "tests/fixtures/tests_data/GRTETH_2021-03-28T00-00-00_2021-05-04T15-00-00.csv",
+        "trades",
+    )
+    os.makedirs(f"{data_folder_path}/trade_history")
+    os.makedirs(f"{data_folder_path}/ohlc")
+    metadata = read_metadata(data_folder_path)
+    for start_datetime, end_datetime in RANGES:
+        df_range = df_trades[
+            (df_trades.index >= start_datetime) & (df_trades.index < end_datetime)
+        ]
+        trades_filepath = define_filepath(
+            "trade_history", "GRTETH", start_datetime, end_datetime
+        )
+        write_csv(df_range, f"{data_folder_path}/{trades_filepath}")
+        ohlc_filepaths = dict()
+        for frequency in ["1min", "1h"]:
+            ohlc_filepaths[frequency] = define_filepath(
+                "ohlc", "GRTETH", start_datetime, end_datetime, frequency
+            )
+            write_csv(
+                trades_to_ohlc(df_range, frequency, False),
+                f"{data_folder_path}/{ohlc_filepaths[frequency]}",
+            )
+        update_pair_metadata(
+            metadata,
+            "GRTETH",
+            start_datetime,
+            end_datetime,
+            trades_filepath,
+            len(df_range),
+            ohlc_filepaths,
+        )
+    write_metadata(data_folder_path, metadata)
+    return df_trades
+
+
+def test_compaction_partitions(tmpdir):
+    data_folder_path = str(tmpdir)
+    write_ranges_files(data_folder_path)
+    partitions, obsolete_files = compaction_partitions(data_files(data_folder_path))
+    assert [len(partition) for partition in partitions] == [3, 3, 3]
+    assert obsolete_files == []
+    # Partitions are limited to the maximum number of days
+    partitions, _ = compaction_partitions(data_files(data_folder_path), 25)
+    assert [len(partition) for partition in partitions] == [2, 2, 2]
+
+    # OHLC files are only merged at dates aligned with their bars, ranges start
+    # on a Saturday and a Tuesday
+    for start_datetime, end_datetime in RANGES:
+        for frequency in ["1D", "3D", "1W-MON"]:
+            filepath = define_filepath(
+                "ohlc", "GRTETH", start_datetime, end_datetime, frequency, True
+            )
+            tmpdir.join(filepath).write("")
+    partitions, _ = compaction_partitions(data_files(data_folder_path))
+    assert [partition[0]["suffix"] for partition in partitions] == [
+        "_1D_quote",
+        "_1H",
+        "_1M",
+        "",
+    ]
+
+
+def test_compact_data_folder(tmpdir):
+    data_folder_path = str(tmpdir)
+    df_trades = write_ranges_files(data_folder_path)
+    result = compact_data_folder(data_folder_path)
+    assert result["partitions"] == 3
+    assert result["removed_files"] == 9
+    trades_filepath = (
+        "trade_history/GRTETH_2021-03-28T00-00-00_2021-05-04T15-00-00.csv.gz"
+    )
+    assert os.listdir(f"{data_folder_path}/trade_history") == [
+        trades_filepath.split("/")[1]
+    ]
+    assert len(os.listdir(f"{data_folder_path}/ohlc")) == 2
+    pd.testing.assert_frame_equal(
+        read_csv(f"{data_folder_path}/{trades_filepath}", "trades"), df_trades
+    )
+    pair_metadata = read_metadata(data_folder_path)["pairs"]["GRTETH"][0]
+    assert pair_metadata["trades_filepath"] == trades_filepath
+    assert pair_metadata["ohlc_filepaths"]["1h"] == (
+        "ohlc/GRTETH_2021-03-28T00-00-00_2021-05-04T15-00-00_1H.csv.gz"
+    )
+    # Nothing left to compact
+    assert compact_data_folder(data_folder_path)["removed_files"] == 0
+
+
+def test_compact_data_folder_anchored_bars(tmpdir):
+    data_folder_path = str(tmpdir)
+    df_trades = write_ranges_files(data_folder_path)
+    # Bars of another day start are not aligned with ranges dates
+    anchoring = {"time_zone": "UTC", "day_start": "00:30", "week_start": "MON"}
+    for start_datetime, end_datetime in RANGES:
+        df_range = df_trades[
+            (df_trades.index >= start_datetime) & (df_trades.index < end_datetime)
+        ]
+        write_csv(
+            trades_to_ohlc(df_range, "1h", False, anchoring=anchoring),
+            f"{data_folder_path}/"
+            + define_filepath("ohlc", "GRTETH", start_datetime, end_datetime, "1h"),
+        )
+    result = compact_data_folder(data_folder_path)
+    assert result["partitions"] == 2
+    assert result["removed_files"] == 6
+    assert len(os.listdir(f"{data_folder_path}/ohlc")) == 4
+
+
+def test_compact_data_folder_interrupted(tmpdir):
+    data_folder_path = str(tmpdir)
+    write_ranges_files(data_folder_path)
+    # Partition written before an interruption, merged files not removed
+    partition = compaction_partitions(data_files(data_folder_path))[0][-1]
+    trades_filepath = "trade_history/GRTETH_2021-03-28T00-00-00_2021-05-04T15-00-00.csv"
+    write_csv(
+        pd.concat(
+            read_csv(f"{data_folder_path}/{i['filepath']}", "trades") for i in partition
+        ),
+        f"{data_folder_path}/{trades_filepath}",
+    )
+    partitions, obsolete_files = compaction_partitions(data_files(data_folder_path))
+    assert len(partitions) == 2
+    assert [i["filepath"] for i in obsolete_files] == [i["filepath"] for i in partition]
+    compact_data_folder(data_folder_path)
+    assert os.listdir(f"{data_folder_path}/trade_history") == [
+        trades_filepath.split("/")[1]
+    ]
+    pair_metadata = read_metadata(data_folder_path)["pairs"]["GRTETH"][0]
+    assert pair_metadata["trades_filepath"] == trades_filepath
+
+
+def test_compact_data_folder_trades_retention(tmpdir):
+    data_folder_path = str(tmpdir)
+    write_ranges_files(data_folder_path)
+    # 1 minute OHLC of the first range does not match its trades
+    ohlc_filepath = define_filepath("ohlc", "GRTETH", *RANGES[0], "1min")
+    df_ohlc = read_csv(f"{data_folder_path}/{ohlc_filepath}", "ohlc")
+    df_ohlc["volume"] *= 2
+    write_csv(df_ohlc, f"{data_folder_path}/{ohlc_filepath}")
+
+    result = compact_data_folder(data_folder_path, trades_retention_days=0)
+    assert result["removed_files"] == 2 + 6
+    assert os.listdir(f"{data_folder_path}/trade_history") == [
+        define_filepath("trade_history", "GRTETH", *RANGES[0]).split("/")[1]
+    ]
+    pair_ranges = read_metadata(data_folder_path)["pairs"]["GRTETH"]
+    assert [i["trades_filepath"] for i in pair_ranges] == [
+        define_filepath("trade_history", "GRTETH", *RANGES[0]),
+        None,
+        None,
+    ]
+
+
+@vcr.use_cassette("tests/fixtures/vcr_cassettes/test_config_init_properties.yaml")
+def test_kraken_ohlc_compacted(tmpdir):
+    df_trades = read_csv(
+        "tests/fixtures/tests_data/GRTETH_2021-03-28T00-00-00_2021-05-04T15-00-00.csv",
+        "trades",
+    )
+    with open("tests/fixtures/config.yaml", "r") as stream:
+        config = stream.read()
+    config = config.replace(
+        "download_all_associated_pairs:\n  enabled: True",
+        "download_all_associated_pairs:\n  enabled: False",
+    ).replace("  - GRTETH\n  - KEEPXBT\n", "  - GRTETH\n")
+    config_files = list()
+    for start_datetime, end_datetime in RANGES[:2]:
+        config_file = f"{tmpdir}/config_{start_datetime:%Y-%m-%d}.yaml"
+        with open(config_file, "w") as stream:
+            stream.write(
+                config.replace(
+                    'download_start_date: "2021-03-28 00:00:00"',
+                    f'download_start_date: "{start_datetime}"',
+                ).replace(
+                    'download_end_date: "2021-05-04 15:00:00"',
+                    f'download_end_date: "{end_datetime}"',
+                )
+            )
+        config_files.append(config_file)
+
+    def download_trades(ka, pair, start_datetime, end_datetime, *args):
+        return df_trades[
+            (df_trades.index >= start_datetime) & (df_trades.index < end_datetime)
+        ]
+
+    data_folder_path = str(tmpdir.mkdir("data"))
+    with patch("krakenohlc.krakenohlc.download_trades", side_effect=download_trades):
+        for config_file in config_files:
+            kraken_ohlc(data_folder_path, config_file)
+    assert compact_data_folder(data_folder_path)["partitions"] == 5
+    filenames = {
+        folder: sorted(os.listdir(f"{data_folder_path}/{folder}"))
+        for folder in ["trade_history", "ohlc"]
+    }
+    metadata = read_metadata(data_folder_path)
+
+    # Outputs merged in partitions are neither downloaded nor generated again
+    with patch("krakenohlc.krakenohlc.download_trades") as mock_download_trades:
+        for config_file in config_files:
+            kraken_ohlc(data_folder_path, config_file)
+    mock_download_trades.assert_not_called()
+    assert {
+        folder: sorted(os.listdir(f"{data_folder_path}/{folder}"))
+        for folder in ["trade_history", "ohlc"]
+    } == filenames
+    pair_ranges = read_metadata(data_folder_path)["pairs"]["GRTETH"]
+    assert [
+        (i["trades_filepath"], i["ohlc_filepaths"], i["trade_count"])
+        for i in pair_ranges
+    ] == [
+        (i["trades_filepath"], i["ohlc_filepaths"], i["trade_count"])
+        for i in metadata["pairs"]["GRTETH"]
+    ]
+    assert compact_data_folder(data_folder_path)["removed_files"] == 0
@@ -34,15 +34,47 @@ def test_config_init_properties(mock_correct_config):
     assert config.download_all_associated_pairs.get("enabled") is True
     assert config.download_all_associated_pairs.get("quote_assets") == ["XXBT", "USDT"]
     assert config.download_all_associated_pairs.get("excluded_base_assets") == [
-        ".d",
         "ZCAD",
         "ZEUR",
         "ZGBP",
         "ZJPY",
         "ZUSD",
     ]
+    assert config.download_all_associated_pairs.get("excluded_pairs") == ["*.d"]
+    # Pairs quoted in XBT or USDT, not pairs with XBT or USDT base asset
+    assert len(config.pairs) == 80
+    assert "ADAXBT" in config.pairs and "XBTAUD" not in config.pairs
+    assert not [pair for pair in config.pairs if pair.endswith(".d")]
     assert isinstance(config.ka, KrakenApi)
     assert config.ohlc_frequencies == ["1min", "1h", "4h", "1D"]
+    assert config.ohlc_fill_policy == "nan"
+    assert config.ohlc_statistics == []
+    assert config.bar_anchoring == {
+        "time_zone": "UTC",
+        "day_start": "00:00",
+        "week_start": "MON",
+    }
+    assert config.ohlc_cache is False
+    assert config.native_ohlc is False
+    assert config.shared_trade_cache is None
+    assert config.asset_pairs_cache == {"path": None, "max_age_hours": 24}
+    assert config.download_all_associated_pairs.get("online_only") is False
+    assert config.scheduling == {
+        "priorities": {},
+        "deadline_minutes": 0,
+        "deferred_max_priority": 0,
+    }
+    assert config.output_windows == {"period": None, "dates": []}
+    assert config.ohlc_windows == []
+    assert config.dtype_backend == "numpy"
+    assert config.profiler.enabled is False
+    assert config.ka.api_url == "https://api.kraken.com"
+    assert config.trade_verification == {
+        "enabled": False,
+        "gap_factor": 50,
+        "min_gap_minutes": 60,
+        "repair": False,
+    }
 
     # Config with custom pairs
     config = mock_correct_config
@@ -107,6 +139,27 @@ def test_check_configuration(mock_correct_config, mock_config_error):
     e_info_value = mock_config_error(config_missing_ohlc_frequencies, ValueError)
     assert "Please provide ohlc frequencies." in e_info_value
 
+    # Test unsupported OHLC fill policy
+    config_bad_fill_policy = mock_correct_config.replace(
+        "ohlc_fill_policy: nan", "ohlc_fill_policy: zero"
+    )
+    e_info_value = mock_config_error(config_bad_fill_policy, ValueError)
+    assert "Unsupported ohlc_fill_policy zero" in e_info_value
+
+    # Test unsupported OHLC statistics
+    config_bad_statistics = mock_correct_config.replace(
+        "ohlc_statistics: []", "ohlc_statistics:\n  - vwap\n  - median"
+    )
+    e_info_value = mock_config_error(config_bad_statistics, ValueError)
+    assert "Unsupported ohlc_statistics ['median']" in e_info_value
+
+    # Test invalid trade verification gap factor
+    config_bad_gap_factor = mock_correct_config.replace(
+        "gap_factor: 50", "gap_factor: -1"
+    )
+    e_info_value = mock_config_error(config_bad_gap_factor, ValueError)
+    assert "trade_verification enabled and repair must be booleans" in e_info_value
+
     # Test missing volume in quote asset
     config_missing_save_trade_history = mock_correct_config.replace(
         "volume_in_quote_asset: False", ""
@@ -140,6 +193,95 @@ def test_check_configuration(mock_correct_config, mock_config_error):
     e_info_value: str = mock_config_error(config_missing_pairs, ValueError)
     assert "Please provide pairs to download option." in e_info_value
 
+    # Test api url without scheme
+    config_api_url = mock_correct_config.replace(
+        "api_url: https://api.kraken.com", "api_url: localhost:8001"
+    )
+    e_info_value = mock_config_error(config_api_url, ValueError)
+    assert "api_url must be an HTTP(S) URL." in e_info_value
+
+    # Test unsupported profiling stage
+    config_profiling = mock_correct_config.replace(
+        "stages: [download, read", "stages: [upload, read"
+    )
+    e_info_value = mock_config_error(config_profiling, ValueError)
+    assert "profiling enabled must be a boolean" in e_info_value
+
+    # Test unsupported dtype backend
+    config_dtype_backend = mock_correct_config.replace(
+        "dtype_backend: numpy", "dtype_backend: polars"
+    )
+    e_info_value = mock_config_error(config_dtype_backend, ValueError)
+    assert "Unsupported dtype_backend polars" in e_info_value
+
+    config_native_ohlc = mock_correct_config.replace(
+        "native_ohlc: False", "native_ohlc: yes please"
+    )
+    e_info_value = mock_config_error(config_native_ohlc, ValueError)
+    assert "Please provide native_ohlc value" in e_info_value
+
+    config_shared_trade_cache = mock_correct_config.replace(
+        "shared_trade_cache: null", "shared_trade_cache: 42"
+    )
+    e_info_value = mock_config_error(config_shared_trade_cache, ValueError)
+    assert "shared_trade_cache must be a folder path or null" in e_info_value
+
+    config_online_only = mock_correct_config.replace(
+        "online_only: False", "online_only: sometimes"
+    )
+    e_info_value = mock_config_error(config_online_only, ValueError)
+    assert "excluded_pairs must be lists and online_only a boolean" in e_info_value
+
+    config_asset_pairs_cache = mock_correct_config.replace(
+        "max_age_hours: 24", "max_age_hours: -1"
+    )
+    e_info_value = mock_config_error(config_asset_pairs_cache, ValueError)
+    assert "asset_pairs_cache path must be a file path or null" in e_info_value
+
+    config_scheduling = mock_correct_config.replace(
+        "priorities: {}", 'priorities: {"XBT*": high}'
+    )
+    e_info_value = mock_config_error(config_scheduling, ValueError)
+    assert "scheduling priorities must be integers by pair pattern" in e_info_value
+
+    config_time_zone = mock_correct_config.replace(
+        "time_zone: UTC", "time_zone: Mars/Olympus_Mons"
+    )
+    e_info_value = mock_config_error(config_time_zone, ValueError)
+    assert "bar_anchoring time_zone must be a time zone name" in e_info_value
+
+    config_day_start = mock_correct_config.replace(
+        'day_start: "00:00"', "day_start: 17:00"
+    )
+    e_info_value = mock_config_error(config_day_start, ValueError)
+    assert "bar_anchoring time_zone must be a time zone name" in e_info_value
+
+    config_window_period = mock_correct_config.replace(
+        "period: null", "period: fortnight"
+    )
+    e_info_value = mock_config_error(config_window_period, ValueError)
+    assert "output_windows period must be one of" in e_info_value
+
+    config_window_dates = mock_correct_config.replace(
+        "dates: []", 'dates: [["2000-01-01 00:00:00", "2000-02-01 00:00:00"]]'
+    )
+    e_info_value = mock_config_error(config_window_dates, ValueError)
+    assert "not between download dates" in e_info_value
+
+    config_window_memory_budget = mock_correct_config.replace(
+        "period: null", "period: month"
+    ).replace("memory_budget_mb: 0", "memory_budget_mb: 512")
+    e_info_value = mock_config_error(config_window_memory_budget, ValueError)
+    assert "output_windows can't be generated with a memory_budget_mb" in e_info_value
+
+    config_repair_memory_budget = mock_correct_config.replace(
+        "repair: False", "repair: True"
+    ).replace("memory_budget_mb: 0", "memory_budget_mb: 512")
+    e_info_value = mock_config_error(config_repair_memory_budget, ValueError)
+    assert "trade_verification repair can't be used with a memory_budget_mb" in (
+        e_info_value
+    )
+
 
 def test_get_configuration_pairs(mock_correct_config, mock_config_error):
     # Test no tradable pairs available for quote asset
@@ -159,3 +301,18 @@ def test_get_configuration_pairs(mock_correct_config, mock_config_error):
         )
         e_info_value: str = mock_config_error(config_pair_not_available, ValueError)
         assert "FAKE pair not available on Kraken." in e_info_value
+
+    # Legacy pair suffix in excluded base assets excludes dark pool pairs
+    with vcr.use_cassette(
+        "tests/fixtures/vcr_cassettes/test_config_init_properties.yaml"
+    ):
+        config_legacy_suffix = mock_correct_config.replace(
+            "excluded_base_assets:\n    - ZCAD",
+            "excluded_base_assets:\n    - .d\n    - ZCAD",
+        ).replace('excluded_pairs:\n    - "*.d"', "excluded_pairs: []")
+        assert config_legacy_suffix != mock_correct_config
+        mock_file = mock.mock_open(read_data=config_legacy_suffix)
+        with mock.patch("builtins.open", mock_file):
+            config = Config("tests/fixtures/config.yaml")
+        assert len(config.pairs) == 80
+        assert not [pair for pair in config.pairs if pair.endswith(".d")]
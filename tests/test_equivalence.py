@@ -0,0 +1,294 @@
+"""
+Equivalence of OHLC aggregation engines with the reference trades_to_ohlc on
+randomized trades. Time spent by each engine is logged and recorded as test user
+properties.
+"""
+
+import importlib.util
+import logging
+import time
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from krakenohlc import (BarFinalizer, ChunkedOHLC, merge_partial_ohlc,
+                        partial_ohlc_keys, partial_ohlc_to_ohlc, trades_chunks,
+                        trades_to_ohlc, trades_to_ohlc_cached,
+                        trades_to_partial_ohlc)
+from krakenohlc.ohlc import fill_ohlc_gaps
+
+FREQUENCIES = ["1min", "15min", "1h", "4h", "1D", "3D", "1W-MON"]
+STATISTICS = [
+    "vwap",
+    "trade_count",
+    "buy_volume",
+    "sell_volume",
+    "market_volume",
+    "limit_volume",
+]
+FILL_POLICIES = ["nan", "ffill", "drop"]
+SEEDS = range(5)
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+def random_trades(seed: int) -> pd.DataFrame:
+    """
+    Generate time sorted trades in bursts separated by empty intervals, with
+    trades at the same date, trades on bar boundaries and single trade bars,
+    starting near a week and month boundary.
+    """
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2021-03-27 22:00:00")
+    span = pd.Timedelta(str(rng.choice(["6h", "3D", "12D"])))
+    times = list()
+    for _ in range(rng.integers(1, 30)):
+        burst_start = start + span * rng.random()
+        intervals = rng.exponential(rng.choice([0.5, 20, 600]), rng.integers(1, 200))
+        burst = burst_start + pd.to_timedelta(np.cumsum(intervals), unit="s")
+        if rng.random() < 0.5:
+            # Trades at the same date
+            burst = burst.floor("s")
+        if rng.random() < 0.3:
+            # Trades on bar boundaries
+            burst = burst.floor(str(rng.choice(["1min", "1h"])))
+        times.append(burst)
+    index = pd.DatetimeIndex(np.sort(np.concatenate(times), kind="stable"))
+    size = len(index)
+    return pd.DataFrame(
+        {
+            "price": np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.01, size))), 5),
+            "volume": np.round(rng.lognormal(0, 1.5, size), 8),
+            "buy/sell": rng.choice(["b", "s"], size),
+            "market/limit": rng.choice(["m", "l"], size),
+            "miscellaneous": "",
+        },
+        index=index.rename("time"),
+    )
+
+
+def random_splits(df_trades: pd.DataFrame, seed: int) -> list[pd.DataFrame]:
+    """
+    Split trades at random positions, possibly between trades at the same date.
+    """
+    rng = np.random.default_rng(seed)
+    positions = np.sort(rng.integers(0, len(df_trades), rng.integers(1, 10)))
+    positions = [0] + list(positions) + [len(df_trades)]
+    return [
+        df_trades.iloc[start:end]
+        for start, end in zip(positions[:-1], positions[1:])
+        if end > start
+    ]
+
+
+def merged_partials_engine(
+    df_trades: pd.DataFrame,
+    frequency: str,
+    fill_policy: str,
+    seed: int,
+    anchoring: dict = None,
+) -> pd.DataFrame:
+    df_partial = pd.DataFrame()
+    for df_split in random_splits(df_trades, seed):
+        df_partial = merge_partial_ohlc(
+            df_partial,
+            trades_to_partial_ohlc(
+                df_split,
+                frequency,
+                True,
+                STATISTICS,
+                trade_times=True,
+                anchoring=anchoring,
+            ),
+        )
+    df_ohlc = partial_ohlc_to_ohlc(df_partial, frequency, STATISTICS, anchoring)
+    return fill_ohlc_gaps(df_ohlc, fill_policy)
+
+
+def chunked_engine(
+    df_trades: pd.DataFrame,
+    frequency: str,
+    fill_policy: str,
+    seed: int,
+    anchoring: dict = None,
+) -> pd.DataFrame:
+    chunked_ohlc = ChunkedOHLC([frequency], True, STATISTICS, anchoring)
+    for df_chunk in random_splits(df_trades, seed):
+        chunked_ohlc.update(df_chunk)
+    return chunked_ohlc.ohlc(frequency, fill_policy)
+
+
+def cached_engine(
+    df_trades: pd.DataFrame,
+    frequency: str,
+    fill_policy: str,
+    cache_folder_path: str,
+    anchoring: dict = None,
+) -> pd.DataFrame:
+    chunks = trades_chunks(df_trades)
+    keys = partial_ohlc_keys(chunks, frequency, True, STATISTICS, anchoring)
+    return trades_to_ohlc_cached(
+        chunks,
+        keys,
+        cache_folder_path,
+        frequency,
+        True,
+        fill_policy,
+        STATISTICS,
+        anchoring,
+    )
+
+
+def finalizer_engine(
+    df_trades: pd.DataFrame, frequency: str, seed: int
+) -> pd.DataFrame:
+    # Pages received in random order correct bars finalized before them, trades
+    # at the same date are kept in one page to keep their order
+    pages = list()
+    for df_page in random_splits(df_trades, seed):
+        if pages and pages[-1].index[-1] == df_page.index[0]:
+            pages[-1] = pd.concat([pages[-1], df_page])
+        else:
+            pages.append(df_page)
+    pages = [pages[i] for i in np.random.default_rng(seed).permutation(len(pages))]
+    finalizer = BarFinalizer(frequency, True, STATISTICS)
+    emitted = list()
+    for df_page in pages:
+        emitted += finalizer.update(df_page)
+    emitted.append(
+        finalizer.advance_watermark(df_trades.index[-1] + pd.Timedelta("8D"))
+    )
+    df_ohlc = pd.concat(emitted)
+    return df_ohlc[~df_ohlc.index.duplicated(keep="last")].sort_index()
+
+
+def timed(timings: dict, engine: str, function: Callable, *args) -> pd.DataFrame:
+    start = time.perf_counter()
+    df_ohlc = function(*args)
+    timings[engine] = timings.get(engine, 0.0) + time.perf_counter() - start
+    return df_ohlc
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_engines_equivalence(seed, tmpdir, request):
+    df_trades = random_trades(seed)
+    timings = dict()
+    for i, frequency in enumerate(FREQUENCIES):
+        # Fill policies alternate between frequencies and seeds
+        fill_policy = FILL_POLICIES[(seed + i) % len(FILL_POLICIES)]
+        df_ohlc_test = timed(
+            timings,
+            "trades_to_ohlc",
+            trades_to_ohlc,
+            df_trades,
+            frequency,
+            True,
+            fill_policy,
+            STATISTICS,
+        )
+        engines_ohlc = {
+            "merged_partials": timed(
+                timings,
+                "merged_partials",
+                merged_partials_engine,
+                df_trades,
+                frequency,
+                fill_policy,
+                seed,
+            ),
+            "chunked": timed(
+                timings,
+                "chunked",
+                chunked_engine,
+                df_trades,
+                frequency,
+                fill_policy,
+                seed,
+            ),
+            # First computed then read from cache
+            "cached": timed(
+                timings,
+                "cached",
+                cached_engine,
+                df_trades,
+                frequency,
+                fill_policy,
+                str(tmpdir),
+            ),
+            "cached_warm": timed(
+                timings,
+                "cached_warm",
+                cached_engine,
+                df_trades,
+                frequency,
+                fill_policy,
+                str(tmpdir),
+            ),
+        }
+        if importlib.util.find_spec("pyarrow"):
+            engines_ohlc["pyarrow"] = timed(
+                timings,
+                "pyarrow",
+                trades_to_ohlc,
+                df_trades.convert_dtypes(dtype_backend="pyarrow"),
+                frequency,
+                True,
+                fill_policy,
+                STATISTICS,
+            )
+        for engine, df_ohlc in engines_ohlc.items():
+            try:
+                pd.testing.assert_frame_equal(df_ohlc, df_ohlc_test, check_freq=False)
+            except AssertionError as e:
+                raise AssertionError(
+                    f"{engine} {frequency} {fill_policy} seed {seed}: {e}"
+                ) from e
+        # Finalized and corrected bars are bars with trades only
+        df_ohlc = timed(
+            timings, "finalizer", finalizer_engine, df_trades, frequency, seed
+        )
+        pd.testing.assert_frame_equal(
+            df_ohlc,
+            trades_to_ohlc(df_trades, frequency, True, "drop", STATISTICS),
+            check_freq=False,
+        )
+    for engine, seconds in timings.items():
+        request.node.user_properties.append((f"{engine}_seconds", seconds))
+        logger.info(f"Seed {seed}: {engine} in {seconds:.4f}s")
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_anchored_engines_equivalence(seed, tmpdir):
+    # Trades span the Europe/Paris daylight saving time change of 2021-03-28
+    df_trades = random_trades(seed)
+    anchoring = {"time_zone": "Europe/Paris", "day_start": "08:30", "week_start": "SUN"}
+    for i, frequency in enumerate(FREQUENCIES):
+        fill_policy = FILL_POLICIES[(seed + i) % len(FILL_POLICIES)]
+        df_ohlc_test = trades_to_ohlc(
+            df_trades, frequency, True, fill_policy, STATISTICS, anchoring
+        )
+        engines_ohlc = {
+            "merged_partials": merged_partials_engine(
+                df_trades, frequency, fill_policy, seed, anchoring
+            ),
+            "chunked": chunked_engine(
+                df_trades, frequency, fill_policy, seed, anchoring
+            ),
+            "cached": cached_engine(
+                df_trades, frequency, fill_policy, str(tmpdir), anchoring
+            ),
+        }
+        for engine, df_ohlc in engines_ohlc.items():
+            try:
+                pd.testing.assert_frame_equal(df_ohlc, df_ohlc_test, check_freq=False)
+            except AssertionError as e:
+                raise AssertionError(
+                    f"{engine} {frequency} {fill_policy} seed {seed}: {e}"
+                ) from e
+        # Bars are anchored on local days and weeks, whatever trades are aggregated
+        df_ohlc_test = df_ohlc_test.tz_localize("UTC").tz_convert("Europe/Paris")
+        if frequency in ["1D", "1W-MON"]:
+            assert (df_ohlc_test.index.strftime("%H:%M") == "08:30").all()
+        if frequency == "1W-MON":
+            assert (df_ohlc_test.index.weekday == 6).all()
@@ -0,0 +1,88 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from krakenohlc import (BarFinalizer, finalized_bars, last_final_bar_date,
+                        partial_ohlc_to_ohlc, trades_to_ohlc)
+
+STATISTICS = ["vwap", "trade_count", "buy_volume", "limit_volume"]
+
+
+def test_finalized_bars():
+    bar_dates = pd.DatetimeIndex(
+        ["2021-05-03 00:00:00", "2021-05-04 00:00:00", "2021-05-05 00:00:00"]
+    )
+    watermark = pd.Timestamp("2021-05-05 00:00:00")
+    assert list(finalized_bars(bar_dates, "1D", watermark)) == [True, True, False]
+    assert list(finalized_bars(bar_dates, "1W-MON", watermark)) == [
+        False,
+        False,
+        False,
+    ]
+    assert list(finalized_bars(bar_dates, "1h", watermark)) == [True, True, False]
+
+    # Anchored daily bar of the daylight saving time change lasts 23 hours
+    anchoring = {"time_zone": "America/New_York"}
+    bar_dates = pd.DatetimeIndex(["2021-03-13 05:00:00", "2021-03-14 05:00:00"])
+    watermark = pd.Timestamp("2021-03-15 04:00:00")
+    assert list(finalized_bars(bar_dates, "1D", watermark, anchoring)) == [True, True]
+    assert list(finalized_bars(bar_dates, "1D", watermark)) == [True, False]
+    assert last_final_bar_date("1D", watermark, anchoring) == pd.Timestamp(
+        "2021-03-14 05:00:00"
+    )
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_bar_finalizer_incremental(mock_df_trade):
+    end_datetime = pd.Timestamp("2021-05-04 15:00:00")
+    finalizer = BarFinalizer("4h", False, STATISTICS, pd.Timedelta("30min"))
+    finalized = list()
+    for df_page in np.array_split(mock_df_trade, 10):
+        df_finalized, df_corrections = finalizer.update(df_page)
+        assert df_corrections.empty
+        # Finalized bars end before the watermark
+        assert (df_finalized.index + pd.Timedelta("4h") <= finalizer.watermark).all()
+        finalized.append(df_finalized)
+    assert finalizer.watermark == mock_df_trade.index[-1] - pd.Timedelta("30min")
+    finalized.append(finalizer.advance_watermark(end_datetime))
+    df_ohlc = pd.concat(finalized)
+
+    # Same bars as batch aggregation without empty and uncompleted last bars
+    df_ohlc_test = trades_to_ohlc(mock_df_trade, "4h", False, "drop", STATISTICS)
+    df_ohlc_test = df_ohlc_test[df_ohlc_test.index + pd.Timedelta("4h") <= end_datetime]
+    pd.testing.assert_frame_equal(df_ohlc, df_ohlc_test, check_freq=False)
+    assert not finalizer.df_open_bars.empty
+    assert finalizer.late_trade_count == 0
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_bar_finalizer_late_trades(caplog, mock_df_trade):
+    late_trades = (mock_df_trade.index < pd.Timestamp("2021-04-10")) & (
+        np.arange(len(mock_df_trade)) % 3 == 0
+    )
+    df_late_trades = mock_df_trade[late_trades]
+    df_on_time_trades = mock_df_trade[~late_trades]
+
+    finalizer = BarFinalizer("1D", True, STATISTICS)
+    df_finalized, df_corrections = finalizer.update(df_on_time_trades)
+    assert df_corrections.empty
+    with caplog.at_level(logging.WARNING):
+        df_finalized, df_corrections = finalizer.update(df_late_trades)
+    assert df_finalized.empty
+    # Late trades are reported and correct already final bars
+    assert finalizer.late_trade_count == len(df_late_trades)
+    assert f"1D: {len(df_late_trades)} late trades before the watermark" in caplog.text
+    late_days = df_late_trades.index.floor("1D").unique()
+    assert list(df_corrections.index) == list(late_days)
+    df_ohlc_test = trades_to_ohlc(mock_df_trade, "1D", True, "drop", STATISTICS)
+    pd.testing.assert_frame_equal(
+        df_corrections, df_ohlc_test.loc[late_days], check_freq=False
+    )
+    # Final bars hold corrections
+    pd.testing.assert_frame_equal(
+        partial_ohlc_to_ohlc(finalizer.partial_bars(), statistics=STATISTICS),
+        df_ohlc_test,
+        check_freq=False,
+    )
@@ -1,10 +1,15 @@
+import datetime
 import os
 import shutil
+from unittest.mock import patch
 
 import pandas as pd
 import pytest
 
-from krakenohlc import create_data_directory, define_filepath, read_csv
+from krakenohlc import (create_data_directory, define_filepath, read_csv,
+                        read_csv_chunks, write_csv)
+from krakenohlc.io import (TRADES_CSV_DTYPES, create_temporary_file,
+                           csv_read_options, set_time_index)
 
 
 def test_define_filepath():
@@ -33,6 +38,17 @@ def test_define_filepath():
     )
     assert filepath == correct_filepath
 
+    # Assert path generation for compressed files
+    filepath = define_filepath(
+        "ohlc",
+        "AAVEXBT",
+        "2020-03-28 00:00:00",
+        "2021-05-04 15:00:00",
+        "4H",
+        compression="gzip",
+    )
+    assert filepath == "ohlc/AAVEXBT_2020-03-28T00-00-00_2021-05-04T15-00-00_4H.csv.gz"
+
 
 def test_read_csv(tmpdir):
     # Empty DataFrame when file not fount
@@ -68,6 +84,103 @@ def test_read_csv(tmpdir):
     assert f"Can't read csv at {csv_path}" in str(e_info.value)
 
 
+def test_read_csv_schema(tmpdir):
+    trades_path = (
+        "tests/fixtures/tests_data/GRTETH_2021-03-28T00-00-00_2021-05-04T15-00-00.csv"
+    )
+    df_trades_test = pd.read_csv(trades_path, index_col="time", parse_dates=True)
+
+    # Read trades with explicit dtypes
+    df_trades = read_csv(trades_path, "trades")
+    assert isinstance(df_trades.index, pd.DatetimeIndex)
+    assert df_trades.index.name == "time"
+    assert df_trades["price"].dtype == "float64"
+    assert df_trades["buy/sell"].dtype == "object"
+    pd.testing.assert_frame_equal(
+        df_trades.drop(columns="miscellaneous"),
+        df_trades_test.drop(columns="miscellaneous"),
+    )
+
+    # Read only selected columns
+    df_trades = read_csv(trades_path, "trades", columns=["price"])
+    assert list(df_trades.columns) == ["price"]
+    pd.testing.assert_series_equal(df_trades["price"], df_trades_test["price"])
+
+    # Read time window located on the time column
+    start_datetime = datetime.datetime(2021, 4, 1)
+    end_datetime = datetime.datetime(2021, 4, 3, 12)
+    df_window_test = df_trades_test[
+        (df_trades_test.index >= start_datetime) & (df_trades_test.index < end_datetime)
+    ]
+    assert not df_window_test.empty
+    for chunksize in [1, 7, 100_000]:
+        df_window = read_csv(
+            trades_path,
+            "trades",
+            columns=["price", "volume"],
+            start_datetime=start_datetime,
+            end_datetime=end_datetime,
+            chunksize=chunksize,
+        )
+        pd.testing.assert_frame_equal(
+            df_window, df_window_test[["price", "volume"]], check_freq=False
+        )
+
+    # Only rows of the time window are parsed
+    with patch("krakenohlc.io.set_time_index", wraps=set_time_index) as mock_index:
+        read_csv(
+            trades_path,
+            "trades",
+            start_datetime=start_datetime,
+            end_datetime=end_datetime,
+            chunksize=100,
+        )
+    assert len(mock_index.call_args.args[0]) == len(df_window_test)
+    chunks = list(
+        read_csv_chunks(
+            trades_path,
+            "trades",
+            chunksize=100,
+            start_datetime=start_datetime,
+            end_datetime=end_datetime,
+        )
+    )
+    assert all(len(df_chunk) for df_chunk in chunks)
+    pd.testing.assert_frame_equal(
+        pd.concat(chunks).drop(columns="miscellaneous"),
+        df_window_test.drop(columns="miscellaneous"),
+        check_freq=False,
+    )
+    with patch("krakenohlc.io.set_time_index", wraps=set_time_index) as mock_index:
+        list(
+            read_csv_chunks(
+                trades_path,
+                chunksize=100,
+                start_datetime=start_datetime,
+                end_datetime=end_datetime,
+            )
+        )
+    parsed_rows = sum(len(call.args[0]) for call in mock_index.call_args_list)
+    assert parsed_rows == len(df_window_test)
+
+    # OHLC schema with timestamps without microseconds
+    ohlc_path = (
+        "tests/fixtures/tests_data/"
+        "GRTETH_2021-03-28T00-00-00_2021-05-04T15-00-00_1H.csv"
+    )
+    df_ohlc = read_csv(ohlc_path, "ohlc", engine="python")
+    pd.testing.assert_frame_equal(
+        df_ohlc, pd.read_csv(ohlc_path, index_col="time", parse_dates=True)
+    )
+
+    # Header only CSV
+    csv_path = tmpdir.join("header.csv")
+    csv_path.write("time,price,volume\n")
+    assert read_csv(csv_path, "trades").empty
+    assert read_csv(csv_path, "trades", end_datetime=end_datetime).empty
+    assert not list(read_csv_chunks(csv_path, "trades", end_datetime=end_datetime))
+
+
 def test_create_data_directory(request):
     os.chdir(request.fspath.dirname)
     # Check directory creation
@@ -79,3 +192,99 @@ def test_create_data_directory(request):
     create_data_directory("data")
     shutil.rmtree("data")
     os.chdir(request.config.invocation_dir)
+
+
+def test_write_csv(tmpdir):
+    df = pd.read_csv(
+        "tests/fixtures/tests_data/GRTETH_2021-03-28T00-00-00_2021-05-04T15-00-00.csv",
+        index_col="time",
+        parse_dates=True,
+    )
+    # Same content as pandas writer when written by chunks
+    csv_path = str(tmpdir.join("trades.csv"))
+    write_csv(df, csv_path, chunksize=100)
+    df.to_csv(str(tmpdir.join("trades_pandas.csv")))
+    with open(csv_path) as f, open(str(tmpdir.join("trades_pandas.csv"))) as f_test:
+        assert f.read() == f_test.read()
+    assert not tmpdir.listdir(lambda path: path.ext == ".tmp")
+
+    # Same content as pandas writer for daily bars and values to quote
+    for df_test in [
+        pd.read_csv(
+            "tests/fixtures/tests_data/"
+            "GRTETH_2021-03-28T00-00-00_2021-05-04T15-00-00_1D.csv",
+            index_col="time",
+            parse_dates=True,
+        ),
+        df.assign(miscellaneous="a,b"),
+    ]:
+        write_csv(df_test, csv_path, chunksize=10)
+        df_test.to_csv(str(tmpdir.join("pandas.csv")))
+        with open(csv_path) as f, open(str(tmpdir.join("pandas.csv"))) as f_test:
+            assert f.read() == f_test.read()
+
+    # Fixed decimals per column
+    write_csv(df, csv_path, float_decimals={"price": 7, "volume": 2})
+    with open(csv_path) as f:
+        lines = f.read().splitlines()
+    assert lines[0] == "time,price,volume,buy/sell,market/limit,miscellaneous"
+    assert lines[1] == "2021-03-28 00:02:26.905800,0.0008568,275.14,s,m,"
+    assert lines[4] == "2021-03-28 00:02:26.912100,0.0008568,0.00,s,m,"
+    df_read = read_csv(csv_path)
+    assert len(df_read) == len(df)
+    assert (df_read["volume"] - df["volume"]).abs().max() <= 0.005
+
+    # Empty values are written as empty strings
+    df_ohlc = pd.DataFrame(
+        data=[[1.0, 2.0], [None, 0.0]],
+        columns=["close", "volume"],
+        index=pd.Index(["2021-03-28 00:00:00", "2021-03-28 01:00:00"], name="time"),
+    )
+    write_csv(df_ohlc, csv_path, float_decimals={"close": 2, "volume": 1})
+    with open(csv_path) as f:
+        assert f.read().splitlines()[1:] == [
+            "2021-03-28 00:00:00,1.00,2.0",
+            "2021-03-28 01:00:00,,0.0",
+        ]
+
+    # Gzip compressed CSV is read back
+    gzip_path = str(tmpdir.join("trades.csv.gz"))
+    write_csv(df, gzip_path, compression="gzip")
+    pd.testing.assert_frame_equal(
+        read_csv(gzip_path),
+        read_csv(csv_path.replace("trades.csv", "trades_pandas.csv")),
+    )
+
+    # Unsupported compression
+    with pytest.raises(ValueError) as e_info:
+        write_csv(df, csv_path + ".bz2", compression="bz2")
+    assert "Unsupported CSV compression bz2" in str(e_info.value)
+
+    # Nothing is written at file path when writing fails
+    failing_path = str(tmpdir.join("failing.csv"))
+    with patch("krakenohlc.io.format_csv_rows", side_effect=OSError("disk full")):
+        with pytest.raises(OSError):
+            write_csv(df, failing_path)
+    assert not os.path.exists(failing_path)
+    assert not tmpdir.listdir(lambda path: path.ext == ".tmp")
+
+
+def test_create_temporary_file(tmpdir):
+    # Concurrent writers of a file write different temporary files
+    filepath = str(tmpdir.join("trades.csv"))
+    temporary_filepaths = {create_temporary_file(filepath) for _ in range(2)}
+    assert len(temporary_filepaths) == 2
+    # Temporary files have the permissions of files created by open
+    open(filepath, "w").close()
+    for temporary_filepath in temporary_filepaths:
+        assert os.path.dirname(temporary_filepath) == str(tmpdir)
+        assert os.path.basename(temporary_filepath).startswith("trades.csv.")
+        assert os.stat(temporary_filepath).st_mode == os.stat(filepath).st_mode
+
+
+def test_csv_read_options():
+    assert csv_read_options("trades", "c") == dict(dtype=TRADES_CSV_DTYPES, engine="c")
+    with patch.dict("sys.modules", {"pyarrow": None}):
+        with pytest.raises(ValueError) as e_info:
+            csv_read_options("trades", "c", "pyarrow")
+    assert "pyarrow package is required for pyarrow dtype backend." in str(e_info.value)
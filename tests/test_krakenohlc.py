@@ -95,11 +95,24 @@ def test_kraken_ohlc(mock_test_data_path):
     with patch(
         "krakenohlc.krakenohlc.create_data_directory", return_value=None
     ) as mock_create_data_directory, patch(
-        "krakenohlc.krakenohlc.handle_pair_trades", return_value=None
+        "krakenohlc.krakenohlc.handle_pair_trades", return_value=pd.DataFrame()
     ) as mock_handle_pair_trades, patch(
         "krakenohlc.krakenohlc.handle_pair_frequency_ohlc", return_value=None
-    ) as mock_fake_handle_pair_frequency_ohlc:
+    ) as mock_fake_handle_pair_frequency_ohlc, patch(
+        "krakenohlc.krakenohlc.write_metadata", return_value=None
+    ) as mock_write_metadata, patch(
+        "krakenohlc.krakenohlc.append_run_history", return_value=None
+    ) as mock_append_run_history:
         kraken_ohlc(mock_test_data_path)
         mock_create_data_directory.assert_called_once_with(mock_test_data_path)
-        assert mock_handle_pair_trades.call_count == 91
-        assert mock_fake_handle_pair_frequency_ohlc.call_count == 364
+        assert mock_handle_pair_trades.call_count == 80
+        assert mock_fake_handle_pair_frequency_ohlc.call_count == 320
+        # Metadata saved after each pair and at the end of the run
+        assert mock_write_metadata.call_count == 81
+        metadata = mock_write_metadata.call_args[0][1]
+        assert metadata["pairs"]["AAVEXBT"][0]["trade_count"] == 0
+        assert "finished_at" in metadata["last_run"]
+        # Run summary appended to run history at the end of the run
+        summary = mock_append_run_history.call_args[0][1]
+        assert summary["pairs"] == 80
+        assert summary["download"] is True
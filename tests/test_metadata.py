@@ -0,0 +1,69 @@
+import datetime
+import json
+
+import pytest
+
+from krakenohlc import read_metadata, update_pair_metadata, write_metadata
+
+
+def test_metadata(tmpdir):
+    # Empty metadata when not saved yet
+    metadata = read_metadata(str(tmpdir))
+    assert metadata == {"pairs": {}}
+
+    # Saved metadata is read back
+    update_pair_metadata(
+        metadata,
+        "GRTETH",
+        datetime.datetime(2021, 3, 28),
+        datetime.datetime(2021, 5, 4, 15),
+        "trade_history/GRTETH_2021-03-28T00-00-00_2021-05-04T15-00-00.csv",
+        2,
+        {"1h": "ohlc/GRTETH_2021-03-28T00-00-00_2021-05-04T15-00-00_1H.csv"},
+    )
+    write_metadata(str(tmpdir), metadata)
+    assert not tmpdir.join("metadata.json.tmp").exists()
+    metadata = read_metadata(str(tmpdir))
+    assert metadata["pairs"]["GRTETH"][0]["start_datetime"] == "2021-03-28 00:00:00"
+    assert metadata["pairs"]["GRTETH"][0]["trade_count"] == 2
+    assert list(metadata["pairs"]["GRTETH"][0]["ohlc_filepaths"]) == ["1h"]
+
+    # Another dates range of the pair is kept, a same one is replaced
+    for trade_count in [3, 4]:
+        update_pair_metadata(
+            metadata,
+            "GRTETH",
+            datetime.datetime(2021, 3, 1),
+            datetime.datetime(2021, 3, 28),
+            None,
+            trade_count,
+            {},
+        )
+    assert [i["trade_count"] for i in metadata["pairs"]["GRTETH"]] == [4, 2]
+
+    # Gaps confirmed without trades are kept when a same dates range is replaced
+    confirmed_gaps = [["2021-03-02 00:00:00", "2021-03-03 00:00:00"]]
+    for gaps in [confirmed_gaps, None]:
+        update_pair_metadata(
+            metadata,
+            "GRTETH",
+            datetime.datetime(2021, 3, 1),
+            datetime.datetime(2021, 3, 28),
+            None,
+            4,
+            {},
+            confirmed_gaps=gaps,
+        )
+    assert metadata["pairs"]["GRTETH"][0]["confirmed_gaps"] == confirmed_gaps
+
+    # Pair metadata of a single dates range saved by earlier versions
+    tmpdir.join("metadata.json").write(
+        json.dumps({"pairs": {"GRTETH": {"trade_count": 2}}})
+    )
+    assert read_metadata(str(tmpdir))["pairs"] == {"GRTETH": [{"trade_count": 2}]}
+
+    # Raise value error when metadata is not JSON
+    tmpdir.join("metadata.json").write("{")
+    with pytest.raises(ValueError) as e_info:
+        read_metadata(str(tmpdir))
+    assert "Can't read metadata at" in str(e_info.value)
@@ -0,0 +1,126 @@
+import datetime
+import logging
+import os
+
+import pandas as pd
+
+from krakenohlc import (KrakenApiEndpoint, ReplayData, ReplayServer,
+                        download_native_ohlc, handle_pair,
+                        native_ohlc_mismatches, read_csv, synthetic_trades,
+                        trades_as_dataframe, trades_to_ohlc,
+                        trim_incomplete_bars)
+
+START_DATETIME = datetime.datetime(2021, 3, 28)
+END_DATETIME = datetime.datetime(2021, 5, 4, 15)
+
+
+def replay_data() -> tuple[ReplayData, pd.DataFrame]:
+    # Trades until a day after end date, the replayed current date
+    trades = synthetic_trades(1616803200, 1620226800, trades_per_hour=30, seed=4)
+    df_trades = trades_as_dataframe(trades)
+    df_trades = df_trades[
+        (df_trades.index >= START_DATETIME) & (df_trades.index < END_DATETIME)
+    ]
+    return ReplayData(trades={"XYZEUR": trades}), df_trades
+
+
+def test_download_native_ohlc(mock_rate_limiter):
+    data, df_trades = replay_data()
+    rate_limiter = mock_rate_limiter()
+    with ReplayServer(data) as server:
+        ka = KrakenApiEndpoint(server.url)
+        native_ohlc = {
+            frequency: download_native_ohlc(
+                ka,
+                "XYZEUR",
+                frequency,
+                START_DATETIME,
+                END_DATETIME,
+                rate_limiter,
+                True,
+                ["vwap", "trade_count"],
+            )
+            for frequency in ["1h", "4h", "1D", "1W-MON"]
+        }
+        # Volume split statistics are not available as native bars
+        assert (
+            download_native_ohlc(
+                ka,
+                "XYZEUR",
+                "1D",
+                START_DATETIME,
+                END_DATETIME,
+                rate_limiter,
+                False,
+                ["buy_volume"],
+            )
+            is None
+        )
+    # More than the 720 most recent hourly bars between dates
+    assert native_ohlc["1h"] is None
+    # Weekly bars replayed from the unix epoch do not start on Monday
+    assert native_ohlc["1W-MON"] is None
+    for frequency in ["4h", "1D"]:
+        df_native = trim_incomplete_bars(
+            native_ohlc[frequency], frequency, START_DATETIME, END_DATETIME
+        )
+        df_ohlc = trim_incomplete_bars(
+            trades_to_ohlc(
+                df_trades, frequency, True, statistics=["vwap", "trade_count"]
+            ),
+            frequency,
+            START_DATETIME,
+            END_DATETIME,
+        )
+        pd.testing.assert_frame_equal(df_native, df_ohlc, check_freq=False)
+        assert native_ohlc_mismatches(df_native, df_ohlc) == 0
+        df_ohlc.iloc[3, df_ohlc.columns.get_loc("high")] *= 1.01
+        assert native_ohlc_mismatches(df_native, df_ohlc) == 1
+
+
+def test_handle_pair_native_ohlc(tmpdir, mock_config, mock_rate_limiter, caplog):
+    data, df_trades = replay_data()
+    data_folder_path = str(tmpdir)
+    tmpdir.mkdir("trade_history")
+    tmpdir.mkdir("ohlc")
+    mock_config.native_ohlc = True
+    mock_config.ohlc_statistics = ["vwap"]
+    mock_config.rate_limiter = mock_rate_limiter()
+    with ReplayServer(data) as server:
+        mock_config.ka = KrakenApiEndpoint(server.url)
+        mock_config.ohlc_frequencies = ["4h", "1D"]
+        result = handle_pair("XYZEUR", mock_config, data_folder_path)
+        native_requests = server.metrics()["requests"]
+
+        # Trades are downloaded when a frequency is not available as native bars
+        mock_config.ohlc_frequencies = ["1h", "1D"]
+        with caplog.at_level(logging.INFO):
+            fallback_result = handle_pair("XYZEUR", mock_config, data_folder_path)
+    assert native_requests == 2
+    assert result["trades_filepath"] is None
+    # Trades of downloaded 4 hours bars, including the last incomplete bar
+    df_all_trades = trades_as_dataframe(data.trades["XYZEUR"])
+    assert result["trade_count"] == len(
+        df_all_trades[
+            (df_all_trades.index >= START_DATETIME)
+            & (df_all_trades.index < datetime.datetime(2021, 5, 4, 16))
+        ]
+    )
+    assert os.listdir(f"{data_folder_path}/trade_history") == [
+        "XYZEUR_2021-03-28T00-00-00_2021-05-04T15-00-00.csv"
+    ]
+    assert fallback_result["trade_count"] == len(df_trades)
+    assert fallback_result["ohlc_filepaths"]["1D"] == result["ohlc_filepaths"]["1D"]
+    assert "Native OHLC not available" in caplog.text
+    assert "native OHLC bars do not match trades" not in caplog.text
+    for frequency in ["4h", "1D"]:
+        df_ohlc = read_csv(
+            f"{data_folder_path}/{result['ohlc_filepaths'][frequency]}", "ohlc"
+        )
+        df_ohlc_test = trim_incomplete_bars(
+            trades_to_ohlc(df_trades, frequency, False, statistics=["vwap"]),
+            frequency,
+            START_DATETIME,
+            END_DATETIME,
+        )
+        pd.testing.assert_frame_equal(df_ohlc, df_ohlc_test, check_freq=False)
@@ -5,8 +5,12 @@ import pandas as pd
 import pytest
 
 from krakenohlc import (adjust_ohlc_frequency_dates,
+                        anchored_complete_bars_bounds, bar_boundaries,
                         check_trades_ohlc_start_end_dates,
-                        pandas_to_kraken_ohlc_frequencies, trades_to_ohlc)
+                        complete_bars_bounds, fill_ohlc_gaps, is_anchored,
+                        pandas_to_kraken_ohlc_frequencies, trades_to_ohlc,
+                        trim_incomplete_bars)
+from krakenohlc.ohlc import anchored_bar_boundaries
 
 
 def test_pandas_to_kraken_ohlc_frequencies():
@@ -176,6 +180,108 @@ def test_adjust_ohlc_frequency_dates(caplog: pytest.LogCaptureFixture):
     assert df_ohlc.equals(df_ohlc_test)
 
 
+def test_complete_bars_bounds():
+    start_datetime = datetime.datetime(2021, 3, 28)
+    end_datetime = datetime.datetime(2021, 5, 4, 15)
+    assert complete_bars_bounds("1W-MON", start_datetime, end_datetime) == (
+        pd.Timestamp("2021-03-29"),
+        pd.Timestamp("2021-04-27 15:00:00"),
+    )
+    assert complete_bars_bounds("1h", start_datetime, end_datetime) == (
+        pd.Timestamp("2021-03-28"),
+        pd.Timestamp("2021-05-04 14:00:00"),
+    )
+    # Bounds are computed once for all pairs
+    cache_hits = complete_bars_bounds.cache_info().hits
+    complete_bars_bounds("1h", start_datetime, end_datetime)
+    assert complete_bars_bounds.cache_info().hits == cache_hits + 1
+
+
+def test_bar_boundaries():
+    anchoring = {"time_zone": "America/New_York", "day_start": "17:00"}
+    assert not is_anchored(None)
+    assert not is_anchored({"time_zone": "UTC", "week_start": "MON"})
+    assert is_anchored(anchoring)
+    start_datetime = datetime.datetime(2021, 3, 10)
+    end_datetime = datetime.datetime(2021, 3, 20)
+    boundaries = bar_boundaries("1D", anchoring, start_datetime, end_datetime)
+    # 17:00 in New York is 22:00 UTC before and 21:00 UTC after 2021-03-14
+    assert pd.Timestamp("2021-03-12 22:00:00") in boundaries
+    assert pd.Timestamp("2021-03-13 22:00:00") in boundaries
+    assert pd.Timestamp("2021-03-14 21:00:00") in boundaries
+    assert boundaries[0] < start_datetime and boundaries[-1] > end_datetime
+    assert anchored_complete_bars_bounds(
+        "1D", anchoring, start_datetime, end_datetime
+    ) == (pd.Timestamp("2021-03-10 22:00:00"), pd.Timestamp("2021-03-18 21:00:00"))
+    weeks = bar_boundaries(
+        "1W-MON", {**anchoring, "week_start": "SUN"}, start_datetime, end_datetime
+    )
+    assert list(weeks.tz_localize("UTC").tz_convert("America/New_York").weekday) == [
+        6
+    ] * len(weeks)
+    # Boundaries are computed once for all pairs with dates of the same days
+    cache_hits = anchored_bar_boundaries.cache_info().hits
+    bar_boundaries("1D", anchoring, start_datetime, datetime.datetime(2021, 3, 20, 6))
+    assert anchored_bar_boundaries.cache_info().hits == cache_hits + 1
+
+
+def test_trades_to_ohlc_anchored():
+    df_trades = pd.DataFrame(
+        {"price": [1.0, 2.0, 3.0, 4.0], "volume": [1.0, 1.0, 1.0, 1.0]},
+        index=pd.DatetimeIndex(
+            [
+                "2021-03-13 21:59:00",
+                "2021-03-13 22:00:00",
+                "2021-03-14 20:59:00",
+                "2021-03-14 21:00:00",
+            ],
+            name="time",
+        ),
+    )
+    anchoring = {"time_zone": "America/New_York", "day_start": "17:00"}
+    df_ohlc = trades_to_ohlc(df_trades, "1D", False, anchoring=anchoring)
+    # The daily bar of the daylight saving time change lasts 23 hours
+    assert list(df_ohlc.index) == [
+        pd.Timestamp("2021-03-12 22:00:00"),
+        pd.Timestamp("2021-03-13 22:00:00"),
+        pd.Timestamp("2021-03-14 21:00:00"),
+    ]
+    assert list(df_ohlc["open"]) == [1.0, 2.0, 4.0]
+    assert list(df_ohlc["close"]) == [1.0, 3.0, 4.0]
+    df_trimmed = adjust_ohlc_frequency_dates(
+        datetime.datetime(2021, 3, 13, 22),
+        datetime.datetime(2021, 3, 15, 21),
+        "1D",
+        df_ohlc,
+        "XYZEUR",
+        anchoring,
+    )
+    assert list(df_trimmed.index) == list(df_ohlc.index[1:])
+
+
+def test_trim_incomplete_bars():
+    df_ohlc = pd.DataFrame(
+        {"close": [1.0, 2.0, 3.0, 4.0]},
+        index=pd.date_range("2021-03-27", periods=4, freq="1D"),
+    )
+    df_trimmed = trim_incomplete_bars(
+        df_ohlc,
+        "1D",
+        datetime.datetime(2021, 3, 27, 12),
+        datetime.datetime(2021, 3, 30, 12),
+    )
+    assert list(df_trimmed["close"]) == [2.0, 3.0]
+    # Complete bars are returned as is
+    df_complete = df_ohlc[1:]
+    df_trimmed = trim_incomplete_bars(
+        df_complete,
+        "1D",
+        datetime.datetime(2021, 3, 28),
+        datetime.datetime(2021, 3, 31),
+    )
+    assert df_trimmed is df_complete
+
+
 def test_trades_to_ohlc():
     df_trades = pd.read_csv(
         "tests/fixtures/tests_data/GRTETH_2021-03-28T00-00-00_2021-05-04T15-00-00.csv",
@@ -207,3 +313,104 @@ def test_trades_to_ohlc():
     df_ohlc["volume"] = df_ohlc["volume"].apply(lambda x: int(100 * x))
     df_ohlc_test["volume"] = df_ohlc_test["volume"].apply(lambda x: int(100 * x))
     assert df_ohlc.equals(df_ohlc_test)
+
+
+def test_fill_ohlc_gaps():
+    df_ohlc_test = pd.read_csv(
+        "tests/fixtures/tests_data/"
+        "GRTETH_2021-03-28T00-00-00_2021-05-04T15-00-00_1H.csv",
+        index_col="time",
+        parse_dates=True,
+    )
+    empty_bars = df_ohlc_test["close"].isna()
+    assert empty_bars.any()
+
+    # Test NaN policy keeps empty bars untouched
+    df_ohlc = fill_ohlc_gaps(df_ohlc_test.copy(), "nan")
+    assert df_ohlc.equals(df_ohlc_test)
+
+    # Test forward fill policy uses previous close with zero volume
+    df_ohlc = fill_ohlc_gaps(df_ohlc_test.copy(), "ffill")
+    assert len(df_ohlc) == len(df_ohlc_test)
+    assert not df_ohlc[["open", "high", "low", "close"]].isna().any().any()
+    previous_close = df_ohlc_test["close"].ffill().shift()[empty_bars]
+    for column in ["open", "high", "low", "close"]:
+        assert df_ohlc.loc[empty_bars, column].equals(previous_close.rename(column))
+    assert (df_ohlc.loc[empty_bars, "volume"] == 0).all()
+
+    # Test drop policy only keeps bars with trades
+    df_ohlc = fill_ohlc_gaps(df_ohlc_test.copy(), "drop")
+    assert df_ohlc.equals(df_ohlc_test[~empty_bars])
+
+    # Test unsupported policy
+    with pytest.raises(ValueError) as e_info:
+        fill_ohlc_gaps(df_ohlc_test.copy(), "zero")
+    assert "Unsupported fill policy" in str(e_info.value)
+
+
+def test_trades_to_ohlc_statistics():
+    df_trades = pd.read_csv(
+        "tests/fixtures/tests_data/GRTETH_2021-03-28T00-00-00_2021-05-04T15-00-00.csv",
+        index_col="time",
+        parse_dates=True,
+    )
+    statistics = [
+        "vwap",
+        "trade_count",
+        "buy_volume",
+        "sell_volume",
+        "market_volume",
+        "limit_volume",
+    ]
+    df_ohlc = trades_to_ohlc(df_trades, "1D", False, statistics=statistics)
+    assert (
+        list(df_ohlc.columns)
+        == [
+            "open",
+            "high",
+            "low",
+            "close",
+            "volume",
+        ]
+        + statistics
+    )
+    # OHLCV columns are unchanged by additional statistics
+    pd.testing.assert_frame_equal(
+        df_ohlc[["open", "high", "low", "close", "volume"]],
+        trades_to_ohlc(df_trades, "1D", False),
+    )
+
+    # Compare statistics with a daily group by on trades
+    groups = df_trades.groupby(df_trades.index.floor("1D"))
+    notional = (df_trades["price"] * df_trades["volume"]).groupby(groups.ngroup())
+    vwap = notional.sum().values / groups["volume"].sum().values
+    traded_days = df_ohlc["trade_count"] > 0
+    assert (abs(df_ohlc.loc[traded_days, "vwap"].values - vwap) < 1e-12).all()
+    assert df_ohlc.loc[~traded_days, "vwap"].isna().all()
+    assert df_ohlc["trade_count"].sum() == len(df_trades)
+    assert (
+        df_ohlc.loc[traded_days, "trade_count"].values == groups.size().values
+    ).all()
+    pd.testing.assert_series_equal(
+        df_ohlc["buy_volume"] + df_ohlc["sell_volume"],
+        df_ohlc["volume"],
+        check_names=False,
+    )
+    pd.testing.assert_series_equal(
+        df_ohlc["market_volume"] + df_ohlc["limit_volume"],
+        df_ohlc["volume"],
+        check_names=False,
+    )
+    buy_volume = df_trades.loc[df_trades["buy/sell"] == "b", "volume"].sum()
+    assert abs(df_ohlc["buy_volume"].sum() - buy_volume) < 1e-6
+
+    # Test volume statistics in quote asset
+    df_ohlc = trades_to_ohlc(df_trades, "1D", True, statistics=["buy_volume"])
+    buy_trades = df_trades[df_trades["buy/sell"] == "b"]
+    buy_volume = (buy_trades["price"] * buy_trades["volume"]).sum()
+    assert abs(df_ohlc["buy_volume"].sum() - buy_volume) < 1e-9
+
+    # Test unsupported statistic
+    with pytest.raises(ValueError) as e_info:
+        trades_to_ohlc(df_trades, "1D", False, statistics=["median"])
+    assert "Unsupported statistics" in str(e_info.value)
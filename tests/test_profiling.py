@@ -0,0 +1,63 @@
+import os
+import pstats
+import shutil
+
+from krakenohlc import StageProfiler, handle_pair
+
+TRADES_FILEPATH = (
+    "tests/fixtures/tests_data/GRTETH_2021-03-28T00-00-00_2021-05-04T15-00-00.csv"
+)
+
+
+def test_stage_profiler(tmpdir):
+    profiler = StageProfiler()
+    with profiler.stage("resample", "GRTETH", "1h"):
+        sum(range(1000))
+    assert profiler.profiles == {}
+    assert profiler.write_profiles(str(tmpdir)) is None
+
+    profiler = StageProfiler(True, ["resample", "write"], ["GRTETH"], 5)
+    assert profiler.is_profiled("resample", "GRTETH")
+    assert not profiler.is_profiled("read", "GRTETH")
+    assert not profiler.is_profiled("resample", "KEEPXBT")
+    for _ in range(2):
+        with profiler.stage("resample", "GRTETH", "1h"):
+            sorted(range(1000))
+    with profiler.stage("write", "GRTETH"):
+        sorted(range(1000))
+    assert list(profiler.profiles) == ["GRTETH_resample_1h", "GRTETH_write"]
+
+    summary_filepath = profiler.write_profiles(str(tmpdir), "worker-1")
+    assert summary_filepath == f"{tmpdir}/profiles/worker-1/summary.txt"
+    stats = pstats.Stats(f"{tmpdir}/profiles/worker-1/GRTETH_resample_1h.prof")
+    # Calls of a stage are accumulated in its profile
+    assert any(
+        function[2] == "<built-in method builtins.sorted>" and stats[0] == 2
+        for function, stats in stats.stats.items()
+    )
+    with open(summary_filepath, "r") as stream:
+        summary = stream.read()
+    assert "=== GRTETH_resample_1h:" in summary
+    assert "=== GRTETH_write:" in summary
+
+
+def test_handle_pair_profiling(tmpdir, mock_pair, mock_config):
+    mock_config.ohlc_frequencies = ["1h"]
+    mock_config.trade_verification = {
+        **mock_config.trade_verification,
+        "enabled": True,
+    }
+    mock_config.profiler = StageProfiler(True)
+    data_folder_path = str(tmpdir)
+    tmpdir.mkdir("ohlc")
+    shutil.copy(TRADES_FILEPATH, tmpdir.mkdir("trade_history"))
+    handle_pair(mock_pair, mock_config, data_folder_path, False)
+    assert sorted(mock_config.profiler.profiles) == [
+        "GRTETH_read",
+        "GRTETH_resample_1h",
+        "GRTETH_trim_1h",
+        "GRTETH_verify",
+        "GRTETH_write_1h",
+    ]
+    mock_config.profiler.write_profiles(data_folder_path)
+    assert len(os.listdir(f"{data_folder_path}/profiles")) == 6
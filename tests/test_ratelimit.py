@@ -0,0 +1,55 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from krakenapi import KrakenApi
+
+from krakenohlc import AdaptiveRateLimiter, send_public_request
+
+
+@patch("krakenohlc.ratelimit.time.sleep")
+def test_adaptive_rate_limiter(mock_sleep):
+    rate_limiter = AdaptiveRateLimiter(
+        initial_interval=2, min_interval=1, max_interval=8, max_retries=2
+    )
+    # Request rate ramps up while requests succeed
+    for _ in range(30):
+        rate_limiter.on_success(0.1)
+    assert rate_limiter.interval == 1
+    # Increasing latency slows down requests
+    rate_limiter.on_success(1.0)
+    assert rate_limiter.interval == 1.25
+    # Rate limit errors double the interval and back off with jitter
+    rate_limiter.on_rate_limit()
+    assert rate_limiter.interval == 2.5
+    assert 2.5 <= mock_sleep.call_args[0][0] <= 5
+    rate_limiter.on_connection_error()
+    assert rate_limiter.interval == 2.5
+    with pytest.raises(ValueError) as e_info:
+        rate_limiter.on_rate_limit()
+    assert "Kraken API request failed 3 times." in str(e_info.value)
+    metrics = rate_limiter.metrics()
+    assert metrics["rate_limit_errors"] == 2
+    assert metrics["connection_errors"] == 1
+    assert metrics["waited"] > 0
+
+
+@patch("krakenohlc.ratelimit.time.sleep")
+@patch("krakenohlc.ratelimit.urlopen")
+def test_send_public_request(mock_urlopen, mock_sleep):
+    responses = [
+        b'{"error": ["EGeneral:Too many requests"]}',
+        b'{"error": [], "result": {"XGRTXETH": [], "last": "1"}}',
+        b'{"error": ["EQuery:Unknown asset pair"]}',
+    ]
+    mock_urlopen.side_effect = [
+        MagicMock(read=MagicMock(return_value=i)) for i in responses
+    ]
+    rate_limiter = AdaptiveRateLimiter(initial_interval=1, min_interval=0.5)
+    data = send_public_request(KrakenApi(), "Trades", {"pair": "GRTETH"}, rate_limiter)
+    assert data == {"XGRTXETH": [], "last": "1"}
+    assert rate_limiter.requests == 2
+    assert rate_limiter.rate_limit_errors == 1
+    assert rate_limiter.interval == 1.95
+    with pytest.raises(ValueError) as e_info:
+        send_public_request(KrakenApi(), "Trades", {"pair": "GRTEUR"}, rate_limiter)
+    assert "Kraken API error -> EQuery:Unknown asset pair" in str(e_info.value)
@@ -0,0 +1,82 @@
+import datetime
+
+import pandas as pd
+
+from krakenohlc import (KrakenApiEndpoint, ReplayData, ReplayServer,
+                        asset_pairs_frame, cassette_replay_data,
+                        download_trades, select_pairs, synthetic_trades,
+                        trades_as_dataframe)
+
+
+def test_replay_synthetic_trades(mock_rate_limiter):
+    start_datetime = datetime.datetime(2021, 1, 1)
+    end_datetime = datetime.datetime(2021, 1, 3)
+    trades = synthetic_trades(
+        1609459200 - 3600, 1609459200 + 3 * 86400, trades_per_hour=120, seed=1
+    )
+    replay_data = ReplayData(trades={"XYZEUR": trades})
+    with ReplayServer(replay_data, page_size=100) as server:
+        ka = KrakenApiEndpoint(server.url)
+        asset_pairs = ka.get_asset_pairs()
+        assert list(asset_pairs) == ["XYZEUR"]
+        # Replayed pairs are selected by base and quote assets
+        df_pairs = asset_pairs_frame(asset_pairs)
+        assert select_pairs(df_pairs, ["EUR"]) == ["XYZEUR"]
+        assert select_pairs(df_pairs, ["EUR"], ["XYZ"]) == []
+        df_trades = download_trades(
+            ka, "XYZEUR", start_datetime, end_datetime, mock_rate_limiter()
+        )
+        metrics = server.metrics()
+    df_trades_test = trades_as_dataframe(trades)
+    df_trades_test = df_trades_test[
+        (df_trades_test.index >= start_datetime) & (df_trades_test.index < end_datetime)
+    ]
+    pd.testing.assert_frame_equal(df_trades, df_trades_test)
+    # A request per page of trades
+    assert metrics["requests"] == 1 + -(-len(df_trades) // 100)
+
+
+def test_replay_injected_errors(mock_rate_limiter):
+    start_datetime = datetime.datetime(2021, 1, 1)
+    end_datetime = datetime.datetime(2021, 1, 2)
+    trades = synthetic_trades(1609459200, 1609459200 + 86400, 240, seed=2)
+    rate_limiter = mock_rate_limiter()
+    with ReplayServer(
+        ReplayData(trades={"XYZEUR": trades}),
+        page_size=200,
+        error_rate=0.3,
+        seed=3,
+    ) as server:
+        df_trades = download_trades(
+            KrakenApiEndpoint(server.url),
+            "XYZEUR",
+            start_datetime,
+            end_datetime,
+            rate_limiter,
+        )
+        metrics = server.metrics()
+    assert len(df_trades) == len(trades)
+    assert metrics["injected_errors"] > 0
+    assert rate_limiter.rate_limit_errors == metrics["injected_errors"]
+    assert rate_limiter.requests == metrics["requests"]
+
+
+def test_replay_cassette(mock_rate_limiter):
+    replay_data = cassette_replay_data(
+        "tests/fixtures/vcr_cassettes/test_download_trades.yaml"
+    )
+    with ReplayServer(replay_data) as server:
+        df_trades = download_trades(
+            KrakenApiEndpoint(server.url),
+            "GRTETH",
+            datetime.datetime(2021, 3, 28, 0, 0),
+            datetime.datetime(2021, 5, 4, 15, 0),
+            mock_rate_limiter(),
+        )
+    df_trades_test = pd.read_csv(
+        "tests/fixtures/tests_data/GRTETH_2021-03-28T00-00-00_2021-05-04T15-00-00.csv",
+        index_col="time",
+        parse_dates=True,
+    )
+    df_trades_test["miscellaneous"].fillna("", inplace=True)
+    pd.testing.assert_frame_equal(df_trades, df_trades_test)
@@ -0,0 +1,82 @@
+import json
+
+from krakenohlc import (RunStats, append_run_history, read_run_history,
+                        run_regressions)
+
+
+def test_run_stats():
+    run_stats = RunStats()
+    run_stats.add_pair("XYZEUR", 1.0, 1000)
+    run_stats.add_pair("ABCEUR", 1.2, 1000)
+    run_stats.add_pair("DEFEUR", 0.01, 10)
+    run_stats.add_pair("SLOWEUR", 6.0, 1000)
+    run_stats.add_bars("XYZEUR", 24)
+    run_stats.add_bars("XYZEUR", 1)
+    assert run_stats.pairs["XYZEUR"] == {
+        "seconds": 1.0,
+        "trade_count": 1000,
+        "bar_count": 25,
+    }
+    summary = run_stats.summary(42)
+    assert summary["api_calls"] == 42
+    assert summary["pairs"] == 4
+    assert summary["trade_count"] == 3010
+    assert summary["bar_count"] == 25
+    assert summary["cpu_seconds"] >= 0
+    assert summary["peak_rss_mb"] > 0
+    # Pairs much slower per trade than others, fast pairs are not outliers
+    assert summary["outliers"] == [
+        {"pair": "SLOWEUR", "seconds": 6.0, "trade_count": 1000}
+    ]
+    json.dumps(summary)
+
+
+def test_run_history(tmpdir):
+    assert read_run_history(str(tmpdir)) == []
+    runs = [
+        {"config_file": "config.yaml", "download": True, "wall_seconds": seconds}
+        for seconds in [10.0, 12.0, 11.0]
+    ]
+    for run in runs:
+        append_run_history(str(tmpdir), run)
+    # Interrupted write
+    with open(f"{tmpdir}/run_history.jsonl", "a") as stream:
+        stream.write('{"config_file": ')
+    assert read_run_history(str(tmpdir)) == runs
+
+
+def test_run_regressions():
+    history = [
+        {
+            "config_file": "config.yaml",
+            "download": True,
+            "wall_seconds": seconds,
+            "trades_per_second": 1000 / seconds,
+            "peak_rss_mb": None,
+        }
+        for seconds in [10.0, 12.0, 11.0, 9.0]
+    ]
+    # Runs of another configuration or mode are not compared
+    history.append({"config_file": "other.yaml", "download": True, "wall_seconds": 1})
+    history.append({"config_file": "config.yaml", "download": False, "wall_seconds": 1})
+    assert run_regressions(history[:1]) == []
+
+    history.append(
+        {
+            "config_file": "config.yaml",
+            "download": True,
+            "wall_seconds": 14.0,
+            "trades_per_second": 1000 / 14.0,
+            "peak_rss_mb": 100.0,
+        }
+    )
+    comparisons = {i["metric"]: i for i in run_regressions(history, 10, 0.25)}
+    assert sorted(comparisons) == ["trades_per_second", "wall_seconds"]
+    assert comparisons["wall_seconds"]["median"] == 10.5
+    assert comparisons["wall_seconds"]["change"] == 0.333
+    assert comparisons["wall_seconds"]["regression"] is True
+    assert comparisons["trades_per_second"]["regression"] is True
+    # Only the 2 previous runs, within tolerance
+    comparisons = {i["metric"]: i for i in run_regressions(history, 2, 0.5)}
+    assert comparisons["wall_seconds"]["median"] == 10.0
+    assert not any(i["regression"] for i in comparisons.values())
@@ -0,0 +1,117 @@
+import datetime
+import json
+from unittest.mock import patch
+
+import vcr
+
+from krakenohlc import (RunDeadline, estimated_trade_counts, kraken_ohlc,
+                        pair_priority, schedule_pairs)
+
+
+def test_schedule_pairs():
+    metadata = {
+        "pairs": {
+            # Trade rate over all dates ranges of the pair
+            "ADAXBT": [
+                {
+                    "start_datetime": "2021-03-28 00:00:00",
+                    "end_datetime": "2021-03-29 00:00:00",
+                    "trade_count": 500,
+                },
+                {
+                    "start_datetime": "2021-03-29 00:00:00",
+                    "end_datetime": "2021-03-30 00:00:00",
+                    "trade_count": 1500,
+                },
+            ],
+            "AAVEXBT": [
+                {
+                    "start_datetime": "2021-03-28 00:00:00",
+                    "end_datetime": "2021-03-29 00:00:00",
+                    "trade_count": 300,
+                }
+            ],
+            "ETHUSDT": [
+                {
+                    "start_datetime": "2021-03-28 00:00:00",
+                    "end_datetime": "2021-03-29 00:00:00",
+                    "trade_count": 5000,
+                }
+            ],
+        }
+    }
+    pairs = ["ETHUSDT", "GRTXBT", "ADAXBT", "AAVEXBT", "XETHXXBT"]
+    trade_counts = estimated_trade_counts(
+        metadata, pairs, datetime.datetime(2021, 4, 1), datetime.datetime(2021, 4, 3)
+    )
+    # Pairs never run are estimated at the median
+    assert trade_counts == {
+        "ETHUSDT": 10000,
+        "GRTXBT": 2000,
+        "ADAXBT": 2000,
+        "AAVEXBT": 600,
+        "XETHXXBT": 2000,
+    }
+    priorities = {"*XBT": 1, "XETH*": 2}
+    assert pair_priority("XETHXXBT", priorities) == 2
+    assert pair_priority("ETHUSDT", priorities) == 0
+    assert schedule_pairs(pairs, priorities, trade_counts) == [
+        "XETHXXBT",
+        "AAVEXBT",
+        "GRTXBT",
+        "ADAXBT",
+        "ETHUSDT",
+    ]
+    assert schedule_pairs(pairs, {}, {}) == pairs
+    # Pairs deferred by the previous run are first within their priority
+    assert schedule_pairs(pairs, priorities, trade_counts, ["ETHUSDT", "ADAXBT"]) == [
+        "XETHXXBT",
+        "ADAXBT",
+        "AAVEXBT",
+        "GRTXBT",
+        "ETHUSDT",
+    ]
+
+
+def test_run_deadline():
+    assert not RunDeadline().is_deferred(0)
+    deadline = RunDeadline(1e-9, 1)
+    assert deadline.is_deferred(1)
+    assert not deadline.is_deferred(2)
+    assert not RunDeadline(60).is_deferred(0)
+
+
+@vcr.use_cassette("tests/fixtures/vcr_cassettes/test_config_init_properties.yaml")
+def test_kraken_ohlc_deadline(tmpdir):
+    with open("tests/fixtures/config.yaml", "r") as stream:
+        config = stream.read()
+    config = config.replace(
+        "scheduling:\n  priorities: {}\n  deadline_minutes: 0",
+        'scheduling:\n  priorities: {"ADA*": 2, "AAVE*": 1}\n'
+        "  deadline_minutes: 0.000001",
+    )
+    config_file = f"{tmpdir}/config.yaml"
+    with open(config_file, "w") as stream:
+        stream.write(config)
+    with patch("krakenohlc.krakenohlc.handle_pair", return_value=None) as mock:
+        kraken_ohlc(str(tmpdir), config_file)
+    # High priority pairs are not deferred after the deadline
+    assert [call.args[0] for call in mock.call_args_list] == [
+        "ADAXBT",
+        "ADAUSDT",
+        "AAVEXBT",
+    ]
+    with open(f"{tmpdir}/metadata.json", "r") as stream:
+        metadata = json.load(stream)
+    assert len(metadata["last_run"]["deferred_pairs"]) == 77
+
+    # Pairs deferred by the previous run are handled first in the next run
+    metadata["last_run"]["deferred_pairs"] = ["ETHUSDT", "DOTXBT"]
+    with open(f"{tmpdir}/metadata.json", "w") as stream:
+        json.dump(metadata, stream)
+    with patch("krakenohlc.krakenohlc.handle_pair", return_value=None) as mock:
+        kraken_ohlc(str(tmpdir), "tests/fixtures/config.yaml")
+    assert [call.args[0] for call in mock.call_args_list[:2]] == [
+        "DOTXBT",
+        "ETHUSDT",
+    ]
@@ -0,0 +1,144 @@
+import logging
+import shutil
+
+import pandas as pd
+import pytest
+
+from krakenohlc import (ChunkedOHLC, handle_pair_chunked, regroup_trades,
+                        trades_to_ohlc, verify_trades_chunks)
+
+FREQUENCIES = ["1min", "1h", "1D", "3D", "1W-MON"]
+STATISTICS = ["vwap", "trade_count", "buy_volume", "limit_volume"]
+TRADES_FILEPATH = (
+    "tests/fixtures/tests_data/GRTETH_2021-03-28T00-00-00_2021-05-04T15-00-00.csv"
+)
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_regroup_trades(mock_df_trade):
+    pages = [
+        mock_df_trade.iloc[i : i + 1000] for i in range(0, len(mock_df_trade), 1000)
+    ]
+    chunks = list(regroup_trades(pages, 2500))
+    assert [len(df_chunk) for df_chunk in chunks] == [3000, 2050]
+    pd.testing.assert_frame_equal(pd.concat(chunks), mock_df_trade)
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_chunked_ohlc(mock_df_trade):
+    for chunk_rows in [700, 2000]:
+        chunked_ohlc = ChunkedOHLC(FREQUENCIES, True, STATISTICS)
+        chunks = [
+            mock_df_trade.iloc[i : i + chunk_rows]
+            for i in range(0, len(mock_df_trade), chunk_rows)
+        ]
+        assert len(list(chunked_ohlc.aggregate(chunks))) == len(chunks)
+        assert chunked_ohlc.trade_count == len(mock_df_trade)
+        for frequency in FREQUENCIES:
+            for fill_policy in ["nan", "ffill", "drop"]:
+                pd.testing.assert_frame_equal(
+                    chunked_ohlc.ohlc(frequency, fill_policy),
+                    trades_to_ohlc(
+                        mock_df_trade, frequency, True, fill_policy, STATISTICS
+                    ),
+                    check_freq=False,
+                )
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_chunked_ohlc_late_chunk(mock_df_trade):
+    chunks = [
+        mock_df_trade.iloc[i : i + 1000] for i in range(0, len(mock_df_trade), 1000)
+    ]
+    # Trades of the second chunk are received last
+    chunks.append(chunks.pop(1))
+    chunked_ohlc = ChunkedOHLC(FREQUENCIES, True, STATISTICS)
+    for df_chunk in chunks:
+        chunked_ohlc.update(df_chunk)
+    # Final bars of late trades are corrected
+    assert chunked_ohlc.finalizers["1h"].late_trade_count == 1000
+    for frequency in FREQUENCIES:
+        pd.testing.assert_frame_equal(
+            chunked_ohlc.ohlc(frequency),
+            trades_to_ohlc(mock_df_trade, frequency, True, "nan", STATISTICS),
+            check_freq=False,
+        )
+
+
+def test_handle_pair_chunked(tmpdir, mock_pair, mock_config):
+    mock_config.memory_budget_mb = 1
+    mock_config.ohlc_frequencies = ["1h", "1D"]
+    data_folder_path = str(tmpdir)
+    tmpdir.mkdir("ohlc")
+    assert handle_pair_chunked(mock_pair, mock_config, data_folder_path, False) is None
+
+    shutil.copy(TRADES_FILEPATH, tmpdir.mkdir("trade_history"))
+    result = handle_pair_chunked(mock_pair, mock_config, data_folder_path, False)
+    assert result["trade_count"] == 5050
+    for frequency in ["1H", "1D"]:
+        ohlc_filepath = (
+            f"ohlc/GRTETH_2021-03-28T00-00-00_2021-05-04T15-00-00_{frequency}.csv"
+        )
+        assert ohlc_filepath in result["ohlc_filepaths"].values()
+        df_ohlc = pd.read_csv(
+            f"{data_folder_path}/{ohlc_filepath}", index_col="time", parse_dates=True
+        )
+        df_ohlc_test = pd.read_csv(
+            f"tests/fixtures/tests_data/{ohlc_filepath[5:]}",
+            index_col="time",
+            parse_dates=True,
+        )
+        pd.testing.assert_frame_equal(df_ohlc, df_ohlc_test)
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_handle_pair_chunked_checks(
+    tmpdir, mock_pair, mock_config, caplog, mock_df_trade
+):
+    mock_config.memory_budget_mb = 1
+    mock_config.ohlc_frequencies = ["1D"]
+    mock_config.trade_verification["enabled"] = True
+    data_folder_path = str(tmpdir)
+    tmpdir.mkdir("ohlc")
+    trades_filepath = f"{tmpdir.mkdir('trade_history')}/{TRADES_FILEPATH[26:]}"
+
+    # Trades files without trades between dates are handled as missing
+    mock_df_trade.iloc[:0].to_csv(trades_filepath)
+    assert handle_pair_chunked(mock_pair, mock_config, data_folder_path, False) is None
+
+    # Truncated trades files are verified before aggregation
+    mock_df_trade.iloc[:2000].to_csv(trades_filepath)
+    with caplog.at_level(logging.WARNING):
+        result = handle_pair_chunked(mock_pair, mock_config, data_folder_path, False)
+    assert result["trade_count"] == 2000
+    assert "Suspicious gap from last trade" in caplog.text
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_verify_trades_chunks(mock_pair, mock_config, caplog, mock_df_trade):
+    # Page overlapping two chunks, duplicated trades are dropped
+    with caplog.at_level(logging.WARNING):
+        chunks = list(
+            verify_trades_chunks(
+                mock_pair,
+                mock_config,
+                [mock_df_trade.iloc[:2000], mock_df_trade.iloc[1990:]],
+            )
+        )
+    assert "10 duplicated trades, 1 time regressions and 0 suspicious gaps" in (
+        caplog.text
+    )
+    pd.testing.assert_frame_equal(pd.concat(chunks), mock_df_trade)
+    caplog.clear()
+
+    # Identical trades in time order at chunk boundary are not duplicates
+    with caplog.at_level(logging.WARNING):
+        chunks = list(
+            verify_trades_chunks(
+                mock_pair,
+                mock_config,
+                [mock_df_trade.iloc[:2000], mock_df_trade.iloc[1999:]],
+            )
+        )
+    assert "duplicated trades" not in caplog.text
+    assert sum(len(df_chunk) for df_chunk in chunks) == len(mock_df_trade) + 1
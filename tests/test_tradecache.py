@@ -0,0 +1,93 @@
+import datetime
+import os
+import threading
+
+import pandas as pd
+
+from krakenohlc import (KrakenApiEndpoint, ReplayData, ReplayServer,
+                        download_trades_cached, synthetic_trades,
+                        trade_cache_days, trades_as_dataframe, uncached_ranges)
+
+TRADES = synthetic_trades(1609459200, 1609459200 + 5 * 86400, 60, seed=5)
+
+
+def expected_trades(
+    start_datetime: datetime.datetime, end_datetime: datetime.datetime
+) -> pd.DataFrame:
+    df_trades = trades_as_dataframe(TRADES)
+    return df_trades[
+        (df_trades.index >= start_datetime) & (df_trades.index < end_datetime)
+    ]
+
+
+def test_uncached_ranges():
+    start_datetime = datetime.datetime(2021, 1, 1, 6)
+    end_datetime = datetime.datetime(2021, 1, 5, 12)
+    days = trade_cache_days(start_datetime, end_datetime)
+    assert days == [datetime.datetime(2021, 1, i) for i in [2, 3, 4]]
+    assert uncached_ranges(start_datetime, end_datetime, [days[1]]) == [
+        (start_datetime, days[1]),
+        (days[2], end_datetime),
+    ]
+    assert uncached_ranges(start_datetime, end_datetime, days) == [
+        (start_datetime, days[0]),
+        (datetime.datetime(2021, 1, 5), end_datetime),
+    ]
+
+
+def test_download_trades_cached(tmpdir, mock_rate_limiter):
+    cache_folder_path = f"{tmpdir}/shared"
+    with ReplayServer(ReplayData(trades={"XYZEUR": TRADES}), page_size=100) as server:
+        ka = KrakenApiEndpoint(server.url)
+        dates = (datetime.datetime(2021, 1, 1, 6), datetime.datetime(2021, 1, 4, 12))
+        df_trades = download_trades_cached(
+            ka, "XYZEUR", *dates, cache_folder_path, mock_rate_limiter()
+        )
+        pd.testing.assert_frame_equal(df_trades, expected_trades(*dates))
+        assert sorted(os.listdir(f"{cache_folder_path}/XYZEUR")) == [
+            ".lock",
+            "2021-01-02.csv.gz",
+            "2021-01-03.csv.gz",
+        ]
+
+        # Overlapping dates only download days not cached yet
+        requests = server.metrics()["requests"]
+        dates = (datetime.datetime(2021, 1, 2), datetime.datetime(2021, 1, 5))
+        df_trades = download_trades_cached(
+            ka, "XYZEUR", *dates, cache_folder_path, mock_rate_limiter()
+        )
+        pd.testing.assert_frame_equal(df_trades, expected_trades(*dates))
+        assert server.metrics()["requests"] - requests == -(
+            -len(expected_trades(datetime.datetime(2021, 1, 4), dates[1])) // 100
+        )
+
+
+def test_download_trades_cached_concurrent(tmpdir, mock_rate_limiter):
+    cache_folder_path = f"{tmpdir}/shared"
+    dates = (datetime.datetime(2021, 1, 1), datetime.datetime(2021, 1, 4))
+    results = list()
+    with ReplayServer(
+        ReplayData(trades={"XYZEUR": TRADES}), latency=0.01, page_size=200
+    ) as server:
+
+        def run() -> None:
+            results.append(
+                download_trades_cached(
+                    KrakenApiEndpoint(server.url),
+                    "XYZEUR",
+                    *dates,
+                    cache_folder_path,
+                    mock_rate_limiter(),
+                )
+            )
+
+        threads = [threading.Thread(target=run) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        requests = server.metrics()["requests"]
+    for df_trades in results:
+        pd.testing.assert_frame_equal(df_trades, expected_trades(*dates))
+    # Trades are downloaded by a single run, others wait for the cache lock
+    assert requests == -(-len(expected_trades(*dates)) // 200)
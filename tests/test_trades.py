@@ -1,12 +1,14 @@
 import datetime
 import json
+from unittest.mock import patch
 
 import pandas as pd
+import pytest
 import vcr
 from krakenapi import KrakenApi
 
 from krakenohlc import (datetime_as_utc_unix, download_trades,
-                        trades_as_dataframe)
+                        iter_trades_pages, trades_as_dataframe)
 
 
 def test_datetime_as_utc_unix():
@@ -27,6 +29,18 @@ def test_trades_as_dataframe():
     pd.testing.assert_frame_equal(df_trades, df_trades_test)
 
 
+def test_trades_as_dataframe_pyarrow():
+    pytest.importorskip("pyarrow")
+    with open("tests/fixtures/tests_data/trades.json", "r") as f:
+        trades = json.load(f)
+    df_trades = trades_as_dataframe(trades, "pyarrow")
+    assert isinstance(df_trades["price"].dtype, pd.ArrowDtype)
+    pd.testing.assert_frame_equal(
+        df_trades.convert_dtypes(dtype_backend="numpy_nullable"),
+        trades_as_dataframe(trades).convert_dtypes(dtype_backend="numpy_nullable"),
+    )
+
+
 @vcr.use_cassette("tests/fixtures/vcr_cassettes/test_download_trades.yaml")
 def test_download_trades():
     ka = KrakenApi()
@@ -41,3 +55,28 @@ def test_download_trades():
     )
     df_trades_test["miscellaneous"].fillna("", inplace=True)
     pd.testing.assert_frame_equal(df_trades, df_trades_test)
+
+
+def test_iter_trades_pages():
+    with open("tests/fixtures/tests_data/trades.json", "r") as f:
+        trades = json.load(f)
+    end_datetime = pd.to_datetime(trades[10][2], unit="s").to_pydatetime()
+    page = {"XGRTXETH": trades, "last": str(int(trades[-1][2] * 10**9))}
+    with patch(
+        "krakenohlc.trades.send_public_request", return_value=page
+    ) as mock_send_public_request, patch(
+        "krakenohlc.trades.trades_as_dataframe", wraps=trades_as_dataframe
+    ) as mock_trades_as_dataframe:
+        pages = list(
+            iter_trades_pages(
+                KrakenApi(),
+                "GRTETH",
+                datetime.datetime(2021, 3, 28),
+                end_datetime,
+            )
+        )
+    # Paging stops at the page passing end date, later trades are not converted
+    assert mock_send_public_request.call_count == 1
+    assert len(mock_trades_as_dataframe.call_args[0][0]) <= 10
+    assert len(pages) == 1
+    assert (pages[0].index < end_datetime).all()
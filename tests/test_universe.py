@@ -0,0 +1,120 @@
+import json
+import os
+from unittest.mock import MagicMock
+
+from krakenohlc import asset_pairs_frame, cached_asset_pairs, select_pairs
+
+ASSET_PAIRS = {
+    "XXBTZUSD": {
+        "altname": "XBTUSD",
+        "wsname": "XBT/USD",
+        "base": "XXBT",
+        "quote": "ZUSD",
+    },
+    "XBTUSD.d": {"altname": "XBTUSD.d", "base": "XXBT", "quote": "ZUSD"},
+    "XETHXXBT": {
+        "altname": "ETHXBT",
+        "wsname": "ETH/XBT",
+        "base": "XETH",
+        "quote": "XXBT",
+    },
+    "USDTZUSD": {
+        "altname": "USDTUSD",
+        "wsname": "USDT/USD",
+        "base": "USDT",
+        "quote": "ZUSD",
+    },
+    "XBTUSDT": {
+        "altname": "XBTUSDT",
+        "wsname": "XBT/USDT",
+        "base": "XXBT",
+        "quote": "USDT",
+    },
+    "ETHUSDT": {
+        "altname": "ETHUSDT",
+        "wsname": "ETH/USDT",
+        "base": "XETH",
+        "quote": "USDT",
+    },
+    "LUNAUSD": {
+        "altname": "LUNAUSD",
+        "wsname": "LUNA/USD",
+        "base": "LUNA",
+        "quote": "ZUSD",
+        "status": "cancel_only",
+    },
+}
+
+
+def test_asset_pairs_frame():
+    df_pairs = asset_pairs_frame(ASSET_PAIRS)
+    assert df_pairs.loc["XXBTZUSD", ["base_altname", "quote_altname"]].tolist() == [
+        "XBT",
+        "USD",
+    ]
+    # Pairs without websocket name keep assets identifiers
+    assert df_pairs.loc["XBTUSD.d", "quote_altname"] == "ZUSD"
+    assert df_pairs["status"].tolist().count("online") == 6
+    assert asset_pairs_frame({}).empty
+
+
+def test_select_pairs():
+    df_pairs = asset_pairs_frame(ASSET_PAIRS)
+    # Quote assets match identifiers and alternative names, not base assets
+    assert select_pairs(df_pairs, ["USDT"]) == ["XBTUSDT", "ETHUSDT"]
+    assert select_pairs(df_pairs, ["XBT"]) == ["XETHXXBT"]
+    assert select_pairs(df_pairs, ["ZUSD"]) == [
+        "XXBTZUSD",
+        "XBTUSD.d",
+        "USDTZUSD",
+        "LUNAUSD",
+    ]
+    assert select_pairs(df_pairs, ["ZUSD"], online_only=True) == [
+        "XXBTZUSD",
+        "XBTUSD.d",
+        "USDTZUSD",
+    ]
+    # Pairs are listed by quote asset, then in asset pairs order
+    assert select_pairs(df_pairs, ["USDT", "XBT", "USD*"]) == [
+        "XBTUSDT",
+        "ETHUSDT",
+        "XETHXXBT",
+        "XXBTZUSD",
+        "USDTZUSD",
+        "LUNAUSD",
+    ]
+    # Wildcards and exclusion rules
+    assert select_pairs(
+        df_pairs, ["Z*", "USD*"], ["USDT"], excluded_pairs=["*.d"], online_only=True
+    ) == ["XXBTZUSD", "XBTUSDT", "ETHUSDT"]
+    assert select_pairs(df_pairs, ["*"], included_pairs=["ETH*"]) == [
+        "XETHXXBT",
+        "ETHUSDT",
+    ]
+
+
+def test_cached_asset_pairs(tmpdir):
+    ka = MagicMock()
+    ka.get_asset_pairs.return_value = ASSET_PAIRS
+    cache_filepath = str(tmpdir.join("asset_pairs.json"))
+    # Asset pairs are requested without cache file
+    assert cached_asset_pairs(ka, "https://api.kraken.com") == ASSET_PAIRS
+    assert not os.path.exists(cache_filepath)
+
+    # Asset pairs are requested once until the cache file is too old
+    for _ in range(2):
+        assert (
+            cached_asset_pairs(ka, "https://api.kraken.com", cache_filepath)
+            == ASSET_PAIRS
+        )
+    assert ka.get_asset_pairs.call_count == 2
+    cached_asset_pairs(ka, "https://api.kraken.com", cache_filepath, 0)
+    assert ka.get_asset_pairs.call_count == 3
+
+    # Cache files of another API or interrupted writes are not used
+    cached_asset_pairs(ka, "http://127.0.0.1:8080", cache_filepath)
+    assert ka.get_asset_pairs.call_count == 4
+    with open(cache_filepath, "w") as stream:
+        stream.write(json.dumps({"api_url": "https://api.kraken.com"})[:10])
+    cached_asset_pairs(ka, "https://api.kraken.com", cache_filepath)
+    assert ka.get_asset_pairs.call_count == 5
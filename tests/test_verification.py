@@ -0,0 +1,136 @@
+import datetime
+import os
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from krakenohlc import (gaps_without_trades, handle_pair, read_csv,
+                        repair_trades, update_pair_metadata, verify_trades,
+                        write_csv, write_metadata)
+from krakenohlc.krakenohlc import pair_trades_filepath
+
+TRADES_FILEPATH = (
+    "tests/fixtures/tests_data/GRTETH_2021-03-28T00-00-00_2021-05-04T15-00-00.csv"
+)
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_verify_trades(mock_df_trade):
+    report = verify_trades(
+        mock_df_trade,
+        start_datetime=datetime.datetime(2021, 3, 28),
+        end_datetime=datetime.datetime(2021, 5, 4, 15),
+    )
+    assert report == {
+        "trade_count": 5050,
+        "duplicates": 0,
+        "time_regressions": 0,
+        "gaps": [],
+    }
+
+    # Overlapping pages and a missing page
+    df_corrupted = pd.concat(
+        [
+            mock_df_trade.iloc[:2000],
+            mock_df_trade.iloc[1990:2500],
+            mock_df_trade.iloc[3000:],
+        ]
+    )
+    report = verify_trades(df_corrupted)
+    assert report["duplicates"] == 10
+    assert report["time_regressions"] == 1
+    assert report["gaps"] == [(mock_df_trade.index[2499], mock_df_trade.index[3000])]
+
+    # Identical trades in time order are not duplicates
+    df_identical = pd.concat([mock_df_trade.iloc[:2000], mock_df_trade.iloc[1999:]])
+    assert verify_trades(df_identical)["duplicates"] == 0
+
+    # Gaps confirmed without trades are not suspicious
+    report = verify_trades(df_corrupted, confirmed_gaps=report["gaps"])
+    assert report["gaps"] == []
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_gaps_without_trades(mock_df_trade):
+    gaps = [
+        (mock_df_trade.index[2499], mock_df_trade.index[3000]),
+        (mock_df_trade.index[3500], mock_df_trade.index[4000]),
+    ]
+    df_trades = pd.concat([mock_df_trade.iloc[:2500], mock_df_trade.iloc[3000:]])
+    assert gaps_without_trades(df_trades.index, gaps) == gaps[:1]
+    assert gaps_without_trades(mock_df_trade.index, gaps) == []
+
+
+@pytest.mark.usefixtures("cleandir")
+def test_repair_trades(mock_df_trade):
+    df_corrupted = pd.concat(
+        [
+            mock_df_trade.iloc[:2000],
+            mock_df_trade.iloc[1990:2500],
+            mock_df_trade.iloc[3000:],
+        ]
+    )
+    report = verify_trades(df_corrupted)
+    gap_start, gap_end = report["gaps"][0]
+    # Downloaded gap trades include trades at gap dates already known
+    with patch(
+        "krakenohlc.verification.download_trades",
+        return_value=mock_df_trade[gap_start:gap_end],
+    ) as mock_download_trades:
+        df_repaired = repair_trades(None, "GRTETH", df_corrupted, report)
+    mock_download_trades.assert_called_once()
+    assert mock_download_trades.call_args[0][:4] == (
+        None,
+        "GRTETH",
+        gap_start.to_pydatetime(),
+        gap_end.to_pydatetime(),
+    )
+    pd.testing.assert_frame_equal(df_repaired, mock_df_trade)
+
+
+def test_handle_pair_confirmed_gaps(tmpdir, mock_pair, mock_config):
+    mock_config.ohlc_frequencies = ["1h"]
+    mock_config.trade_verification = {
+        **mock_config.trade_verification,
+        "enabled": True,
+        "repair": True,
+    }
+    data_folder_path = str(tmpdir)
+    tmpdir.mkdir("ohlc")
+    tmpdir.mkdir("trade_history")
+    df_trades = read_csv(TRADES_FILEPATH, "trades")
+    df_quiet = pd.concat([df_trades.iloc[:2500], df_trades.iloc[3000:]])
+    trades_filepath = pair_trades_filepath(mock_pair, mock_config)
+    trades_filepath = f"{data_folder_path}/{trades_filepath}"
+    write_csv(df_quiet, trades_filepath)
+    trades_mtime = os.stat(trades_filepath).st_mtime_ns
+
+    # Gap downloaded again without trades is confirmed and trades are not saved again
+    with patch(
+        "krakenohlc.verification.download_trades", return_value=df_trades.iloc[:0]
+    ) as mock_download_trades:
+        result = handle_pair(mock_pair, mock_config, data_folder_path, False)
+    mock_download_trades.assert_called_once()
+    assert os.stat(trades_filepath).st_mtime_ns == trades_mtime
+    assert result["confirmed_gaps"] == [
+        [str(df_quiet.index[2499]), str(df_quiet.index[2500])]
+    ]
+
+    # Gap confirmed in metadata is not downloaded again
+    metadata = {"pairs": {}}
+    update_pair_metadata(
+        metadata,
+        mock_pair,
+        mock_config.start_datetime,
+        mock_config.end_datetime,
+        pair_trades_filepath(mock_pair, mock_config),
+        result["trade_count"],
+        result["ohlc_filepaths"],
+        confirmed_gaps=result["confirmed_gaps"],
+    )
+    write_metadata(data_folder_path, metadata)
+    with patch("krakenohlc.verification.download_trades") as mock_download_trades:
+        result = handle_pair(mock_pair, mock_config, data_folder_path, False)
+    mock_download_trades.assert_not_called()
+    assert result["confirmed_gaps"] == metadata["pairs"][mock_pair][0]["confirmed_gaps"]
@@ -0,0 +1,107 @@
+import copy
+import datetime
+import filecmp
+
+import pytest
+
+from krakenohlc import (KrakenApiEndpoint, ReplayData, ReplayServer,
+                        handle_pair, ohlc_windows, period_windows,
+                        synthetic_trades)
+
+START_DATETIME = datetime.datetime(2021, 3, 28)
+END_DATETIME = datetime.datetime(2021, 5, 4, 15)
+
+
+def test_ohlc_windows():
+    assert period_windows(START_DATETIME, END_DATETIME, "month") == [
+        (START_DATETIME, datetime.datetime(2021, 4, 1)),
+        (datetime.datetime(2021, 4, 1), datetime.datetime(2021, 5, 1)),
+        (datetime.datetime(2021, 5, 1), END_DATETIME),
+    ]
+    weeks = period_windows(START_DATETIME, END_DATETIME, "week")
+    assert weeks[0] == (START_DATETIME, datetime.datetime(2021, 3, 29))
+    assert all(start.weekday() == 0 for start, _ in weeks[1:])
+    assert weeks[-1] == (datetime.datetime(2021, 5, 3), END_DATETIME)
+    assert period_windows(START_DATETIME, END_DATETIME, "year") == [
+        (START_DATETIME, END_DATETIME)
+    ]
+
+    # Windows are sorted without duplicates
+    assert ohlc_windows(
+        START_DATETIME,
+        END_DATETIME,
+        "month",
+        [
+            ["2021-04-10 00:00:00", "2021-04-20 12:00:00"],
+            ["2021-04-01 00:00:00", "2021-05-01 00:00:00"],
+        ],
+    ) == [
+        (START_DATETIME, datetime.datetime(2021, 4, 1)),
+        (datetime.datetime(2021, 4, 1), datetime.datetime(2021, 5, 1)),
+        (datetime.datetime(2021, 4, 10), datetime.datetime(2021, 4, 20, 12)),
+        (datetime.datetime(2021, 5, 1), END_DATETIME),
+    ]
+    assert ohlc_windows(START_DATETIME, END_DATETIME) == []
+    with pytest.raises(ValueError, match="not between download dates"):
+        ohlc_windows(
+            START_DATETIME,
+            END_DATETIME,
+            dates=[["2021-05-01 00:00:00", "2021-06-01 00:00:00"]],
+        )
+
+
+def test_handle_pair_windows(tmpdir, mock_config, mock_rate_limiter):
+    trades = synthetic_trades(1616803200, 1620226800, trades_per_hour=30, seed=6)
+    mock_config.ohlc_frequencies = ["1h", "1D"]
+    mock_config.native_ohlc = True
+    mock_config.rate_limiter = mock_rate_limiter()
+    mock_config.ohlc_windows = ohlc_windows(
+        START_DATETIME,
+        END_DATETIME,
+        "month",
+        [["2021-04-10 06:00:00", "2021-04-20 12:00:00"]],
+    )
+    with ReplayServer(ReplayData(trades={"XYZEUR": trades}), page_size=200) as server:
+        mock_config.ka = KrakenApiEndpoint(server.url)
+        batch_folder = tmpdir.mkdir("batch")
+        batch_folder.mkdir("trade_history")
+        batch_folder.mkdir("ohlc")
+        result = handle_pair("XYZEUR", mock_config, str(batch_folder))
+        batch_requests = server.metrics()["requests"]
+
+        # Window OHLC are the same as OHLC of runs between window dates
+        for window in result["windows"]:
+            window_folder = tmpdir.mkdir(window["start_datetime"][:10])
+            window_folder.mkdir("trade_history")
+            window_folder.mkdir("ohlc")
+            window_config = copy.copy(mock_config)
+            window_config.start_datetime = datetime.datetime.fromisoformat(
+                window["start_datetime"]
+            )
+            window_config.end_datetime = datetime.datetime.fromisoformat(
+                window["end_datetime"]
+            )
+            window_config.ohlc_windows = []
+            window_config.native_ohlc = False
+            window_result = handle_pair("XYZEUR", window_config, str(window_folder))
+            assert window["trade_count"] == window_result["trade_count"]
+            assert window["ohlc_filepaths"] == window_result["ohlc_filepaths"]
+            for filepath in window["ohlc_filepaths"].values():
+                assert filecmp.cmp(
+                    f"{batch_folder}/{filepath}",
+                    f"{window_folder}/{filepath}",
+                    shallow=False,
+                )
+    # Trades are downloaded once for all windows, without native OHLC requests
+    assert batch_requests == -(-result["trade_count"] // 200)
+    assert [window["start_datetime"] for window in result["windows"]] == [
+        "2021-03-28 00:00:00",
+        "2021-04-01 00:00:00",
+        "2021-04-10 06:00:00",
+        "2021-05-01 00:00:00",
+    ]
+    assert (
+        sum(window["trade_count"] for window in result["windows"][:2])
+        + sum(window["trade_count"] for window in result["windows"][3:])
+        == result["trade_count"]
+    )
@@ -0,0 +1,204 @@
+import datetime
+import json
+import sqlite3
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from krakenohlc import (JobHeartbeat, StageProfiler, complete_job,
+                        connect_queue, enqueue_jobs, estimated_trade_counts,
+                        fail_job, heartbeat_job, kraken_ohlc_enqueue,
+                        kraken_ohlc_worker, lease_job, queue_status,
+                        read_metadata)
+
+START_DATETIME = datetime.datetime(2021, 3, 28)
+END_DATETIME = datetime.datetime(2021, 5, 4, 15)
+
+WORKER_SCRIPT = """
+import sys
+from krakenohlc import complete_job, connect_queue, lease_job
+
+connection = connect_queue(sys.argv[1])
+while (job := lease_job(connection, sys.argv[2])) is not None:
+    complete_job(connection, job["id"], sys.argv[2], {"pair": job["pair"]})
+"""
+
+
+def test_enqueue_lease_complete_jobs(tmpdir):
+    connection = connect_queue(str(tmpdir))
+    pairs = ["GRTETH", "KEEPXBT"]
+    assert enqueue_jobs(connection, pairs, START_DATETIME, END_DATETIME, 30) == 4
+    # Enqueuing again is idempotent
+    assert enqueue_jobs(connection, pairs, START_DATETIME, END_DATETIME, 30) == 0
+
+    job = lease_job(connection, "worker-1")
+    assert job["id"] == "GRTETH_2021-03-28 00:00:00_2021-04-27 00:00:00"
+    assert job["attempts"] == 1
+    assert heartbeat_job(connection, job["id"], "worker-1")
+    assert not heartbeat_job(connection, job["id"], "worker-2")
+    assert complete_job(connection, job["id"], "worker-1", {"trade_count": 42})
+    # Results are committed once
+    assert not complete_job(connection, job["id"], "worker-1", {"trade_count": 42})
+
+    # Expired leases are leased again
+    job = lease_job(connection, "worker-1", lease_duration=-1)
+    assert lease_job(connection, "worker-2")["id"] == job["id"]
+    assert not complete_job(connection, job["id"], "worker-1", {})
+    assert complete_job(connection, job["id"], "worker-2", {})
+
+    # Failed jobs are leased again until the maximum number of attempts
+    for _ in range(3):
+        job = lease_job(connection, "worker-1")
+        assert job["pair"] == "KEEPXBT"
+        fail_job(connection, job["id"], "worker-1", "Kraken API error")
+    assert queue_status(connection) == {
+        "pending": 1,
+        "leased": 0,
+        "done": 2,
+        "failed": 1,
+    }
+
+    # Expired leases are failed after the maximum number of attempts
+    for _ in range(3):
+        assert lease_job(connection, "worker-1", lease_duration=-1) is not None
+    assert lease_job(connection, "worker-1") is None
+    assert queue_status(connection) == {
+        "pending": 0,
+        "leased": 0,
+        "done": 2,
+        "failed": 2,
+    }
+    connection.close()
+
+
+def test_job_heartbeat(tmpdir):
+    connection = connect_queue(str(tmpdir))
+    enqueue_jobs(connection, ["GRTETH", "KEEPXBT"], START_DATETIME, END_DATETIME)
+    job = lease_job(connection, "worker-1", lease_duration=0.3)
+    with JobHeartbeat(str(tmpdir), job, lease_duration=0.3) as heartbeat:
+        time.sleep(0.25)
+    assert heartbeat.error is None
+    # Lease is extended
+    assert lease_job(connection, "worker-2")["pair"] == "KEEPXBT"
+
+    # Lease taken by another worker
+    with JobHeartbeat(str(tmpdir), job, lease_duration=0.3) as heartbeat:
+        connection.execute("UPDATE jobs SET worker = 'worker-2'")
+        time.sleep(0.25)
+    assert heartbeat.error == "Job lease lost."
+    with pytest.raises(RuntimeError, match="Job lease lost."):
+        heartbeat.check()
+
+    # Heartbeat errors are recorded
+    with patch(
+        "krakenohlc.workqueue.heartbeat_job",
+        side_effect=sqlite3.OperationalError("database is locked"),
+    ):
+        with JobHeartbeat(str(tmpdir), job, lease_duration=0.3) as heartbeat:
+            time.sleep(0.25)
+    assert heartbeat.error == "Job heartbeat failed -> database is locked"
+    connection.close()
+
+
+def test_concurrent_workers(tmpdir):
+    connection = connect_queue(str(tmpdir))
+    pairs = [f"PAIR{i}" for i in range(40)]
+    enqueue_jobs(connection, pairs, START_DATETIME, END_DATETIME)
+    workers = [
+        subprocess.Popen([sys.executable, "-c", WORKER_SCRIPT, str(tmpdir), f"w{i}"])
+        for i in range(4)
+    ]
+    assert all(worker.wait(timeout=60) == 0 for worker in workers)
+    assert queue_status(connection)["done"] == 40
+    results = [
+        json.loads(row["result"])["pair"]
+        for row in connection.execute("SELECT result FROM jobs")
+    ]
+    assert sorted(results) == sorted(pairs)
+    connection.close()
+
+
+def test_kraken_ohlc_enqueue_output_windows(tmpdir):
+    config = SimpleNamespace(
+        pairs=["GRTETH"],
+        start_datetime=START_DATETIME,
+        end_datetime=END_DATETIME,
+        ohlc_windows=[(START_DATETIME, datetime.datetime(2021, 4, 1))],
+        scheduling={"priorities": {}},
+    )
+    with patch("krakenohlc.krakenohlc.Config", return_value=config):
+        # Windows can't be generated by jobs of a range of days
+        with pytest.raises(ValueError, match="output_windows"):
+            kraken_ohlc_enqueue(str(tmpdir), range_days=30)
+        assert kraken_ohlc_enqueue(str(tmpdir)) == 1
+
+
+def test_kraken_ohlc_worker(tmpdir):
+    connection = connect_queue(str(tmpdir))
+    enqueue_jobs(connection, ["GRTETH"], START_DATETIME, END_DATETIME, 30)
+    config = SimpleNamespace(
+        start_datetime=START_DATETIME,
+        end_datetime=END_DATETIME,
+        csv_compression=None,
+        profiler=StageProfiler(),
+    )
+    result = {"trade_count": 42, "ohlc_filepaths": {"1h": "ohlc/GRTETH_1H.csv"}}
+    with patch("krakenohlc.krakenohlc.Config", return_value=config), patch(
+        "krakenohlc.krakenohlc.handle_pair", side_effect=[result, ValueError, result]
+    ) as mock_handle_pair:
+        assert kraken_ohlc_worker(str(tmpdir), worker="worker-1") == 2
+    assert mock_handle_pair.call_count == 3
+    job_config = mock_handle_pair.call_args[0][1]
+    assert job_config.start_datetime == datetime.datetime(2021, 4, 27)
+    assert config.start_datetime == START_DATETIME
+    assert queue_status(connection)["done"] == 2
+    # Both completed range jobs of the pair are recorded
+    metadata = read_metadata(str(tmpdir))
+    pair_ranges = metadata["pairs"]["GRTETH"]
+    assert [(i["start_datetime"], i["end_datetime"]) for i in pair_ranges] == [
+        ("2021-03-28 00:00:00", "2021-04-27 00:00:00"),
+        ("2021-04-27 00:00:00", "2021-05-04 15:00:00"),
+    ]
+    assert [i["trade_count"] for i in pair_ranges] == [42, 42]
+    trade_counts = estimated_trade_counts(
+        metadata, ["GRTETH"], START_DATETIME, END_DATETIME
+    )
+    assert round(trade_counts["GRTETH"]) == 84
+    connection.close()
+
+
+def test_kraken_ohlc_worker_lease_lost(tmpdir):
+    connection = connect_queue(str(tmpdir))
+    enqueue_jobs(connection, ["GRTETH"], START_DATETIME, END_DATETIME)
+    config = SimpleNamespace(
+        start_datetime=START_DATETIME,
+        end_datetime=END_DATETIME,
+        profiler=StageProfiler(),
+    )
+
+    written_pairs = list()
+
+    def handle_pair(pair, job_config, data_folder_path) -> dict:
+        # Job leased by another worker while processed
+        connection.execute("UPDATE jobs SET worker = 'worker-2'")
+        time.sleep(0.3)
+        # Job stopped before writing files
+        job_config.job_heartbeat.check()
+        written_pairs.append(pair)
+        return {"trade_count": 42, "ohlc_filepaths": {}}
+
+    with patch("krakenohlc.krakenohlc.Config", return_value=config), patch(
+        "krakenohlc.krakenohlc.handle_pair", side_effect=handle_pair
+    ) as mock_handle_pair:
+        assert (
+            kraken_ohlc_worker(str(tmpdir), worker="worker-1", lease_duration=0.2) == 0
+        )
+    assert mock_handle_pair.call_count == 3
+    assert written_pairs == []
+    assert queue_status(connection)["failed"] == 1
+    assert read_metadata(str(tmpdir))["pairs"] == {}
+    connection.close()